@@ -11,11 +11,29 @@ from tornado.log import access_log
 # https://pymongo.readthedocs.io/en/stable/
 from pymongo import AsyncMongoClient
 
+from mongo_cache_refresh import CacheRefresher, parse_hot_queries
+from mongo_collections import CollectionRegistry, parse_collections
+from mongo_count_cache import CountCache
 from mongo_count_documents import CountDocumentsHandler
+from mongo_deadline import parse_route_timeouts
 from mongo_delete_one import DeleteOneHandler
+from mongo_explain import ExplainHandler
 from mongo_find import FindHandler
+from mongo_health import HealthMonitor
+from mongo_http_cache import WriteGeneration, parse_cache_control, parse_etag_probe
+from mongo_index_advisor import IndexAdvisorHandler, QueryShapeRecorder
+from mongo_indexes import IndexCatalog, parse_index_policy
 from mongo_insert_one import InsertOneHandler
+from mongo_operator import parse_field_types
+from mongo_pool import CommandMetrics, PoolMetrics, client_options
+from mongo_query import QueryDefaults
+from mongo_query_cache import QueryPlanCache
+from mongo_read_preference import parse_read_preferences
+from mongo_response import ResponseCompressor, parse_compression_level
+from mongo_response_cache import parse_response_cache
+from mongo_single_flight import SingleFlight
 from mongo_update_one import UpdateOneHandler
+from mongo_warmup import parse_warm_up_queries, warm_up
 
 
 def log_function(handler, *args, **kwargs):
@@ -77,7 +95,52 @@ class HealthCheckHandler(tornado.web.RequestHandler):
         if self.settings.get("debug", False):
             self.set_header("X-Debug", "route=HealthCheckHandler.get")
 
-        raise NotImplementedError("HealthCheckHandler, ...work to do!")
+        # Answer with the latest background probe, never wait on the database
+        # /healthcheck/live for liveness, /healthcheck and /healthcheck/ready for readiness
+        probe = args[0] if args else "ready"
+        report = self.settings["health_monitor"].report()
+        self.set_header("Cache-Control", "no-store")
+        self.set_status(200 if report[probe] else 503)
+        self.write(report)
+
+
+class StatsHandler(tornado.web.RequestHandler):
+    def get(self, *args, **kwargs):
+        name = f"{Path(__file__).name} -"
+        logging.debug(f"{name} get - *args: {args!r}")
+        logging.debug(f"{name} get - **kwargs: {kwargs!r}")
+
+        if self.settings.get("debug", False):
+            self.set_header("X-Debug", "route=StatsHandler.get")
+
+        # Report the counters of the in-process caches
+        stats = {}
+        if self.settings.get("warm_up") is not None:
+            stats.update(warm_up=self.settings["warm_up"])
+        if self.settings.get("pool_metrics") is not None:
+            stats.update(pool=self.settings["pool_metrics"].stats())
+        if self.settings.get("command_metrics") is not None:
+            stats.update(commands=self.settings["command_metrics"].stats())
+        if self.settings.get("collections") is not None:
+            stats.update(collections=self.settings["collections"].stats())
+        if self.settings.get("query_plan_cache") is not None:
+            stats.update(query_plan_cache=self.settings["query_plan_cache"].stats())
+        if self.settings.get("response_compressor") is not None:
+            stats.update(compression=self.settings["response_compressor"].stats())
+        if self.settings.get("count_cache") is not None:
+            stats.update(count_cache=self.settings["count_cache"].stats())
+        if self.settings.get("single_flight") is not None:
+            stats.update(single_flight=self.settings["single_flight"].stats())
+        if self.settings.get("cache_refresher") is not None:
+            stats.update(cache_refresh=self.settings["cache_refresher"].stats())
+        if self.settings.get("response_cache"):
+            stats.update(
+                response_cache={
+                    route: cache.stats()
+                    for route, cache in self.settings["response_cache"].items()
+                }
+            )
+        self.write(stats)
 
 
 def make_app(*args, **kwargs):
@@ -85,17 +148,21 @@ def make_app(*args, **kwargs):
 
     # Read-only route handlers
     routes = [
+        (r".*/explain/(find|find_one|count_documents)", ExplainHandler),
         (r".*/count_documents", CountDocumentsHandler),
         (r".*/find", FindHandler),
         (r".*/find_one", FindHandler),
+        (r".*/healthcheck/(live|ready)", HealthCheckHandler),
         (r".*/healthcheck", HealthCheckHandler),
         (r".*/ping", PingHandler),
+        (r".*/stats", StatsHandler),
     ]
 
     # Read-write route handlers
     if kwargs.get("admin", False):
         routes += [
             (r".*/delete_one", DeleteOneHandler),
+            (r".*/index_advisor", IndexAdvisorHandler),
             (r".*/insert_one", InsertOneHandler),
             (r".*/update_one", UpdateOneHandler),
         ]
@@ -105,6 +172,11 @@ def make_app(*args, **kwargs):
     routes.append((r"/.*", DefaultHandler))
     logging.debug(f"{name} make_app - routes: {routes!r}")
 
+    # Record the connection pool use and command latency
+    # https://pymongo.readthedocs.io/en/stable/api/pymongo/monitoring.html
+    pool_metrics = PoolMetrics()
+    command_metrics = CommandMetrics()
+
     # Use a MagicMock collection instead of a pymongo asynchronous collection
     if kwargs.get("mock_collection", False):
         logging.warning("Using a mock database!")
@@ -119,6 +191,9 @@ def make_app(*args, **kwargs):
         logging.info(
             f"Using pymongo.AsyncMongoClient: {kwargs.get('mongodb', 'mongodb://127.0.0.1:27017')}"
         )
+        # Pool size, wire compression and read preference options
+        options = client_options(kwargs)
+        logging.debug(f"{name} make_app - client options: {options!r}")
         asyncmongoclient = AsyncMongoClient(
             kwargs.get("mongodb", "mongodb://127.0.0.1:27017"),
             username=kwargs.get("username"),
@@ -130,6 +205,8 @@ def make_app(*args, **kwargs):
                 kwargs.get("serverSelectionTimeoutMS", 5000)
             ),  # driver default is ???? ms
             appname=kwargs.get("appname", "PyTornadoMongoClient"),
+            event_listeners=[pool_metrics, command_metrics],
+            **options,
         )
         # Database connection to a specific document collection in a specific database
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/database.html
@@ -139,6 +216,14 @@ def make_app(*args, **kwargs):
         collection = database.get_collection(kwargs.get("collection", "test"))
         logging.debug(f"{name} make_app - collection.name: {collection.name!r}")
 
+    # Probe MongoDB, the pool and the event loop for the health checks
+    health_monitor = HealthMonitor(
+        asyncmongoclient,
+        pool_metrics,
+        interval=float(kwargs.get("health_interval", 5)),
+        timeout=float(kwargs.get("health_timeout", 2)),
+    )
+
     # Reduce the amount of noise from pymongo when running with debug
     # https://pymongo.readthedocs.io/en/stable/examples/logging.html
     if kwargs.get("debug", False):
@@ -152,15 +237,165 @@ def make_app(*args, **kwargs):
     default_query_options = json.loads(kwargs.get("default_query_options", "{}"))
     logging.debug(f"{name} make_app - default_query_options: {default_query_options!r}")
 
+    # 'field_types' declares the type of fields to skip guessing value types
+    field_types = parse_field_types(kwargs.get("field_types") or "{}")
+    logging.debug(f"{name} make_app - field_types: {field_types!r}")
+
+    # Compile the default query filter and options once
+    # A `now_window' (seconds) rounds `$now' down so queries can be shared
+    query_defaults = QueryDefaults(
+        default_query_filter,
+        default_query_options,
+        now_window=float(kwargs.get("now_window", 0)),
+        field_types=field_types,
+    )
+    logging.debug(f"{name} make_app - query_defaults: {query_defaults!r}")
+
+    # 'index_policy' allows, warns or rejects queries that scan the collection
+    index_policy = parse_index_policy(kwargs.get("index_policy") or "{}")
+    logging.debug(f"{name} make_app - index_policy: {index_policy!r}")
+
+    # Compress responses of at least `compression_min_size' bytes (zero disables)
+    compression_min_size = int(kwargs.get("compression_min_size", 1024))
+    if compression_min_size > 0:
+        response_compressor = ResponseCompressor(
+            min_size=compression_min_size,
+            levels=parse_compression_level(kwargs.get("compression_level") or "{}"),
+        )
+    else:
+        response_compressor = None
+    logging.debug(f"{name} make_app - compression_min_size: {compression_min_size!r}")
+
+    # 'cache_control' sets the Cache-Control header of read routes for HTTP caches
+    cache_control = parse_cache_control(kwargs.get("cache_control") or "{}")
+    logging.debug(f"{name} make_app - cache_control: {cache_control!r}")
+    # 'etag_probe' sets the field whose max() makes the ETag of a route
+    etag_probe = parse_etag_probe(kwargs.get("etag_probe") or "{}")
+    logging.debug(f"{name} make_app - etag_probe: {etag_probe!r}")
+    # 'response_cache' keeps encoded responses per route for a TTL (seconds)
+    # within max bytes, writes through this process invalidate them
+    response_cache = parse_response_cache(kwargs.get("response_cache") or "{}")
+    logging.debug(f"{name} make_app - response_cache: {response_cache!r}")
+    # 'hot_queries' preloads read responses into the response cache at start
+    # and every 'hot_query_interval' seconds, stale responses are refreshed
+    hot_queries = parse_hot_queries(kwargs.get("hot_queries") or "[]")
+    if response_cache:
+        cache_refresher = CacheRefresher(
+            hot_queries, interval=float(kwargs.get("hot_query_interval", 60))
+        )
+    else:
+        cache_refresher = None
+    logging.debug(f"{name} make_app - hot_queries: {hot_queries!r}")
+
+    # 'route_read_preferences' sets the read preference per route and the modes
+    # a request may select, e.g. to send heavy counts to the secondaries
+    read_preferences = parse_read_preferences(
+        kwargs.get("route_read_preferences") or "{}"
+    )
+    logging.debug(f"{name} make_app - read_preferences: {read_preferences!r}")
+
+    # 'route_timeouts' sets the default deadline (seconds) of requests per route
+    route_timeouts = parse_route_timeouts(kwargs.get("route_timeouts") or "{}")
+    logging.debug(f"{name} make_app - route_timeouts: {route_timeouts!r}")
+
+    # 'count_staleness' (seconds) serves `approximate=1' counts from a cache
+    count_staleness = float(kwargs.get("count_staleness", 0))
+    count_cache = CountCache(staleness=count_staleness) if count_staleness > 0 else None
+    logging.debug(f"{name} make_app - count_staleness: {count_staleness!r}")
+
+    # 'single_flight' shares one database call among identical concurrent reads
+    single_flight = SingleFlight() if kwargs.get("single_flight", False) else None
+    logging.debug(f"{name} make_app - single_flight: {single_flight!r}")
+
+    # Cache compiled query plans by request arguments (zero disables the cache)
+    query_plan_cache_size = int(kwargs.get("query_plan_cache_size", 512))
+    if query_plan_cache_size > 0:
+        query_plan_cache = QueryPlanCache(maxsize=query_plan_cache_size)
+    else:
+        query_plan_cache = None
+    logging.debug(f"{name} make_app - query_plan_cache_size: {query_plan_cache_size!r}")
+
+    # 'collections' allow-lists more collections of the client, served by
+    # /{database}/{collection}/... routes with their own default query
+    collections = parse_collections(kwargs.get("collections") or "{}")
+    if collections:
+        if kwargs.get("mock_collection", False):
+            mock_collections = kwargs.get("mock_collections", {})
+
+            def get_collection(database, name):
+                return mock_collections.get(f"{database}.{name}", collection)
+
+        else:
+
+            def get_collection(database, name):
+                # Handles are cached by the registry, no I/O until used
+                return asyncmongoclient.get_database(database).get_collection(name)
+
+        collection_registry = CollectionRegistry(
+            get_collection,
+            collections,
+            now_window=float(kwargs.get("now_window", 0)),
+            query_plan_cache_size=query_plan_cache_size,
+            query_shapes=QueryShapeRecorder,
+        )
+        namespace = r"/(?P<database>[^/.]+)/(?P<collection>[^/]+)"
+        collection_routes = [
+            (
+                namespace + r"/explain/(?P<route>find|find_one|count_documents)",
+                ExplainHandler,
+            ),
+            (namespace + r"/count_documents", CountDocumentsHandler),
+            (namespace + r"/find", FindHandler),
+            (namespace + r"/find_one", FindHandler),
+        ]
+        if kwargs.get("admin", False):
+            collection_routes += [
+                (namespace + r"/delete_one", DeleteOneHandler),
+                (namespace + r"/index_advisor", IndexAdvisorHandler),
+                (namespace + r"/insert_one", InsertOneHandler),
+                (namespace + r"/update_one", UpdateOneHandler),
+            ]
+        # Before the catch-all routes of the application collection
+        routes[:0] = collection_routes
+    else:
+        collection_registry = None
+    logging.debug(f"{name} make_app - collections: {collection_registry!r}")
+
     return tornado.web.Application(
         routes,
         asyncmongoclient=asyncmongoclient,
+        cache_refresher=cache_refresher,
+        cache_control=cache_control,
         collection=collection,
+        collections=collection_registry,
+        command_metrics=command_metrics,
+        count_cache=count_cache,
         debug=kwargs.get("debug", False),
         default_query_filter=default_query_filter,
         default_query_options=default_query_options,
+        estimated_count=kwargs.get("estimated_count", False),
+        etag_probe=etag_probe,
         database=database,
+        explain_sample_rate=float(kwargs.get("explain_sample_rate", 0)),
+        field_types=field_types,
+        health_monitor=health_monitor,
+        index_catalog=IndexCatalog(),
+        index_policy=index_policy,
         log_function=log_function,
+        pool_metrics=pool_metrics,
+        query_defaults=query_defaults,
+        query_plan_cache=query_plan_cache,
+        query_shapes=QueryShapeRecorder(),
+        # Collection handles by read preference, see with_read_preference()
+        read_collections={},
+        read_preferences=read_preferences,
+        response_cache=response_cache,
+        response_compressor=response_compressor,
+        route_timeouts=route_timeouts,
+        single_flight=single_flight,
+        # Timings of the warm-up phases, set by main()
+        warm_up=None,
+        write_generation=WriteGeneration(),
     )
 
 
@@ -170,7 +405,30 @@ async def main(*args, **kwargs):
     logging.debug(f"{name} main - **kwargs: {kwargs}")
 
     app = make_app(**kwargs)
+    # Connect, fill the pool and run the warm-up queries before listening
+    if kwargs.get("warm_up", False) and not kwargs.get("mock_collection", False):
+        app.settings["warm_up"] = await warm_up(
+            app.settings,
+            queries=parse_warm_up_queries(kwargs.get("warm_up_queries") or "[]"),
+            min_pool_size=int(kwargs.get("min_pool_size") or 0),
+        )
+    # Load the collection indexes now and refresh them periodically
+    app.settings["index_catalog"].start(
+        app.settings["collection"],
+        interval=float(kwargs.get("index_refresh_interval", 300)),
+    )
+    if app.settings["collections"] is not None:
+        app.settings["collections"].start(
+            interval=float(kwargs.get("index_refresh_interval", 300))
+        )
     app.listen(int(kwargs.get("port", 8888)))
+    # Probe the health in the background, health checks read the verdict
+    app.settings["health_monitor"].start()
+    # Preload the hot queries through the listening port
+    if app.settings["cache_refresher"] is not None:
+        app.settings["cache_refresher"].start(
+            f"http://127.0.0.1:{int(kwargs.get('port', 8888))}"
+        )
     await asyncio.Event().wait()
 
 
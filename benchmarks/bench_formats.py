@@ -0,0 +1,87 @@
+"""Microbenchmark of a 1k document `/find' response in JSON, BSON and MessagePack
+
+Measures the response size and the time to encode (service) plus decode
+(consumer) a response in each format.
+
+Run the benchmark:
+  python3 ./benchmarks/bench_formats.py
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# https://pymongo.readthedocs.io/en/stable/
+import bson
+from bson.objectid import ObjectId
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mongo_formats import BSON_OPTIONS, msgpack, msgpack_default
+from mongo_jsonencoder import dumps
+
+ITERATIONS = 50
+DOCUMENTS = 1000
+
+
+def find_response(count: int) -> dict:
+    """A `/find' response document with typical result documents"""
+    ctime = datetime(2025, 8, 1)
+    result = [
+        {
+            "_id": ObjectId(),
+            "ctime": ctime + timedelta(minutes=i),
+            "mtime": ctime + timedelta(minutes=i, seconds=30),
+            "name": f"document-{i}",
+            "owner": ObjectId(),
+            "status": "public" if i % 3 else "private",
+            "count": i,
+            "score": i / 7,
+            "tags": ["a", "b", "c"],
+        }
+        for i in range(count)
+    ]
+    return {"count": len(result), "result": result}
+
+
+def measure(encode, decode, response) -> dict:
+    body = encode(response)
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode(response)
+    encoded = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        decode(body)
+    decoded = time.perf_counter() - start
+    return {
+        "bytes/response": len(body),
+        "encode msec": round(encoded / ITERATIONS * 1e3, 2),
+        "decode msec": round(decoded / ITERATIONS * 1e3, 2),
+    }
+
+
+def main():
+    response = find_response(DOCUMENTS)
+    formats = [
+        ("json", dumps, json.loads),
+        ("bson", lambda r: bson.encode(r, codec_options=BSON_OPTIONS), bson.decode),
+    ]
+    if msgpack is not None:
+        formats.append(
+            (
+                "msgpack",
+                lambda r: msgpack.packb(r, default=msgpack_default),
+                lambda b: msgpack.unpackb(b, timestamp=3),
+            )
+        )
+    else:
+        print("msgpack is not installed, skipping the MessagePack format")
+    for name, encode, decode in formats:
+        print(f"{name:>10}: {measure(encode, decode, response)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Microbenchmark of encoding a 1k document `/find' response into JSON
+
+Run the benchmark:
+  python3 ./benchmarks/bench_jsonencoder.py
+"""
+
+import json
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# https://pymongo.readthedocs.io/en/stable/
+from bson.objectid import ObjectId
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mongo_jsonencoder import ExtendedJSONEncoder, dumps
+
+ITERATIONS = 50
+DOCUMENTS = 1000
+
+
+def find_response(count: int) -> dict:
+    """A `/find' response document with typical result documents"""
+    ctime = datetime(2025, 8, 1, tzinfo=timezone.utc)
+    result = [
+        {
+            "_id": ObjectId(),
+            "ctime": ctime + timedelta(minutes=i),
+            "mtime": ctime + timedelta(minutes=i, seconds=30),
+            "name": f"document-{i}",
+            "owner": ObjectId(),
+            "status": "public" if i % 3 else "private",
+            "count": i,
+            "score": i / 7,
+            "tags": ["a", "b", "c"],
+        }
+        for i in range(count)
+    ]
+    return {"count": len(result), "result": result}
+
+
+def extended_json_encoder(response) -> bytes:
+    """The encoding the handlers did before `dumps'"""
+    return (
+        json.dumps(
+            response,
+            indent=4,
+            separators=(",", ": "),
+            sort_keys=True,
+            cls=ExtendedJSONEncoder,
+        )
+        + "\n"
+    ).encode()
+
+
+def measure(encode, response) -> dict:
+    size = len(encode(response))
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        encode(response)
+    elapsed = time.perf_counter() - start
+    return {
+        "bytes/response": size,
+        "msec/response": round(elapsed / ITERATIONS * 1e3, 2),
+        "responses/sec": round(ITERATIONS / elapsed, 1),
+    }
+
+
+def main():
+    response = find_response(DOCUMENTS)
+    for name, encode in [
+        ("ExtendedJSONEncoder", extended_json_encoder),
+        ("dumps pretty", lambda response: dumps(response, pretty=True)),
+        ("dumps compact", dumps),
+    ]:
+        print(f"{name:>20}: {measure(encode, response)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Microbenchmark of parsing request arguments into a database query
+
+Run the benchmark:
+  python3 ./benchmarks/bench_query.py
+"""
+
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.httputil
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from mongo_query import QueryDefaults, parse_query
+from mongo_query_cache import QueryPlanCache
+
+ITERATIONS = 2000
+URIS = [
+    "/find",
+    "/find?status=$in:public,private&sort=-ctime&limit=50&skip=100",
+    "/find?name=$regex:foo&projection=name,ctime&count=$gte:5&ctime=$between:2025-08-01T00:00,2025-08-31T23:59",
+    "/count_documents?status=$in:public&owner=$ne:$none",
+]
+
+
+def request_handler_work(settings, request):
+    """The parsing a read route handler does for each request"""
+    spec = parse_query(settings, request)
+    if request.path.endswith("/count_documents"):
+        return spec.count_options()
+    return spec.find_options()
+
+
+def allocations(settings, request) -> int:
+    """Count the memory blocks allocated by the application code for a request
+
+    The locals and return value of every function are kept alive until the
+    count, so the temporary values of the parsing are counted as well.
+    """
+    kept = []
+
+    def keep(frame, event, arg):
+        if event == "return":
+            kept.append((arg, list(frame.f_locals.values())))
+
+    tracemalloc.start()
+    sys.setprofile(keep)
+    request_handler_work(settings, request)
+    sys.setprofile(None)
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    # Only count the blocks allocated by the application modules
+    snapshot = snapshot.filter_traces([tracemalloc.Filter(True, "*/mongo_*.py")])
+    return len(snapshot.traces)
+
+
+def measure(settings, requests):
+    # Warm up any caches
+    for request in requests:
+        request_handler_work(settings, request)
+
+    blocks = sum(allocations(settings, request) for request in requests)
+
+    # Peak memory used by a single request
+    tracemalloc.start()
+    peak = 0
+    for request in requests:
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        request_handler_work(settings, request)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for request in requests:
+        for _ in range(ITERATIONS):
+            request_handler_work(settings, request)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "allocations/request": round(blocks / len(requests), 1),
+        "peak bytes/request": peak,
+        "usec/request": round(elapsed / (len(requests) * ITERATIONS) * 1e6, 2),
+    }
+
+
+def main():
+    requests = [
+        tornado.httputil.HTTPServerRequest(method="GET", uri=uri) for uri in URIS
+    ]
+    defaults = {
+        "default_query_filter": {"ctime": "$lte:$now"},
+        "default_query_options": {"limit": 10, "sort": [["ctime", -1]]},
+    }
+    for name, settings in [
+        ("raw defaults", dict(defaults)),
+        ("compiled defaults", {"query_defaults": QueryDefaults(*defaults.values())}),
+        (
+            "query plan cache",
+            {
+                "query_defaults": QueryDefaults(*defaults.values()),
+                "query_plan_cache": QueryPlanCache(),
+            },
+        ),
+    ]:
+        print(f"{name:>20}: {measure(settings, requests)}")
+
+
+if __name__ == "__main__":
+    main()
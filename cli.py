@@ -68,6 +68,91 @@ if __name__ == "__main__":
         default=os.environ.get("MONGO_COLLECTION", "test"),
         help="Set the MongoDB document collection (Default to environment variable MONGO_COLLECTION or 'test')",
     )
+    parser.add_argument(
+        "--max-pool-size",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_MAX_POOL_SIZE"),
+        help="Set the maximum number of connections per server (Default: driver default 100) environment variable MONGO_MAX_POOL_SIZE",
+    )
+    parser.add_argument(
+        "--min-pool-size",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_MIN_POOL_SIZE"),
+        help="Set the minimum number of connections kept open per server (Default: driver default 0) environment variable MONGO_MIN_POOL_SIZE",
+    )
+    parser.add_argument(
+        "--max-idle-time-ms",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_MAX_IDLE_TIME_MS"),
+        help="Set the milliseconds a connection may stay idle in the pool (Default: no limit) environment variable MONGO_MAX_IDLE_TIME_MS",
+    )
+    parser.add_argument(
+        "--wait-queue-timeout-ms",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS"),
+        help="Set the milliseconds to wait for a pool connection (Default: no limit) environment variable MONGO_WAIT_QUEUE_TIMEOUT_MS",
+    )
+    parser.add_argument(
+        "--max-connecting",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_MAX_CONNECTING"),
+        help="Set the maximum number of connections opened at once per pool (Default: driver default 2) environment variable MONGO_MAX_CONNECTING",
+    )
+    parser.add_argument(
+        "--compressors",
+        metavar="<str>",
+        default=os.environ.get("MONGO_COMPRESSORS"),
+        help="Set the wire protocol compressors in order of preference, e.g. zstd,snappy,zlib (Default: none) environment variable MONGO_COMPRESSORS",
+    )
+    parser.add_argument(
+        "--read-preference",
+        metavar="<str>",
+        default=os.environ.get("MONGO_READ_PREFERENCE"),
+        help="Set the read preference: primary, primaryPreferred, secondary, secondaryPreferred or nearest (Default: primary) environment variable MONGO_READ_PREFERENCE",
+    )
+    parser.add_argument(
+        "--warm-up",
+        action="store_true",
+        default=os.environ.get("MONGO_WARM_UP", "") in ["1", "true"],
+        help="Run with a warm-up before listening: connect, ping, open --min-pool-size connections and run --warm-up-queries (Default: False)",
+    )
+    parser.add_argument(
+        "--warm-up-queries",
+        metavar="<str>",
+        default=os.environ.get("MONGO_WARM_UP_QUERIES", "[]"),
+        help='A JSON list of read requests to run during the warm-up, e.g. ["/find?status=public"] (Default: "[]")',
+    )
+    parser.add_argument(
+        "--health-interval",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_HEALTH_INTERVAL", "5"),
+        help="Set the seconds between background health probes (Default: 5)",
+    )
+    parser.add_argument(
+        "--health-timeout",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_HEALTH_TIMEOUT", "2"),
+        help="Set the seconds a health probe waits for the MongoDB ping (Default: 2)",
+    )
+    parser.add_argument(
+        "--collections",
+        metavar="<str>",
+        default=os.environ.get("MONGO_COLLECTIONS", "{}"),
+        help='A JSON document that allow-lists more collections served by /{database}/{collection}/ routes with their default query, e.g. {"shop.orders":{"default_query_filter":{"status":"open"}}} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--route-read-preferences",
+        metavar="<str>",
+        default=os.environ.get("MONGO_ROUTE_READ_PREFERENCES", "{}"),
+        help='A JSON document that sets the read preference per route and the modes a read_preference argument may select, e.g. {"count_documents":{"mode":"secondaryPreferred","max_staleness":120,"tags":[{"dc":"east"},{}],"allow":["primary"]}} (Default: "{}")',
+    )
     parser.add_argument(
         "--default-query-filter",
         metavar="<str>",
@@ -80,6 +165,115 @@ if __name__ == "__main__":
         default=os.environ.get("MONGO_QUERY_OPTIONS", "{}"),
         help='A JSON document that sets default query options (Default: "{}")',
     )
+    parser.add_argument(
+        "--field-types",
+        metavar="<str>",
+        default=os.environ.get("MONGO_FIELD_TYPES", "{}"),
+        help='A JSON document that declares field types, e.g. {"ctime":"datetime","count":"int"} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--now-window",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_NOW_WINDOW", "0"),
+        help="Round $now down to a window of seconds so queries can be shared, 0 to disable (Default: 0)",
+    )
+    parser.add_argument(
+        "--query-plan-cache-size",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_QUERY_PLAN_CACHE_SIZE", "512"),
+        help="Set the number of compiled query plans to cache, 0 to disable (Default: 512)",
+    )
+    parser.add_argument(
+        "--index-policy",
+        metavar="<str>",
+        default=os.environ.get("MONGO_INDEX_POLICY", "{}"),
+        help='A JSON document that sets the COLLSCAN policy per route, allow, warn or reject, e.g. {"find":"warn"} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--index-refresh-interval",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_INDEX_REFRESH_INTERVAL", "300"),
+        help="Set the seconds between loading the collection indexes, 0 to only load at startup (Default: 300)",
+    )
+    parser.add_argument(
+        "--explain-sample-rate",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_EXPLAIN_SAMPLE_RATE", "0"),
+        help="Set the percentage of queries to explain and log in the background (Default: 0)",
+    )
+    parser.add_argument(
+        "--route-timeouts",
+        metavar="<str>",
+        default=os.environ.get("MONGO_ROUTE_TIMEOUTS", "{}"),
+        help='A JSON document that sets the default request timeout in seconds per route, e.g. {"find":10} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--compression-min-size",
+        metavar="<int>",
+        type=int,
+        default=os.environ.get("MONGO_COMPRESSION_MIN_SIZE", "1024"),
+        help="Set the minimum response size in bytes to compress, 0 to disable (Default: 1024)",
+    )
+    parser.add_argument(
+        "--compression-level",
+        metavar="<str>",
+        default=os.environ.get("MONGO_COMPRESSION_LEVEL", "{}"),
+        help='A JSON document that sets the compression level per coding, e.g. {"gzip":6,"br":5,"zstd":3} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--cache-control",
+        metavar="<str>",
+        default=os.environ.get("MONGO_CACHE_CONTROL", "{}"),
+        help='A JSON document that sets the Cache-Control header per route, e.g. {"find":"max-age=5, stale-while-revalidate=30"} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--etag-probe",
+        metavar="<str>",
+        default=os.environ.get("MONGO_ETAG_PROBE", "{}"),
+        help='A JSON document that sets the field to probe for an ETag per route, e.g. {"find":"mtime"} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--response-cache",
+        metavar="<str>",
+        default=os.environ.get("MONGO_RESPONSE_CACHE", "{}"),
+        help='A JSON document that sets the response cache TTL (seconds) and max bytes per route, e.g. {"find":{"ttl":5,"max_bytes":16777216,"stale":30}} (Default: "{}")',
+    )
+    parser.add_argument(
+        "--hot-queries",
+        metavar="<str>",
+        default=os.environ.get("MONGO_HOT_QUERIES", "[]"),
+        help='A JSON list of read requests to preload into the response cache, e.g. ["/find?status=public"] (Default: "[]")',
+    )
+    parser.add_argument(
+        "--hot-query-interval",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_HOT_QUERY_INTERVAL", "60"),
+        help="Set the seconds between hot query preloads, 0 to preload at start only (Default: 60)",
+    )
+    parser.add_argument(
+        "--single-flight",
+        action="store_true",
+        default=os.environ.get("MONGO_SINGLE_FLIGHT", "") in ["1", "true"],
+        help="Run with identical concurrent /find and /count_documents queries sharing one database call (Default: False)",
+    )
+    parser.add_argument(
+        "--estimated-count",
+        action="store_true",
+        default=os.environ.get("MONGO_ESTIMATED_COUNT", "") in ["1", "true"],
+        help="Run with /count_documents of an empty filter from the collection metadata (Default: False)",
+    )
+    parser.add_argument(
+        "--count-staleness",
+        metavar="<float>",
+        type=float,
+        default=os.environ.get("MONGO_COUNT_STALENESS", "0"),
+        help="Set the seconds an approximate=1 count may be cached, 0 to disable (Default: 0)",
+    )
     parser.add_argument(
         "--admin",
         action="store_true",
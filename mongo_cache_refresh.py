@@ -0,0 +1,120 @@
+import asyncio
+import json
+import logging
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.httpclient
+import tornado.ioloop
+
+from mongo_response_cache import REFRESH_HEADER, REFRESH_TOKEN
+
+# Request headers a cached response depends on, copied to its refresh
+REFRESH_HEADERS = ("Accept",)
+
+
+def parse_hot_queries(hot_queries: str | list) -> list:
+    """Load the hot queries to preload ('["/find?status=public", ...]')"""
+    if isinstance(hot_queries, str):
+        hot_queries = json.loads(hot_queries)
+    if not isinstance(hot_queries, list) or not all(
+        isinstance(uri, str) and uri.startswith("/") for uri in hot_queries
+    ):
+        raise ValueError(f"Invalid hot queries: {hot_queries!r}")
+    return list(hot_queries)
+
+
+class CacheRefresher:
+    """Refresh cached responses by requesting them from this process
+
+    The refresh requests go through the read handlers with the secret
+    `X-Cache-Refresh' header of the process, so they are queried, encoded
+    and stored like any other response. Stale responses are refreshed once
+    per key at a time, the hot queries are preloaded at start and every
+    `interval' seconds.
+    """
+
+    def __init__(self, hot_queries: list | None = None, interval: float = 60):
+        self.hot_queries = hot_queries or []
+        self.interval = float(interval)
+        self.base_url = None
+        self.periodic_callback = None
+        # Cache keys being refreshed
+        self.refreshing = set()
+        self.refreshed = 0
+        self.preloaded = 0
+        self.errors = 0
+
+    def start(self, base_url: str):
+        """Preload the hot queries now and every `interval' seconds"""
+        self.base_url = base_url.rstrip("/")
+        if not self.hot_queries:
+            return
+        tornado.ioloop.IOLoop.current().spawn_callback(self.preload)
+        if self.interval > 0:
+            self.periodic_callback = tornado.ioloop.PeriodicCallback(
+                self.preload, self.interval * 1000
+            )
+            self.periodic_callback.start()
+
+    def stop(self):
+        if self.periodic_callback is not None:
+            self.periodic_callback.stop()
+
+    async def fetch(self, uri: str, headers: dict | None = None) -> bool:
+        """Request a read route of this process to refresh its cached response"""
+        prefix = f"{Path(__file__).name} - CacheRefresher.fetch()"  # log message prefix
+
+        headers = dict(headers or {})
+        headers[REFRESH_HEADER] = REFRESH_TOKEN
+        # https://www.tornadoweb.org/en/stable/httpclient.html#tornado.httpclient.AsyncHTTPClient.fetch
+        try:
+            response = await tornado.httpclient.AsyncHTTPClient().fetch(
+                f"{self.base_url}{uri}", headers=headers, raise_error=False
+            )
+        except (OSError, tornado.httpclient.HTTPClientError) as err:
+            logging.warning(f"{prefix} - {uri}: {err!r}")
+            self.errors += 1
+            return False
+        if response.code != 200:
+            logging.warning(f"{prefix} - {uri}: {response.code}")
+            self.errors += 1
+            return False
+        logging.debug(f"{prefix} - {uri}: {response.request_time:0.3f}s")
+        return True
+
+    async def preload(self):
+        """Load the hot queries into the response cache"""
+        results = await asyncio.gather(*[self.fetch(uri) for uri in self.hot_queries])
+        self.preloaded += sum(results)
+
+    def revalidate(self, key, request):
+        """Refresh a stale response in the background, once per key"""
+        if self.base_url is None or key in self.refreshing:
+            return
+        self.refreshing.add(key)
+        headers = {
+            name: request.headers[name]
+            for name in REFRESH_HEADERS
+            if name in request.headers
+        }
+        tornado.ioloop.IOLoop.current().spawn_callback(
+            self._revalidate, key, request.uri, headers
+        )
+
+    async def _revalidate(self, key, uri: str, headers: dict):
+        try:
+            if await self.fetch(uri, headers):
+                self.refreshed += 1
+        finally:
+            self.refreshing.discard(key)
+
+    def stats(self) -> dict:
+        return {
+            "hot_queries": len(self.hot_queries),
+            "interval": self.interval,
+            "preloaded": self.preloaded,
+            "refreshed": self.refreshed,
+            "refreshing": len(self.refreshing),
+            "errors": self.errors,
+        }
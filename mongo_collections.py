@@ -0,0 +1,134 @@
+import json
+import logging
+from collections import ChainMap
+from pathlib import Path
+
+from mongo_indexes import IndexCatalog
+from mongo_operator import parse_field_types
+from mongo_query import QueryDefaults
+from mongo_query_cache import QueryPlanCache
+
+# Options of a collection in the allow-list
+COLLECTION_OPTIONS = ("default_query_filter", "default_query_options", "field_types")
+
+
+def parse_collections(collections: str | dict) -> dict:
+    """Load the collection allow-list ('{"db.collection": {options}, ...}')
+
+    The options of a collection are its `default_query_filter',
+    `default_query_options' and `field_types'.
+    """
+    if isinstance(collections, str):
+        collections = json.loads(collections)
+    allowed = {}
+    for namespace, options in collections.items():
+        database, _, collection = namespace.partition(".")
+        if not database or not collection:
+            raise ValueError(f"Invalid collection namespace: {namespace!r}")
+        if not isinstance(options, dict) or set(options) - set(COLLECTION_OPTIONS):
+            raise ValueError(
+                f"Invalid collection options: {options!r} for: {namespace!r}"
+            )
+        allowed[(database, collection)] = options
+    return allowed
+
+
+class CollectionRegistry:
+    """The allow-listed collections and their settings, built once
+
+    Each collection has its own cached collection handle, compiled default
+    query, query plan cache, index catalog and query shape recorder (made
+    by `query_shapes'), over the one shared client.
+    """
+
+    def __init__(
+        self,
+        get_collection,
+        collections: dict,
+        now_window: float = 0,
+        query_plan_cache_size: int = 512,
+        query_shapes=None,
+    ):
+        self.namespaces = {}
+        for (database, name), options in collections.items():
+            collection = get_collection(database, name)
+            default_query_filter = options.get("default_query_filter", {})
+            default_query_options = options.get("default_query_options", {})
+            field_types = parse_field_types(options.get("field_types", {}))
+            self.namespaces[(database, name)] = {
+                "namespace": f"{database}.{name}",
+                "collection": collection,
+                "default_query_filter": default_query_filter,
+                "default_query_options": default_query_options,
+                "field_types": field_types,
+                "query_defaults": QueryDefaults(
+                    default_query_filter,
+                    default_query_options,
+                    now_window=now_window,
+                    field_types=field_types,
+                ),
+                "query_plan_cache": QueryPlanCache(maxsize=query_plan_cache_size)
+                if query_plan_cache_size > 0
+                else None,
+                "index_catalog": IndexCatalog(),
+                "query_shapes": query_shapes() if query_shapes is not None else None,
+            }
+
+    def __repr__(self):
+        return f"CollectionRegistry({[ns['namespace'] for ns in self]!r})"
+
+    def __iter__(self):
+        return iter(self.namespaces.values())
+
+    def get(self, database: str, collection: str) -> dict | None:
+        """Return the settings of an allow-listed collection or None"""
+        return self.namespaces.get((database, collection))
+
+    def start(self, interval: float = 300):
+        """Load the indexes of every collection and refresh them periodically"""
+        for namespace in self:
+            namespace["index_catalog"].start(namespace["collection"], interval=interval)
+
+    def stats(self) -> dict:
+        return {
+            namespace["namespace"]: {
+                "query_plan_cache": namespace["query_plan_cache"].stats()
+                if namespace["query_plan_cache"] is not None
+                else None
+            }
+            for namespace in self
+        }
+
+
+class CollectionMixin:
+    """Serve a RequestHandler route for the collection named in its path
+
+    The `database' and `collection' path arguments select an allow-listed
+    collection whose settings take precedence over the application
+    settings for this request. Routes without them use the application
+    collection.
+    """
+
+    collection_settings = None
+
+    @property
+    def settings(self):
+        if self.collection_settings is not None:
+            return self.collection_settings
+        return self.application.settings
+
+    def prepare(self):
+        name = f"{Path(__file__).name} -"
+
+        database = self.path_kwargs.get("database")
+        collection = self.path_kwargs.get("collection")
+        if database is None or collection is None:
+            return
+        registry = self.application.settings.get("collections")
+        namespace = registry.get(database, collection) if registry else None
+        if namespace is None:
+            logging.warning(f"{name} prepare - not allowed: {database}.{collection}")
+            self.set_status(404)
+            self.finish()
+            return
+        self.collection_settings = ChainMap(namespace, self.application.settings)
@@ -0,0 +1,160 @@
+import datetime
+import io
+
+# https://pymongo.readthedocs.io/en/stable/
+import bson
+import bson.objectid
+
+from mongo_jsonencoder import dumps
+
+# Optional Apache Arrow IPC response format
+# https://arrow.apache.org/docs/python/ipc.html
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+
+# Media type of the Arrow IPC streaming format
+# https://www.iana.org/assignments/media-types/application/vnd.apache.arrow.stream
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# Arrow types of the declared field types (see FIELD_TYPE_PARSERS)
+ARROW_TYPES = {
+    "bool": "bool_",
+    "date": "timestamp_ms",
+    "datetime": "timestamp_ms",
+    "float": "float64",
+    "int": "int64",
+    "objectid": "string",
+    "str": "string",
+}
+
+
+def columnar(documents) -> dict:
+    """Turn a list of documents into columns of the (top level) fields
+
+    [{'a': 1, 'b': 2}, {'a': 3}] ---> {
+        'fields': ['a', 'b'],
+        'columns': {'a': [1, 3], 'b': [2, None]},
+    }
+    """
+    fields = {}
+    for document in documents:
+        for field in document:
+            fields.setdefault(field, None)
+    return {
+        "fields": list(fields),
+        "columns": {
+            field: [document.get(field) for document in documents] for field in fields
+        },
+    }
+
+
+def _arrow_type(name: str):
+    if name == "timestamp_ms":
+        return pyarrow.timestamp("ms")
+    return getattr(pyarrow, name)()
+
+
+def _guess_type(value):
+    match value:
+        case bool():
+            return "bool_"
+        case int():
+            return "int64"
+        case float():
+            return "float64"
+        case datetime.datetime():
+            return "timestamp_ms"
+        case _:
+            return "string"
+
+
+def arrow_schema(documents, field_types: dict | None = None):
+    """Infer an Arrow schema from the first documents and declared field types
+
+    Undeclared fields take the type of their first non null value, nested
+    documents, arrays and other BSON types are strings.
+    """
+    field_types = field_types or {}
+    types = {field: ARROW_TYPES[name] for field, name in field_types.items()}
+    fields = {}
+    for document in documents:
+        for field, value in document.items():
+            if fields.get(field) is None:
+                fields[field] = types.get(field) or (
+                    _guess_type(value) if value is not None else None
+                )
+    for field, arrow_type in types.items():
+        fields.setdefault(field, arrow_type)
+    return pyarrow.schema(
+        [(field, _arrow_type(name or "string")) for field, name in fields.items()]
+    )
+
+
+def _scalar(value, arrow_type):
+    try:
+        return pyarrow.scalar(value, type=arrow_type).as_py()
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+        return None
+
+
+def _string(value):
+    # ObjectId as a hex string, nested documents and arrays as JSON
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, bson.objectid.ObjectId):
+        return str(value)
+    return dumps(value)[:-1].decode("utf-8")
+
+
+def _column(values, arrow_type):
+    if pyarrow.types.is_string(arrow_type):
+        values = [_string(value) for value in values]
+    try:
+        return pyarrow.array(values, type=arrow_type)
+    except (pyarrow.ArrowInvalid, pyarrow.ArrowTypeError, OverflowError):
+        # Values of another type than the schema are nulls
+        return pyarrow.array(
+            [_scalar(value, arrow_type) for value in values], type=arrow_type
+        )
+
+
+class ArrowStream:
+    """Encode batches of documents into an Arrow IPC stream"""
+
+    def __init__(self, field_types: dict | None = None):
+        self.field_types = field_types
+        self.schema = None
+        self.sink = io.BytesIO()
+        self.writer = None
+
+    def _drain(self) -> bytes:
+        data = self.sink.getvalue()
+        self.sink.seek(0)
+        self.sink.truncate()
+        return data
+
+    def batch(self, documents) -> bytes:
+        """Encode a batch of documents, the first batch also sets the schema"""
+        if self.writer is None:
+            self.schema = arrow_schema(documents, self.field_types)
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+        columns = [
+            _column([document.get(field.name) for document in documents], field.type)
+            for field in self.schema
+        ]
+        self.writer.write_batch(
+            pyarrow.RecordBatch.from_arrays(columns, schema=self.schema)
+        )
+        return self._drain()
+
+    def close(self) -> bytes:
+        """End the stream, an empty stream has the declared field types only"""
+        if self.writer is None:
+            self.schema = arrow_schema([], self.field_types)
+            self.writer = pyarrow.ipc.new_stream(self.sink, self.schema)
+        self.writer.close()
+        return self._drain()
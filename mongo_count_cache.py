@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+
+def estimated_count(settings, query: dict) -> bool:
+    """Return True when a count can use the collection metadata
+
+    Only a count of the whole collection (an empty filter, no hint) can be
+    answered by `estimated_document_count', enabled by `estimated_count'.
+    """
+    return (
+        bool(settings.get("estimated_count", False))
+        and query.get("filter") == {}
+        and "hint" not in query
+    )
+
+
+class CountCache:
+    """Counts per filter served up to `staleness' seconds old
+
+    A count older than half its staleness is refreshed in the background
+    while the cached count is served, a count past its staleness is not
+    served anymore. A refresh runs outside the context of the request that
+    triggered it, so the `pymongo.timeout' of its deadline does not apply.
+    """
+
+    def __init__(self, staleness: float = 60.0, maxsize: int = 1024):
+        self.staleness = float(staleness)
+        self.maxsize = int(maxsize)
+        # {key: (count, counted at)}
+        self.counts = OrderedDict()
+        # {key: asyncio.Task} of the background refreshes
+        self.refreshes = {}
+        self.hits = 0
+        self.misses = 0
+        self.refreshed = 0
+        self.errors = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def store(self, key, count: int, now: float | None = None):
+        self.counts[key] = (count, time.monotonic() if now is None else now)
+        self.counts.move_to_end(key)
+        while len(self.counts) > self.maxsize:
+            self.counts.popitem(last=False)
+
+    def _refreshed(self, key, task: asyncio.Task):
+        prefix = (
+            f"{Path(__file__).name} - CountCache._refreshed()"  # log message prefix
+        )
+
+        self.refreshes.pop(key, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.errors += 1
+            logging.warning(f"{prefix} - {key!r}: {task.exception()!r}")
+            return
+        self.refreshed += 1
+        self.store(key, task.result())
+
+    def refresh(self, key, factory):
+        """Count again in the background, once per key at a time"""
+        if key not in self.refreshes:
+            # https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.create_task
+            task = asyncio.get_running_loop().create_task(
+                factory(), context=contextvars.Context()
+            )
+            task.add_done_callback(lambda task: self._refreshed(key, task))
+            self.refreshes[key] = task
+
+    async def count(
+        self, key, factory, now: float | None = None, refresh=None
+    ) -> tuple:
+        """Return (count, exact), a cached count is not exact
+
+        `factory()' counts for the request, `refresh()' (default `factory')
+        counts in the background without the deadline of the request.
+        """
+        now = time.monotonic() if now is None else now
+        cached = self.counts.get(key)
+        if cached is not None and now - cached[1] <= self.staleness:
+            self.hits += 1
+            self.counts.move_to_end(key)
+            if now - cached[1] > self.staleness / 2:
+                self.refresh(key, refresh or factory)
+            return cached[0], False
+        self.misses += 1
+        count = await factory()
+        self.store(key, count, now)
+        return count, True
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.counts),
+            "maxsize": self.maxsize,
+            "staleness": self.staleness,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshed": self.refreshed,
+            "refreshing": len(self.refreshes),
+            "errors": self.errors,
+        }
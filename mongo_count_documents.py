@@ -1,16 +1,42 @@
 import logging
-import json
 
 from pathlib import Path
 
 # https://www.tornadoweb.org/en/stable/
 import tornado.web
 
-from mongo_jsonencoder import ExtendedJSONEncoder
-from mongo_query import build_query
+from mongo_collections import CollectionMixin
+from mongo_count_cache import estimated_count
+from mongo_deadline import DeadlineExceeded, DeadlineMixin
+from mongo_explain import sample_explain
+from mongo_formats import encode_response, response_format
+from mongo_http_cache import not_modified, probe_etag, set_cache_control
+from mongo_index_advisor import query_shape
+from mongo_indexes import check_index_policy
+from mongo_jsonencoder import want_pretty
+from mongo_query import parse_query
+from mongo_read_preference import route_read_preference, with_read_preference
+from mongo_response import write_response
+from mongo_response_cache import (
+    DEADLINE_OPTIONS,
+    CachedHeadersMixin,
+    cache_key,
+    cached_route,
+)
+from mongo_single_flight import coalesce
 
 
-class CountDocumentsHandler(tornado.web.RequestHandler):
+class CountDocumentsHandler(
+    CachedHeadersMixin, CollectionMixin, DeadlineMixin, tornado.web.RequestHandler
+):
+    query_shape = None
+
+    def on_finish(self):
+        # Record the query shape and request latency for the index advisor
+        recorder = self.settings.get("query_shapes")
+        if recorder is not None and self.query_shape is not None:
+            recorder.record(self.query_shape, self.request.request_time())
+
     async def get(self, *args, **kwargs):
         """Count documents in a collection matching a query"""
         name = f"{Path(__file__).name} -"
@@ -29,37 +55,124 @@ class CountDocumentsHandler(tornado.web.RequestHandler):
 
         # Build the database query for this request
         try:
-            query = build_query(self.settings, self.request)
-            logging.debug(f"{name} get - query: {query!r}")
+            spec = parse_query(self.settings, self.request)
+            logging.debug(f"{name} get - spec: {spec!r}")
+            # Apply the index policy of the route
+            route = "count_documents"
+            index_usage = check_index_policy(self.settings, route, spec)
+            logging.debug(f"{name} get - index_usage: {index_usage!r}")
+            self.query_shape = query_shape(spec, route)
+            # Limit the query to the deadline of the request
+            self.set_deadline(route, spec)
+            # Read with the read preference of the route or the request
+            preference = route_read_preference(self, route)
         except ValueError as err:
             logging.warning(f"{name} get - {err!r}")
             self.set_status(400)
             return
         except BaseException:
             raise
+        collection = with_read_preference(self, collection, preference)
         # While skip and limit are valid options, only keep the filter
-        query = {"filter": query.get("filter", {})}
+        query = spec.count_options()
         logging.info(
             f"{collection.database.name}.{collection.name}.count_documents({query!r})"
         )
 
+        # Conditional requests, a matching ETag probe skips the query
+        set_cache_control(self, route)
+        # `approximate=1' accepts a cached count up to the count staleness
+        approximate = self.get_argument("approximate", "") in ["1", "true"]
+        # Responses cached by query and format
+        cached = cached_route(
+            self,
+            route,
+            query,
+            response_format(self),
+            want_pretty(self),
+            approximate,
+            preference.name if preference else None,
+        )
+        if cached is not None and cached.entry is not None:
+            await cached.write(self)
+            return
+        # Explain a sample of the queries that reach the database
+        sample_explain(self.settings, collection, route, spec)
+        try:
+            etag = await self.run_with_deadline(
+                probe_etag(self, collection, route, spec)
+            )
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(504)
+            return
+        if etag is not None and not_modified(self, etag):
+            return
+
         # Query the database for matching documents
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.count_documents
-        count = await collection.count_documents(**query)
+        def count_documents():
+            # Identical concurrent queries share one database call
+            return coalesce(
+                self,
+                route,
+                query,
+                lambda query: collection.count_documents(**query),
+                preference.name if preference else None,
+            )
+
+        def refresh_count():
+            # Background refreshes of the count cache run without the deadline
+            # of the request that triggered them
+            return collection.count_documents(
+                **{
+                    option: value
+                    for option, value in query.items()
+                    if option not in DEADLINE_OPTIONS
+                }
+            )
+
+        count_cache = self.settings.get("count_cache")
+        exact = True
+        try:
+            if estimated_count(self.settings, query):
+                # The count of the whole collection from its metadata
+                # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.estimated_document_count
+                options = (
+                    {"maxTimeMS": query["maxTimeMS"]} if "maxTimeMS" in query else {}
+                )
+                count = await self.run_with_deadline(
+                    collection.estimated_document_count(**options)
+                )
+                exact = False
+            elif approximate and count_cache is not None:
+                count, exact = await self.run_with_deadline(
+                    count_cache.count(
+                        cache_key(
+                            route, query, namespace=self.settings.get("namespace")
+                        ),
+                        count_documents,
+                        refresh=refresh_count,
+                    )
+                )
+            else:
+                count = await self.run_with_deadline(count_documents())
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(504)
+            return
+        self.set_header("X-Count-Exact", "true" if exact else "false")
         response.update(count=count)
         if self.settings.get("debug", False):
             self.set_header("X-Debug", "route=CountDocumentskHandler.get")
             response.update(database=collection.database.name)
             response.update(collection=collection.name)
+            response.update(index_usage=index_usage)
             response.update(query=query)
-        # Normalize the response into a JSON formatted response
+        # Normalize the response into the format the client accepts, JSON by default
         self.set_header("Server", "Python/Tornado/MongoClient")
-        self.set_header("Content-Type", "text/json")
-        response = json.dumps(
-            response,
-            indent=4,
-            separators=(",", ": "),
-            sort_keys=True,
-            cls=ExtendedJSONEncoder,
-        )
-        self.write(response + "\n")
+        body = encode_response(self, response, pretty=want_pretty(self))
+        if cached is not None:
+            await cached.store(self, body, etag=etag)
+            return
+        await write_response(self, body, etag=etag)
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from pathlib import Path
+
+# https://pymongo.readthedocs.io/en/stable/
+import pymongo
+import pymongo.errors
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.web
+
+
+class DeadlineExceeded(Exception):
+    """The request deadline passed before or while querying the database"""
+
+
+def parse_route_timeouts(route_timeouts: str | dict) -> dict:
+    """Load and validate route timeouts in seconds ('{"find": 10, ...}')"""
+    if isinstance(route_timeouts, str):
+        route_timeouts = json.loads(route_timeouts)
+    for route, timeout in route_timeouts.items():
+        if (
+            not isinstance(timeout, (int, float))
+            or not math.isfinite(timeout)
+            or timeout <= 0
+        ):
+            raise ValueError(f"Invalid timeout: {timeout!r} for route: {route!r}")
+    return dict(route_timeouts)
+
+
+def request_timeout(settings, route: str, request) -> float | None:
+    """Return the timeout (seconds) of a request to a route or None
+
+    An `X-Request-Timeout' header may shorten, but never extend, the default
+    timeout of the route.
+    """
+    timeout = settings.get("route_timeouts", {}).get(route)
+    header = request.headers.get("X-Request-Timeout")
+    if header is not None:
+        header = float(header)
+        # A timeout of `inf' or `nan' is not a deadline
+        if not math.isfinite(header) or header <= 0:
+            raise ValueError(f"Invalid X-Request-Timeout: {header!r}")
+        timeout = header if timeout is None else min(timeout, header)
+    return timeout
+
+
+class DeadlineMixin:
+    """Run database operations of a RequestHandler within the request deadline
+
+    The operation is cancelled when the client closes the connection.
+    """
+
+    deadline = None
+    mongo_task = None
+    cancelled = False
+
+    def set_deadline(self, route: str, spec=None):
+        """Set the request deadline of the route and the spec `max_time_ms'"""
+        timeout = request_timeout(self.settings, route, self.request)
+        if timeout is None:
+            return
+        # The deadline counts from the start of the request
+        self.deadline = time.time() - self.request.request_time() + timeout
+        if spec is not None:
+            spec.max_time_ms = max(int(self.remaining() * 1000), 1)
+
+    def remaining(self) -> float | None:
+        """Return the seconds left before the request deadline"""
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time()
+
+    async def run_with_deadline(self, awaitable):
+        """Await a database operation within the remaining request deadline"""
+        prefix = f"{Path(__file__).name} - run_with_deadline()"  # log message prefix
+
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("Request deadline exceeded")
+        # https://pymongo.readthedocs.io/en/stable/api/pymongo/index.html#pymongo.timeout
+        with pymongo.timeout(remaining):
+            # The task copies the context and with it the pymongo timeout
+            self.mongo_task = asyncio.ensure_future(awaitable)
+            try:
+                return await self.mongo_task
+            except asyncio.CancelledError:
+                if not self.cancelled:
+                    raise
+                # Nobody is listening anymore, log as nginx `Client Closed Request'
+                self.set_status(499, "Client Closed Request")
+                raise tornado.web.Finish()
+            except TimeoutError as err:
+                # The wait for a shared database call timed out
+                raise DeadlineExceeded("Request deadline exceeded") from err
+            except pymongo.errors.PyMongoError as err:
+                if err.timeout:
+                    logging.warning(f"{prefix} - {err!r}")
+                    raise DeadlineExceeded(str(err)) from err
+                raise
+            finally:
+                self.mongo_task = None
+
+    def on_connection_close(self):
+        # Cancel the in-flight database operation of an abandoned request
+        if self.mongo_task is not None and not self.mongo_task.done():
+            logging.info(
+                f"{Path(__file__).name} - on_connection_close() - cancelled: {self.request.uri}"
+            )
+            self.cancelled = True
+            self.mongo_task.cancel()
+        super().on_connection_close()
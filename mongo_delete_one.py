@@ -1,5 +1,4 @@
 import logging
-import json
 
 from pathlib import Path
 
@@ -10,10 +9,12 @@ from bson.errors import InvalidId
 # https://www.tornadoweb.org/en/stable/
 import tornado.web
 
-from mongo_jsonencoder import ExtendedJSONEncoder
+from mongo_collections import CollectionMixin
+from mongo_formats import encode_response
+from mongo_http_cache import bump_write_generation
 
 
-class DeleteOneHandler(tornado.web.RequestHandler):
+class DeleteOneHandler(CollectionMixin, tornado.web.RequestHandler):
     async def get(self, *args, **kwargs):
         """Delete a single document matching the filter"""
         name = f"{Path(__file__).name} -"
@@ -51,6 +52,7 @@ class DeleteOneHandler(tornado.web.RequestHandler):
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.delete_one
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/results.html#pymongo.results.DeleteResult
         result = await collection.delete_one(**document)
+        bump_write_generation(self.settings)
         response.update(count=1)
         response.update(result=[result])
         if self.settings.get("debug", False):
@@ -58,14 +60,8 @@ class DeleteOneHandler(tornado.web.RequestHandler):
             response.update(database=collection.database.name)
             response.update(collection=collection.name)
             response.update(document=document)
-        # Normalize the response into a JSON formatted response
+        # Normalize the response into the format the client accepts, JSON by default
         self.set_header("Server", "Python/Tornado/MongoClient")
-        self.set_header("Content-Type", "text/json")
-        response = json.dumps(
-            response,
-            indent=4,
-            separators=(",", ": "),
-            sort_keys=True,
-            cls=ExtendedJSONEncoder,
+        self.write(
+            encode_response(self, response, pretty=self.settings.get("debug", False))
         )
-        self.write(response + "\n")
@@ -0,0 +1,190 @@
+import logging
+import random
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.ioloop
+import tornado.web
+
+# https://pymongo.readthedocs.io/en/stable/
+from pymongo.errors import PyMongoError
+
+from mongo_collections import CollectionMixin
+from mongo_deadline import DeadlineExceeded, DeadlineMixin
+from mongo_indexes import check_index_policy
+from mongo_jsonencoder import dumps, want_pretty
+from mongo_query import parse_query
+from mongo_read_preference import route_read_preference, with_read_preference
+from mongo_response import write_response
+
+
+# `AsyncCollection.find' keyword arguments ---> `find' command fields
+# https://www.mongodb.com/docs/manual/reference/command/find/
+FIND_COMMAND_FIELDS = {
+    "allow_disk_use": "allowDiskUse",
+    "allow_partial_results": "allowPartialResults",
+    "batch_size": "batchSize",
+    "max_time_ms": "maxTimeMS",
+    "no_cursor_timeout": "noCursorTimeout",
+    "return_key": "returnKey",
+    "show_record_id": "showRecordId",
+}
+
+
+def find_command(collection, spec) -> dict:
+    """Build the `find' command the find routes run for a QuerySpec"""
+    command = {"find": collection.name}
+    for option, value in spec.find_options().items():
+        if option in ["sort", "hint"] and isinstance(value, list):
+            value = dict(value)
+        elif option == "projection" and isinstance(value, list):
+            value = dict.fromkeys(value, 1)
+        command[FIND_COMMAND_FIELDS.get(option, option)] = value
+    return command
+
+
+def count_command(collection, spec) -> dict:
+    """Build the aggregate command `count_documents' runs for a QuerySpec"""
+    options = spec.count_options()
+    # `count_documents' runs an aggregation pipeline with the other options
+    # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.count_documents
+    command = {
+        "aggregate": collection.name,
+        "pipeline": [
+            {"$match": options.pop("filter")},
+            {"$group": {"_id": 1, "n": {"$sum": 1}}},
+        ],
+        "cursor": {},
+    }
+    command.update(options)
+    return command
+
+
+def summarize(explain: dict) -> dict:
+    """Summarize the winning plan and execution stats of an explain result"""
+    # Aggregation pipelines wrap the query in a `$cursor' stage
+    if "stages" in explain:
+        explain = explain["stages"][0].get("$cursor", {})
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    # The slot based execution engine nests the plan as `queryPlan'
+    plan = winning_plan.get("queryPlan", winning_plan)
+    stages, indexes = [], []
+    while plan:
+        stages.append(plan.get("stage", "-"))
+        if plan.get("indexName"):
+            indexes.append(plan["indexName"])
+        plan = plan.get("inputStage")
+    stats = explain.get("executionStats", {})
+    return {
+        "stage": stages[0] if stages else "-",
+        "stages": stages,
+        "indexes": indexes,
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+        "server_time_ms": stats.get("executionTimeMillis"),
+    }
+
+
+async def explain_query(collection, route: str, spec) -> dict:
+    """Run the query of a route for a QuerySpec through explain
+
+    The execution stats of the winning plan only (`executionStats'), on the
+    members the collection reads from.
+    """
+    if route == "count_documents":
+        command = count_command(collection, spec)
+    else:
+        command = find_command(collection, spec)
+    # https://www.mongodb.com/docs/manual/reference/command/explain/
+    # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/database.html#pymongo.asynchronous.database.AsyncDatabase.command
+    return await collection.database.command(
+        {"explain": command, "verbosity": "executionStats"},
+        read_preference=collection.read_preference,
+    )
+
+
+def sample_explain(settings, collection, route: str, spec):
+    """Explain a percentage (`explain_sample_rate') of live queries in the background"""
+    rate = settings.get("explain_sample_rate", 0)
+    if rate <= 0 or random.random() * 100 >= rate:  # nosec B311
+        return
+
+    async def explain():
+        prefix = f"{Path(__file__).name} - sample_explain()"  # log message prefix
+        try:
+            summary = summarize(await explain_query(collection, route, spec))
+        except PyMongoError as err:
+            logging.warning(f"{prefix} - {err!r}")
+            return
+        logging.info(f"{prefix} - {route}({spec!r}) explain: {summary!r}")
+
+    tornado.ioloop.IOLoop.current().spawn_callback(explain)
+
+
+class ExplainHandler(CollectionMixin, DeadlineMixin, tornado.web.RequestHandler):
+    async def get(self, route, *args, **kwargs):
+        """Explain the query `find', `find_one' or `count_documents' would run"""
+        name = f"{Path(__file__).name} -"
+        logging.debug(f"{name} get - route: {route!r}")
+        logging.debug(f"{name} get - *args: {args!r}")
+        logging.debug(f"{name} get - **kwargs: {kwargs!r}")
+
+        # Default response document
+        response = {
+            "count": 0,
+            "result": [],
+        }
+
+        # Use the application database document collection
+        # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html
+        collection = self.settings.get("collection")
+
+        # Build the database query for this request exactly as the route does
+        try:
+            spec = parse_query(self.settings, self.request)
+            logging.debug(f"{name} get - spec: {spec!r}")
+            # Apply the index policy of the route
+            index_usage = check_index_policy(self.settings, route, spec)
+            logging.debug(f"{name} get - index_usage: {index_usage!r}")
+            # Limit the explained query to the deadline of the request
+            self.set_deadline(route, spec)
+            # Explain on the members the route reads from
+            preference = route_read_preference(self, route)
+        except ValueError as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(400)
+            return
+        except BaseException:
+            raise
+        collection = with_read_preference(self, collection, preference)
+        logging.info(
+            f"{collection.database.name}.{collection.name}.{route}({spec!r}).explain()"
+        )
+
+        try:
+            explain = await self.run_with_deadline(
+                explain_query(collection, route, spec)
+            )
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(504)
+            return
+        response.update(count=1)
+        response.update(result=[summarize(explain)])
+        # Only include the full explain output when not in summary mode
+        if self.get_argument("summary", "") not in ["1", "true"]:
+            response.update(explain=explain)
+        if self.settings.get("debug", False):
+            self.set_header("X-Debug", "route=ExplainHandler.get")
+            response.update(database=collection.database.name)
+            response.update(collection=collection.name)
+            response.update(index_usage=index_usage)
+            if route == "count_documents":
+                response.update(command=count_command(collection, spec))
+            else:
+                response.update(command=find_command(collection, spec))
+        # Normalize the response into a JSON formatted response (pretty when asked)
+        self.set_header("Server", "Python/Tornado/MongoClient")
+        self.set_header("Content-Type", "text/json")
+        await write_response(self, dumps(response, pretty=want_pretty(self)))
@@ -1,16 +1,64 @@
 import logging
-import json
 
 from pathlib import Path
 
 # https://www.tornadoweb.org/en/stable/
 import tornado.web
 
-from mongo_jsonencoder import ExtendedJSONEncoder
-from mongo_query import build_query
+from mongo_collections import CollectionMixin
+from mongo_columnar import ARROW_STREAM, ArrowStream, columnar, pyarrow
+from mongo_deadline import DeadlineExceeded, DeadlineMixin
+from mongo_explain import sample_explain
+from mongo_formats import encode_response, response_format
+from mongo_http_cache import not_modified, probe_etag, set_cache_control
+from mongo_index_advisor import query_shape
+from mongo_indexes import check_index_policy
+from mongo_jsonencoder import dumps, want_pretty
+from mongo_pagination import encode_token, next_url
+from mongo_query import parse_query
+from mongo_read_preference import route_read_preference, with_read_preference
+from mongo_response import write_response
+from mongo_response_cache import CachedHeadersMixin, cached_route
+from mongo_single_flight import coalesce
 
 
-class FindHandler(tornado.web.RequestHandler):
+# Media type of newline delimited JSON, one document per line
+# https://github.com/ndjson/ndjson-spec
+NDJSON = "application/x-ndjson"
+# Documents read, encoded and flushed at a time when streaming
+STREAM_BATCH_SIZE = 100
+
+
+# Values of the `format' argument
+FORMATS = ("", "json", "columnar", "arrow")
+
+
+def stream_format(handler) -> str | None:
+    """Stream `ndjson' with `Accept: application/x-ndjson', `json' with `stream=1'
+
+    `arrow' with `format=arrow' or `Accept: application/vnd.apache.arrow.stream'
+    """
+    accept = handler.request.headers.get("Accept", "")
+    if handler.get_argument("format", "") == "arrow" or ARROW_STREAM in accept:
+        return "arrow"
+    if NDJSON in accept:
+        return "ndjson"
+    if handler.get_argument("stream", "") in ["1", "true"]:
+        return "json"
+    return None
+
+
+class FindHandler(
+    CachedHeadersMixin, CollectionMixin, DeadlineMixin, tornado.web.RequestHandler
+):
+    query_shape = None
+
+    def on_finish(self):
+        # Record the query shape and request latency for the index advisor
+        recorder = self.settings.get("query_shapes")
+        if recorder is not None and self.query_shape is not None:
+            recorder.record(self.query_shape, self.request.request_time())
+
     async def get(self, *args, **kwargs):
         """Selects one or more documents in a collection matching a query"""
         name = f"{Path(__file__).name} -"
@@ -29,37 +77,190 @@ class FindHandler(tornado.web.RequestHandler):
 
         # Build the database query for this request
         try:
-            query = build_query(self.settings, self.request)
-            logging.debug(f"{name} get - query: {query!r}")
+            spec = parse_query(self.settings, self.request)
+            logging.debug(f"{name} get - spec: {spec!r}")
+            # Apply the index policy of the route
+            route = "find_one" if self.request.path.endswith("_one") else "find"
+            index_usage = check_index_policy(self.settings, route, spec)
+            logging.debug(f"{name} get - index_usage: {index_usage!r}")
+            self.query_shape = query_shape(spec, route)
+            # Limit the query to the deadline of the request
+            self.set_deadline(route, spec)
+            if self.get_argument("format", "") not in FORMATS:
+                raise ValueError(f"Unknown format: {self.get_argument('format')!r}")
+            # Read with the read preference of the route or the request
+            preference = route_read_preference(self, route)
         except ValueError as err:
             logging.warning(f"{name} get - {err!r}")
             self.set_status(400)
             return
         except BaseException:
             raise
+        collection = with_read_preference(self, collection, preference)
+        query = spec.find_options()
         logging.info(f"{collection.database.name}.{collection.name}.find({query!r})")
 
+        # Conditional requests, a matching ETag probe skips the query
+        set_cache_control(self, route)
+        stream = stream_format(self)
+        # Responses cached by query and format, streamed responses are not
+        cached = None
+        if stream is None:
+            cached = cached_route(
+                self,
+                route,
+                query,
+                response_format(self),
+                want_pretty(self),
+                self.get_argument("format", ""),
+                preference.name if preference else None,
+            )
+        if cached is not None and cached.entry is not None:
+            await cached.write(self)
+            return
+        # Explain a sample of the queries that reach the database
+        sample_explain(self.settings, collection, route, spec)
+        try:
+            etag = await self.run_with_deadline(
+                probe_etag(self, collection, route, spec)
+            )
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(504)
+            return
+        if etag is not None and not_modified(self, etag):
+            return
+
         # Query the database for matching documents
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.find
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/cursor.html#pymongo.asynchronous.cursor.AsyncCursor
-        cursor = collection.find(**query)
-        documents = await cursor.to_list(query.get("limit"))
+        if stream == "arrow" and pyarrow is None:
+            logging.warning(f"{name} get - format=arrow requires pyarrow")
+            self.set_status(406)
+            return
+        if stream is not None:
+            cursor = collection.find(**query)
+            await self.stream(cursor, spec, stream)
+            return
+
+        def find(query):
+            cursor = collection.find(**query)
+            return cursor.to_list(spec.limit)
+
+        try:
+            # Identical concurrent queries share one database call
+            documents = await self.run_with_deadline(
+                coalesce(
+                    self, route, query, find, preference.name if preference else None
+                )
+            )
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} get - {err!r}")
+            self.set_status(504)
+            return
         if documents:
             response.update(count=len(documents))
             response.update(result=documents)
+        # Column oriented results, every field name once
+        if self.get_argument("format", "") == "columnar":
+            del response["result"]
+            response.update(columnar(documents))
+        # Keyset pagination, a full page has a token for the next page
+        if spec.after is not None:
+            response.update(next=None)
+            if documents and len(documents) >= spec.limit:
+                token = encode_token(spec.sort, documents[-1])
+                response.update(next=token)
+                self.set_header(
+                    "Link", f'<{next_url(self.request, token)}>; rel="next"'
+                )
         if self.settings.get("debug", False):
             self.set_header("X-Debug", "route=FindkHandler.get")
             response.update(database=collection.database.name)
             response.update(collection=collection.name)
+            response.update(index_usage=index_usage)
             response.update(query=query)
-        # Normalize the response into a JSON formatted response
+        # Normalize the response into the format the client accepts, JSON by default
+        self.set_header("Server", "Python/Tornado/MongoClient")
+        body = encode_response(self, response, pretty=want_pretty(self))
+        if cached is not None:
+            await cached.store(self, body, etag=etag)
+            return
+        await write_response(self, body, etag=etag)
+
+    async def stream(self, cursor, spec, stream: str = "json"):
+        """Write the documents of a cursor batch by batch (json, ndjson or arrow)
+
+        Each batch is flushed to the client before the next batch is read so
+        memory use is bounded by the batch size and not the query limit.
+        """
+        name = f"{Path(__file__).name} -"
+        batch_size = (spec.options or {}).get("batch_size") or STREAM_BATCH_SIZE
+
+        async def next_batch(count):
+            # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/cursor.html#pymongo.asynchronous.cursor.AsyncCursor.to_list
+            return await self.run_with_deadline(
+                cursor.to_list(min(batch_size, spec.limit - count))
+            )
+
+        # The first batch can still fail with a status code
+        try:
+            documents = await next_batch(0)
+        except DeadlineExceeded as err:
+            logging.warning(f"{name} stream - {err!r}")
+            self.set_status(504)
+            return
+        if self.settings.get("debug", False):
+            self.set_header("X-Debug", "route=FindkHandler.stream")
         self.set_header("Server", "Python/Tornado/MongoClient")
-        self.set_header("Content-Type", "text/json")
-        response = json.dumps(
-            response,
-            indent=4,
-            separators=(",", ": "),
-            sort_keys=True,
-            cls=ExtendedJSONEncoder,
-        )
-        self.write(response + "\n")
+        if stream == "arrow":
+            # Record batches of the cursor batches, the schema of the first batch
+            arrow = ArrowStream(self.settings.get("field_types"))
+            self.set_header("Content-Type", ARROW_STREAM)
+        elif stream == "ndjson":
+            self.set_header("Content-Type", NDJSON)
+        else:
+            self.set_header("Content-Type", "text/json")
+            self.write(b'{"result":[')
+
+        count, last, truncated = 0, None, False
+        while documents:
+            if stream == "arrow":
+                chunk = arrow.batch(documents)
+            elif stream == "ndjson":
+                chunk = b"".join(dumps(document) for document in documents)
+            else:
+                chunk = b",".join(dumps(document)[:-1] for document in documents)
+                if count:
+                    chunk = b"," + chunk
+            requested = min(batch_size, spec.limit - count)
+            count += len(documents)
+            last = documents[-1]
+            self.write(chunk)
+            # Wait for slow clients to take the batch before reading the next
+            await self.flush()
+            if count >= spec.limit or len(documents) < requested:
+                break
+            try:
+                documents = await next_batch(count)
+            except DeadlineExceeded as err:
+                # The status code was sent with the first batch
+                logging.warning(f"{name} stream - {err!r}")
+                truncated = True
+                break
+        logging.debug(f"{name} stream - count: {count!r}")
+        if stream == "arrow":
+            self.write(arrow.close())
+            return
+        if stream == "ndjson":
+            return
+
+        trailer = {"count": count}
+        # Keyset pagination, a full page has a token for the next page
+        if spec.after is not None:
+            trailer.update(next=None)
+            if last is not None and count >= spec.limit:
+                trailer.update(next=encode_token(spec.sort, last))
+        if truncated:
+            trailer.update(truncated=True)
+        self.write(b"]," + dumps(trailer)[1:])
@@ -0,0 +1,78 @@
+import datetime
+
+# https://pymongo.readthedocs.io/en/stable/
+import bson
+import bson.objectid
+import bson.timestamp
+from bson.codec_options import CodecOptions, TypeRegistry
+
+from mongo_jsonencoder import ExtendedJSONEncoder, dumps
+
+# Optional MessagePack response format
+# https://github.com/msgpack/msgpack-python
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+# Media types of the binary response formats
+BSON = "application/bson"
+MSGPACK = ("application/msgpack", "application/x-msgpack")
+
+# MessagePack extension type of ObjectId values, the BSON element type
+MSGPACK_OBJECTID = 7
+
+_extended_default = ExtendedJSONEncoder().default
+
+# Encode pymongo results and errors as their JSON documents, keep BSON types
+# https://pymongo.readthedocs.io/en/stable/api/bson/codec_options.html#bson.codec_options.TypeRegistry
+BSON_OPTIONS = CodecOptions(
+    type_registry=TypeRegistry(fallback_encoder=_extended_default)
+)
+
+
+def msgpack_default(obj):
+    """Encode BSON types as MessagePack extension types"""
+    match obj:
+        case bson.objectid.ObjectId():
+            return msgpack.ExtType(MSGPACK_OBJECTID, obj.binary)
+        case datetime.datetime():
+            # pymongo returns naive datetimes in UTC
+            if obj.tzinfo is None:
+                obj = obj.replace(tzinfo=datetime.timezone.utc)
+            return msgpack.Timestamp.from_datetime(obj)
+        case bson.timestamp.Timestamp():
+            return msgpack.Timestamp.from_datetime(obj.as_datetime())
+        case _:
+            return _extended_default(obj)
+
+
+def response_format(handler) -> str:
+    """Select `bson', `msgpack' or the default `json' from the Accept header"""
+    accept = handler.request.headers.get("Accept", "")
+    if BSON in accept:
+        return "bson"
+    if msgpack is not None and any(media_type in accept for media_type in MSGPACK):
+        return "msgpack"
+    return "json"
+
+
+def encode_response(handler, response: dict, pretty: bool = False):
+    """Encode a response document in the negotiated format and set its Content-Type
+
+    The binary formats keep ObjectId and datetime values typed.
+    """
+    handler.add_header("Vary", "Accept")
+    match response_format(handler):
+        case "bson":
+            # https://bsonspec.org/
+            handler.set_header("Content-Type", BSON)
+            return bson.encode(response, codec_options=BSON_OPTIONS)
+        case "msgpack":
+            # https://github.com/msgpack/msgpack/blob/master/spec.md
+            handler.set_header("Content-Type", MSGPACK[0])
+            return msgpack.packb(response, default=msgpack_default)
+        case _:
+            handler.set_header("Content-Type", "text/json")
+            return dumps(response, pretty=pretty)
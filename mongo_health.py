@@ -0,0 +1,139 @@
+import asyncio
+import datetime
+import logging
+import time
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.ioloop
+
+# https://pymongo.readthedocs.io/en/stable/
+from pymongo.errors import PyMongoError
+
+# Event loop delay (seconds) over which the service is not ready
+MAX_LOOP_LAG = 0.5
+# Missed probe intervals after which the service is not live
+MAX_MISSED_PROBES = 3
+
+
+async def loop_lag() -> float:
+    """Return the seconds a callback waits in the event loop queue"""
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    future = loop.create_future()
+    loop.call_soon(future.set_result, None)
+    await future
+    return loop.time() - started
+
+
+class HealthMonitor:
+    """Probe MongoDB, the connection pool and the event loop in the background
+
+    The health check requests answer with the verdict of the latest probe
+    and never wait on the database themselves.
+
+    live  - the event loop runs the probes (MongoDB is not involved, so a
+            database outage does not restart the service)
+    ready - live, the latest ping succeeded, the pool was not starved and
+            the event loop is responsive
+    """
+
+    def __init__(
+        self, client, pool_metrics=None, interval: float = 5, timeout: float = 2
+    ):
+        self.client = client
+        self.pool_metrics = pool_metrics
+        self.interval = float(interval)
+        self.timeout = float(timeout)
+        self.periodic_callback = None
+        self.checks = {}
+        self.checked_at = None
+        self.checked = None
+        self.probes = 0
+        # Pool checkout timeouts seen by the previous probe
+        self.checkout_timeouts = 0
+
+    def start(self):
+        """Probe now and every `interval' seconds"""
+        tornado.ioloop.IOLoop.current().spawn_callback(self.probe)
+        self.periodic_callback = tornado.ioloop.PeriodicCallback(
+            self.probe, self.interval * 1000
+        )
+        self.periodic_callback.start()
+
+    def stop(self):
+        if self.periodic_callback is not None:
+            self.periodic_callback.stop()
+
+    async def check_database(self) -> dict:
+        started = time.perf_counter()
+        try:
+            # https://www.mongodb.com/docs/manual/reference/command/ping/
+            await asyncio.wait_for(self.client.admin.command("ping"), self.timeout)
+        except (PyMongoError, TimeoutError) as err:
+            return {
+                "ok": False,
+                "ms": round((time.perf_counter() - started) * 1000, 3),
+                "error": repr(err),
+            }
+        return {"ok": True, "ms": round((time.perf_counter() - started) * 1000, 3)}
+
+    def check_pool(self) -> dict:
+        if self.pool_metrics is None:
+            return {"ok": True}
+        stats = self.pool_metrics.stats()
+        # Checkouts that timed out waiting for a connection since the last probe
+        timeouts = stats["checkout_failures"].get("timeout", 0)
+        starved = timeouts - self.checkout_timeouts
+        self.checkout_timeouts = timeouts
+        return {
+            "ok": starved == 0,
+            "connections": stats["connections"],
+            "in_use": stats["in_use"],
+            "waiting": stats["waiting"],
+            "checkout_timeouts": starved,
+        }
+
+    async def probe(self):
+        prefix = f"{Path(__file__).name} - HealthMonitor.probe()"  # log message prefix
+
+        lag = await loop_lag()
+        checks = {
+            "database": await self.check_database(),
+            "pool": self.check_pool(),
+            "event_loop": {"ok": lag < MAX_LOOP_LAG, "lag_ms": round(lag * 1000, 3)},
+        }
+        self.checks = checks
+        self.checked_at = time.monotonic()
+        self.checked = datetime.datetime.now(datetime.timezone.utc)
+        self.probes += 1
+        if not all(check["ok"] for check in checks.values()):
+            logging.warning(f"{prefix} - {checks!r}")
+        else:
+            logging.debug(f"{prefix} - {checks!r}")
+
+    def live(self) -> bool:
+        if self.checked_at is None:
+            # Starting, the first probe is pending
+            return True
+        return time.monotonic() - self.checked_at < self.interval * MAX_MISSED_PROBES
+
+    def ready(self) -> bool:
+        if self.checked_at is None or not self.live():
+            return False
+        return all(check["ok"] for check in self.checks.values())
+
+    def report(self) -> dict:
+        """Return the verdict and the detail of the latest probe"""
+        live, ready = self.live(), self.ready()
+        return {
+            "status": "ok" if ready else "fail",
+            "live": live,
+            "ready": ready,
+            "checked": self.checked.isoformat() if self.checked else None,
+            "age_ms": round((time.monotonic() - self.checked_at) * 1000, 3)
+            if self.checked_at is not None
+            else None,
+            "probes": self.probes,
+            "checks": self.checks,
+        }
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+
+
+def parse_cache_control(cache_control: str | dict) -> dict:
+    """Load the Cache-Control header per route ('{"find": "max-age=5"}')"""
+    if isinstance(cache_control, str):
+        cache_control = json.loads(cache_control)
+    for route, value in cache_control.items():
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"Invalid Cache-Control: {value!r} for route: {route!r}")
+    return dict(cache_control)
+
+
+def parse_etag_probe(etag_probe: str | dict) -> dict:
+    """Load the field to probe for an ETag per route ('{"find": "mtime"}')"""
+    if isinstance(etag_probe, str):
+        etag_probe = json.loads(etag_probe)
+    for route, field in etag_probe.items():
+        if not isinstance(field, str) or not field:
+            raise ValueError(
+                f"Invalid ETag probe field: {field!r} for route: {route!r}"
+            )
+    return dict(etag_probe)
+
+
+class WriteGeneration:
+    """Count the writes made through this process"""
+
+    def __init__(self):
+        self.value = 0
+
+    def __repr__(self):
+        return f"WriteGeneration({self.value!r})"
+
+    def bump(self):
+        self.value += 1
+
+
+def bump_write_generation(settings):
+    """Record a write through the insert, update or delete routes"""
+    generation = settings.get("write_generation")
+    if generation is not None:
+        generation.bump()
+
+
+def body_etag(body: bytes, coding: str | None = None) -> str:
+    """Return a strong ETag for a response body and its content coding"""
+    digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+    return f'"{digest}-{coding}"' if coding else f'"{digest}"'
+
+
+def set_cache_control(handler, route: str):
+    """Set the Cache-Control header configured for a route"""
+    value = handler.settings.get("cache_control", {}).get(route)
+    if value:
+        handler.set_header("Cache-Control", value)
+
+
+async def probe_etag(handler, collection, route: str, spec) -> str | None:
+    """Return a weak ETag from the greatest value of a field matching a QuerySpec
+
+    The insert and update routes stamp `mtime' on every write, so its max()
+    changes when a matching document changes. Deletes are detected through
+    the write generation of this process only, hence the weak validator.
+    """
+    prefix = f"{Path(__file__).name} - probe_etag()"  # log message prefix
+
+    field = handler.settings.get("etag_probe", {}).get(route)
+    if field is None:
+        return None
+    # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.find_one
+    document = await collection.find_one(
+        spec.filter, projection={field: 1, "_id": 0}, sort=[(field, -1)]
+    )
+    latest = document.get(field) if document else None
+    generation = handler.settings.get("write_generation")
+    key = repr(
+        (
+            handler.request.uri,
+            handler.request.headers.get("Accept", ""),
+            latest,
+            generation.value if generation is not None else None,
+        )
+    )
+    etag = 'W/"' + hashlib.blake2b(key.encode(), digest_size=16).hexdigest() + '"'
+    logging.debug(f"{prefix} - {route} {field}: {latest!r}, etag: {etag}")
+    return etag
+
+
+def not_modified(handler, etag: str) -> bool:
+    """Set the ETag and answer `304 Not Modified' when `If-None-Match' matches"""
+    handler.set_header("Etag", etag)
+    # https://www.tornadoweb.org/en/stable/web.html#tornado.web.RequestHandler.check_etag_header
+    if handler.check_etag_header():
+        handler.set_status(304)
+        return True
+    return False
@@ -0,0 +1,180 @@
+import logging
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.web
+
+from mongo_collections import CollectionMixin
+from mongo_jsonencoder import dumps, want_pretty
+from mongo_response import write_response
+
+# Operators that select a range of values
+RANGE_OPERATORS = frozenset(
+    ["$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists", "$not"]
+)
+
+
+def query_shape(spec, route: str = "find") -> tuple:
+    """Return the shape of a QuerySpec without any values
+
+    (route, equality fields, sort fields and directions, range fields)
+    """
+    equality, ranges = set(), set()
+
+    def walk(query_filter):
+        for key, value in query_filter.items():
+            if key == "$and":
+                for branch in value:
+                    walk(branch)
+            elif key.startswith("$"):
+                # `$or', `$nor' and `$text' branches need indexes of their own
+                continue
+            elif isinstance(value, dict) and RANGE_OPERATORS.intersection(value):
+                ranges.add(key)
+            else:
+                equality.add(key)
+
+    walk(spec.filter)
+    if route == "count_documents":
+        sort = ()
+    else:
+        sort = tuple((field, int(direction)) for field, direction in spec.sort or [])
+    return (
+        route,
+        tuple(sorted(equality)),
+        sort,
+        tuple(sorted(ranges - equality)),
+    )
+
+
+def recommend_index(shape: tuple) -> tuple:
+    """Order the fields of a query shape by equality, sort and then range"""
+    _, equality, sort, ranges = shape
+    keys, seen = [], set()
+    for field, direction in (
+        [(field, 1) for field in equality]
+        + list(sort)
+        + [(field, 1) for field in ranges]
+    ):
+        if field not in seen:
+            seen.add(field)
+            keys.append((field, direction))
+    return tuple(keys)
+
+
+def serves_shape(index_keys: list, shape: tuple) -> bool:
+    """Return True when an index has the keys of a query shape as a prefix
+
+    The equality fields come first in any order and direction, then the sort
+    fields in their direction or all reversed (a backward scan), then the
+    range fields in any order and direction.
+    """
+    _, equality, sort, ranges = shape
+    if any(not isinstance(direction, (int, float)) for _, direction in index_keys):
+        # Text, hashed and geospatial indexes
+        return False
+    keys = [(field, int(direction)) for field, direction in index_keys]
+    equality = set(equality)
+    sort = [(field, direction) for field, direction in sort if field not in equality]
+    ranges = set(ranges) - equality - {field for field, _ in sort}
+    if len(keys) < len(equality) + len(sort) + len(ranges):
+        return False
+    prefix, keys = keys[: len(equality)], keys[len(equality) :]
+    if {field for field, _ in prefix} != equality:
+        return False
+    prefix, keys = keys[: len(sort)], keys[len(sort) :]
+    reverse = [(field, -direction) for field, direction in sort]
+    if prefix != sort and prefix != reverse:
+        return False
+    return {field for field, _ in keys[: len(ranges)]} == ranges
+
+
+def satisfied_by(shapes: list, catalog) -> str | None:
+    """Return the name of an existing index that serves every query shape"""
+    if catalog is None or catalog.loaded is None or not shapes:
+        return None
+    for name, index_keys in catalog.indexes.items():
+        if all(serves_shape(index_keys, shape) for shape in shapes):
+            return name
+    return None
+
+
+class QueryShapeRecorder:
+    """Count the requests and latency of each query shape"""
+
+    def __init__(self, maxsize: int = 1000):
+        self.maxsize = int(maxsize)
+        # {shape: [requests, total latency seconds]}
+        self.shapes = {}
+        self.dropped = 0
+
+    def record(self, shape: tuple, latency: float):
+        counters = self.shapes.get(shape)
+        if counters is None:
+            # Keep the number of shapes bounded
+            if len(self.shapes) >= self.maxsize:
+                self.dropped += 1
+                return
+            counters = self.shapes[shape] = [0, 0.0]
+        counters[0] += 1
+        counters[1] += latency
+
+    def recommendations(self, catalog=None) -> list:
+        """Rank compound index recommendations by total request latency"""
+        indexes = {}
+        for shape, (requests, latency) in self.shapes.items():
+            keys = recommend_index(shape)
+            if not keys or keys == (("_id", 1),):
+                continue
+            index = indexes.setdefault(
+                keys,
+                {
+                    "index": keys,
+                    "requests": 0,
+                    "latency_ms": 0.0,
+                    "routes": set(),
+                    "shapes": [],
+                },
+            )
+            index["shapes"].append(shape)
+            index["requests"] += requests
+            index["latency_ms"] += latency * 1000.0
+            index["routes"].add(shape[0])
+        result = []
+        for index in sorted(
+            indexes.values(), key=lambda index: index["latency_ms"], reverse=True
+        ):
+            shapes = index.pop("shapes")
+            index.update(
+                index=[list(key) for key in index["index"]],
+                latency_ms=round(index["latency_ms"], 2),
+                mean_latency_ms=round(index["latency_ms"] / index["requests"], 2),
+                routes=sorted(index["routes"]),
+                satisfied_by=satisfied_by(shapes, catalog),
+            )
+            result.append(index)
+        return result
+
+
+class IndexAdvisorHandler(CollectionMixin, tornado.web.RequestHandler):
+    async def get(self, *args, **kwargs):
+        """Recommend compound indexes from the observed query shapes"""
+        name = f"{Path(__file__).name} -"
+        logging.debug(f"{name} get - *args: {args!r}")
+        logging.debug(f"{name} get - **kwargs: {kwargs!r}")
+
+        recorder = self.settings.get("query_shapes")
+        catalog = self.settings.get("index_catalog")
+        result = recorder.recommendations(catalog) if recorder is not None else []
+        response = {
+            "count": len(result),
+            "result": result,
+        }
+        if self.settings.get("debug", False):
+            self.set_header("X-Debug", "route=IndexAdvisorHandler.get")
+            if recorder is not None:
+                response.update(shapes=len(recorder.shapes), dropped=recorder.dropped)
+        # Normalize the response into a JSON formatted response (pretty when asked)
+        self.set_header("Server", "Python/Tornado/MongoClient")
+        self.set_header("Content-Type", "text/json")
+        await write_response(self, dumps(response, pretty=want_pretty(self)))
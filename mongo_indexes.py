@@ -0,0 +1,176 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.ioloop
+
+# https://pymongo.readthedocs.io/en/stable/
+from pymongo.errors import PyMongoError
+
+# Index usage classification of a query
+COVERED = "covered"
+ASSISTED = "assisted"
+COLLSCAN = "collscan"
+UNKNOWN = "unknown"
+
+# Policy actions for queries that would scan the whole collection
+INDEX_POLICY_ACTIONS = ("allow", "warn", "reject")
+
+
+class IndexPolicyError(ValueError):
+    """A query was rejected by the index policy of the route"""
+
+
+def filter_fields(query_filter: dict) -> set:
+    """Return the field names used by a filter document
+
+    Fields of `$and' branches are included, `$or' and `$nor' branches are
+    not since every branch would need an index of its own.
+    """
+    fields = set()
+    for key, value in query_filter.items():
+        if key == "$and":
+            for branch in value:
+                fields |= filter_fields(branch)
+        elif not key.startswith("$"):
+            fields.add(key)
+    return fields
+
+
+def projection_fields(projection) -> set | None:
+    """Return the fields returned by a projection, None for all fields"""
+    if isinstance(projection, (list, tuple)):
+        return set(projection) | {"_id"}
+    if isinstance(projection, dict) and any(projection.values()):
+        fields = {field for field, value in projection.items() if value}
+        if projection.get("_id", 1):
+            fields.add("_id")
+        return fields
+    return None
+
+
+class IndexCatalog:
+    """The indexes of a collection loaded with `list_indexes'"""
+
+    def __init__(self):
+        # {index name: [(field, direction), ...]}
+        self.indexes = {}
+        self.loaded = None
+        self.periodic_callback = None
+
+    def __repr__(self):
+        return f"IndexCatalog({self.indexes!r})"
+
+    async def refresh(self, collection):
+        """(Re)Load the indexes of the collection"""
+        prefix = f"{Path(__file__).name} - IndexCatalog.refresh()"  # log message prefix
+        try:
+            # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.list_indexes
+            indexes = {}
+            cursor = await collection.list_indexes()
+            async for index in cursor:
+                indexes[index["name"]] = list(index["key"].items())
+        except PyMongoError as err:
+            logging.warning(f"{prefix} - {err!r}")
+            return
+        self.indexes = indexes
+        self.loaded = time.time()
+        logging.debug(f"{prefix} - indexes: {self.indexes!r}")
+
+    def start(self, collection, interval: float = 300):
+        """Load the indexes now and refresh them every `interval' seconds"""
+        tornado.ioloop.IOLoop.current().spawn_callback(self.refresh, collection)
+        if interval > 0:
+            self.periodic_callback = tornado.ioloop.PeriodicCallback(
+                lambda: self.refresh(collection), interval * 1000
+            )
+            self.periodic_callback.start()
+
+    def classify(self, spec, route: str = "find") -> str:
+        """Classify the index usage of a QuerySpec
+
+        covered  - an index has every filter, sort and projected field
+        assisted - an index can select or sort the documents
+        collscan - no index can be used, the collection is scanned
+        """
+        if self.loaded is None:
+            return UNKNOWN
+        if spec.hint is not None:
+            return ASSISTED
+
+        fields = filter_fields(spec.filter)
+        sort_fields = [field for field, _ in spec.sort or []]
+        if route == "count_documents":
+            sort_fields = []
+            returned = set()
+        else:
+            returned = projection_fields(spec.projection)
+
+        classification = COLLSCAN
+        for keys in self.indexes.values():
+            index_fields = [field for field, _ in keys]
+            if keys[0][1] == "text":
+                usable = "$text" in spec.filter
+            else:
+                usable = index_fields[0] in fields or (
+                    sort_fields and index_fields[0] == sort_fields[0]
+                )
+            if not usable:
+                continue
+            classification = ASSISTED
+            if (
+                returned is not None
+                and fields.issubset(index_fields)
+                and set(sort_fields).issubset(index_fields)
+                and returned.issubset(index_fields)
+            ):
+                return COVERED
+        return classification
+
+
+def check_index_policy(settings, route: str, spec) -> str:
+    """Apply the index policy of a route to a QuerySpec
+
+    Raise an IndexPolicyError when the query would scan the collection and
+    the policy of the route is to reject, otherwise return the index usage.
+    """
+    prefix = f"{Path(__file__).name} - check_index_policy()"  # log message prefix
+
+    catalog = settings.get("index_catalog")
+    if catalog is None:
+        return UNKNOWN
+
+    # Make sure a hint refers to a known index
+    if (
+        spec.hint is not None
+        and catalog.loaded is not None
+        and spec.hint not in catalog.indexes
+    ):
+        raise IndexPolicyError(f"Unknown index hint: {spec.hint!r}")
+
+    classification = catalog.classify(spec, route=route)
+    if classification != COLLSCAN:
+        return classification
+
+    # A find without a filter or a sort only reads up to `limit' documents
+    if route != "count_documents" and not spec.filter and not spec.sort:
+        return classification
+
+    match settings.get("index_policy", {}).get(route, "allow"):
+        case "warn":
+            logging.warning(f"{prefix} - COLLSCAN for {route}: {spec!r}")
+        case "reject":
+            raise IndexPolicyError(f"Query requires a COLLSCAN for {route}: {spec!r}")
+    return classification
+
+
+def parse_index_policy(index_policy: str | dict) -> dict:
+    """Load and validate a route index policy ('{"find": "warn", ...}')"""
+    if isinstance(index_policy, str):
+        index_policy = json.loads(index_policy)
+    for route, action in index_policy.items():
+        if action not in INDEX_POLICY_ACTIONS:
+            raise ValueError(f"Unknown index policy: {action!r} for route: {route!r}")
+    return dict(index_policy)
@@ -1,5 +1,4 @@
 import logging
-import json
 
 from datetime import datetime, timezone
 from pathlib import Path
@@ -7,11 +6,13 @@ from pathlib import Path
 # https://www.tornadoweb.org/en/stable/
 import tornado.web
 
-from mongo_jsonencoder import ExtendedJSONEncoder
+from mongo_collections import CollectionMixin
+from mongo_formats import encode_response
+from mongo_http_cache import bump_write_generation
 from mongo_operator import operator_value
 
 
-class InsertOneHandler(tornado.web.RequestHandler):
+class InsertOneHandler(CollectionMixin, tornado.web.RequestHandler):
     async def get(self, *args, **kwargs):
         """Selects one or more documents in a collection matching a query"""
         name = f"{Path(__file__).name} -"
@@ -35,7 +36,7 @@ class InsertOneHandler(tornado.web.RequestHandler):
             for key, value in self.request.arguments.items():
                 value = value[-1].decode()  # [..., b'value'] ---> 'value'
                 key, value = operator_value(
-                    key, value
+                    key, value, field_types=self.settings.get("field_types")
                 )  # 'field=$foo:bar' ---> 'field', {'$foo': ['bar']}
                 document[key] = value
             logging.debug(f"{name} get - document: {document!r}")
@@ -59,6 +60,7 @@ class InsertOneHandler(tornado.web.RequestHandler):
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.insert_one
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/results.html#pymongo.results.InsertOneResult
         result = await collection.insert_one(document)
+        bump_write_generation(self.settings)
         response.update(count=1)
         response.update(result=[result])
         if self.settings.get("debug", False):
@@ -66,14 +68,8 @@ class InsertOneHandler(tornado.web.RequestHandler):
             response.update(database=collection.database.name)
             response.update(collection=collection.name)
             response.update(document=document)
-        # Normalize the response into a JSON formatted response
+        # Normalize the response into the format the client accepts, JSON by default
         self.set_header("Server", "Python/Tornado/MongoClient")
-        self.set_header("Content-Type", "text/json")
-        response = json.dumps(
-            response,
-            indent=4,
-            separators=(",", ": "),
-            sort_keys=True,
-            cls=ExtendedJSONEncoder,
+        self.write(
+            encode_response(self, response, pretty=self.settings.get("debug", False))
         )
-        self.write(response + "\n")
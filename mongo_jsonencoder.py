@@ -146,3 +146,57 @@ class ExtendedJSONEncoder(json.JSONEncoder):
             print("ExtendedJSONEncoder - Failed to convert obj")
             print(f"{type(obj)}: {error!r}")
             return str(type(obj)).replace("'", "")
+
+
+# Encode the most common result types by their exact type, without walking
+# the `ExtendedJSONEncoder.default' match chain for every value
+ENCODERS = {
+    bytes: lambda obj: obj.decode("utf-8", "replace")[:120],
+    datetime.datetime: lambda obj: obj.isoformat(timespec="seconds"),
+    bson.objectid.ObjectId: str,
+    bson.timestamp.Timestamp: lambda obj: obj.as_datetime(),
+}
+
+_extended_default = ExtendedJSONEncoder().default
+
+
+def encode_default(obj):
+    """Encode a value the JSONEncoder does not handle itself"""
+    encoder = ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    # Subclasses and everything else use the full match chain
+    return _extended_default(obj)
+
+
+# Compact output with UTF-8 characters as is and keys in document order
+_compact = json.JSONEncoder(
+    ensure_ascii=False,
+    separators=(",", ":"),
+    default=encode_default,
+)
+# Pretty output as `json.dumps(..., indent=4, sort_keys=True)'
+_pretty = json.JSONEncoder(
+    indent=4,
+    separators=(",", ": "),
+    sort_keys=True,
+    default=encode_default,
+)
+
+
+def dumps(obj, pretty: bool = False) -> bytes:
+    """Encode a response document into UTF-8 JSON bytes ending with a newline
+
+    Example usage:
+      self.write(dumps(response, pretty=self.settings.get("debug", False)))
+    """
+    if pretty:
+        return (_pretty.encode(obj) + "\n").encode("utf-8")
+    return (_compact.encode(obj) + "\n").encode("utf-8")
+
+
+def want_pretty(handler) -> bool:
+    """Pretty print responses with `pretty=1' or in debug mode"""
+    if handler.settings.get("debug", False):
+        return True
+    return handler.get_argument("pretty", "") in ["1", "true"]
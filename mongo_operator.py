@@ -1,3 +1,4 @@
+import json
 import logging
 
 from datetime import datetime, timezone
@@ -7,52 +8,222 @@ from urllib.parse import unquote_plus
 from bson.objectid import ObjectId
 
 
-def operator_value(field: str, value: str):
-    """Expand operator string values"""
+def parse_bool(value: str) -> bool:
+    """Parse 'true' or 'false' into a bool value"""
+    match value:
+        case "true":
+            return True
+        case "false":
+            return False
+    raise ValueError(f"Invalid bool value: {value!r}")
 
-    # Catch nested field conversion
-    if field.startswith("$nested:"):
-        field = field.split(":", 1)[-1]
-        field1, field2 = field.split(".", 1)
-        field2, value = operator_value(field2, value)
-        return field1, {field2: value}
 
-    # Catch ObjectId conversion
-    # https://pymongo.readthedocs.io/en/stable/api/bson/objectid.html#bson.objectid.ObjectId
-    if field == "_id" and isinstance(value, str):
-        return field, ObjectId(value)
+# Parsers for the types of declared fields in a field type schema
+FIELD_TYPE_PARSERS = {
+    "bool": parse_bool,
+    "date": datetime.fromisoformat,
+    "datetime": datetime.fromisoformat,
+    "float": float,
+    "int": int,
+    "objectid": ObjectId,
+    "str": str,
+}
+
+
+def parse_field_types(field_types: str | dict) -> dict:
+    """Load and validate a field type schema ('{"ctime": "datetime", ...}')"""
+    if isinstance(field_types, str):
+        field_types = json.loads(field_types)
+    for field, type_name in field_types.items():
+        if type_name not in FIELD_TYPE_PARSERS:
+            raise ValueError(f"Unknown field type: {type_name!r} for field: {field!r}")
+    return dict(field_types)
+
 
+def guess_value(value: str):
+    """Guess the type of an undeclared field value
+
+    Cheap checks on the string avoid raising and catching exceptions for
+    values that can not be a datetime or a number.
+    """
     # Catch bool conversion
     if value == "true":
-        return field, True
+        return True
     elif value == "false":
-        return field, False
+        return False
 
     # Catch datetime conversion
-    if isinstance(value, str):
+    # Every ISO 8601 format starts with a four digit year
+    if len(value) >= 7 and value[:4].isdigit():
         try:
-            value = datetime.fromisoformat(value)
-            return field, value
+            return datetime.fromisoformat(value)
         except ValueError:
             pass
 
     # Catch integer number conversion
-    if isinstance(value, str) and value.isdigit():
-        value = int(value)
-        return field, value
+    if value.isdigit():
+        return int(value)
 
     # Catch float number conversion
-    if isinstance(value, str) and value.find(".") != -1:
+    if value.find(".") != -1:
         try:
-            value = float(value)
-            return field, value
+            return float(value)
         except ValueError:
             pass
 
-    # Catch and exit when not an unprocessed operator
-    if not isinstance(value, str) or not value.startswith("$"):
+    return value
+
+
+def _keep(value):
+    return value
+
+
+def _words(value: str, cast) -> list:
+    return [cast(word) for word in value.split(",")]
+
+
+def _between(field, value, cast):
+    # sugar for creating a `$gte+$lte' filter
+    if cast is _keep:
+        cast = datetime.fromisoformat
+    gte, lte = value.split(",")
+    return field, {"$gte": cast(gte), "$lte": cast(lte)}
+
+
+def _comparison(operator):
+    # https://docs.mongodb.com/manual/reference/operator/query/eq/
+    # https://docs.mongodb.com/manual/reference/operator/query/gt/
+    # https://docs.mongodb.com/manual/reference/operator/query/gte/
+    # https://docs.mongodb.com/manual/reference/operator/query/lt/
+    # https://docs.mongodb.com/manual/reference/operator/query/lte/
+    # https://docs.mongodb.com/manual/reference/operator/query/ne/
+    def expand(field, value, cast):
+        return field, {operator: cast(value) if isinstance(value, str) else value}
+
+    return expand
+
+
+def _array(operator):
+    # https://docs.mongodb.com/manual/reference/operator/query/in/
+    # https://docs.mongodb.com/manual/reference/operator/query/nin/
+    def expand(field, value, cast):
+        return field, {operator: _words(value, cast)}
+
+    return expand
+
+
+def _logical(operator):
+    # https://docs.mongodb.com/manual/reference/operator/query/and/
+    # https://docs.mongodb.com/manual/reference/operator/query/nor/
+    # https://docs.mongodb.com/manual/reference/operator/query/or/
+    def expand(field, value, cast):
+        return operator, [{field: word} for word in _words(value, cast)]
+
+    return expand
+
+
+def _not(field, value, cast):
+    # https://docs.mongodb.com/manual/reference/operator/query/not/
+    o, e = value.split(":", 1)
+    return field, {"$not": {o: e}}
+
+
+def _exists(field, value, cast):
+    # https://docs.mongodb.com/manual/reference/operator/query/exists/
+    return field, {"$exists": value}
+
+
+def _regex(field, value, cast):
+    # https://docs.mongodb.com/manual/reference/operator/query/regex/
+    return field, {"$regex": value, "$options": "i"}
+
+
+def _text(field, value, cast):
+    # https://docs.mongodb.com/manual/reference/operator/query/text/
+    return "$text", {"$search": unquote_plus(value)}
+
+
+# Operator expansions by name: (field, value, cast) ---> (field, value)
+# Not (yet) supported operators:
+# Element: $type
+# Evaluation: $expr, $jsonSchema, $mod, $where
+# Geospatial: $geoIntersects, $geoWithin, $near, $nearSphere
+# Array: $all, $elemMatch, $size
+# Bitwise: $bitsAllClear, $bitsAllSet, $bitsAnyClear, $bitsAnySet
+# Comments: $comment
+# Projection: $, $elemMatch, $meta, $slice
+OPERATORS = {
+    # Non-standard operators
+    "$between": _between,
+    "$list": lambda field, value, cast: (field, _words(value, cast)),
+    # Comparison operators
+    "$eq": _comparison("$eq"),
+    "$gt": _comparison("$gt"),
+    "$gte": _comparison("$gte"),
+    "$lt": _comparison("$lt"),
+    "$lte": _comparison("$lte"),
+    "$ne": _comparison("$ne"),
+    # Logical operators
+    "$and": _logical("$and"),
+    "$only": _logical("$and"),
+    "$in": _array("$in"),
+    "$nin": _array("$nin"),
+    "$not": _not,
+    "$nor": _logical("$nor"),
+    "$or": _logical("$or"),
+    "$any": _logical("$or"),
+    # Element operators
+    "$exists": _exists,
+    # Evaluation operators
+    "$regex": _regex,
+    "$text": _text,
+    "$search": _text,
+}
+
+
+def operator_value(field: str, value: str, now=None, field_types=None):
+    """Expand operator string values
+
+    Use the `now' callable to supply the value for `$now' (Default: current
+    UTC date/time)
+
+    Fields declared in `field_types' ('{"count": "int", ...}') are parsed as
+    the declared type instead of guessing the type of the value. This also
+    applies to the values of operators such as '$gte:5' or '$in:1,2'.
+    """
+
+    # Catch nested field conversion
+    if field.startswith("$nested:"):
+        field = field.split(":", 1)[-1]
+        field1, field2 = field.split(".", 1)
+        if field_types and field in field_types:
+            nested_types = {field2: field_types[field]}
+        else:
+            nested_types = None
+        field2, value = operator_value(field2, value, now=now, field_types=nested_types)
+        return field1, {field2: value}
+
+    # Catch ObjectId conversion
+    # https://pymongo.readthedocs.io/en/stable/api/bson/objectid.html#bson.objectid.ObjectId
+    if field == "_id" and isinstance(value, str):
+        return field, ObjectId(value)
+
+    # Catch and exit when not a string value
+    if not isinstance(value, str):
         return field, value
 
+    # Declared fields skip guessing the type of the value
+    if field_types and field in field_types:
+        cast = FIELD_TYPE_PARSERS[field_types[field]]
+        if not value.startswith("$"):
+            return field, cast(value)
+    else:
+        cast = _keep
+        value = guess_value(value)
+        # Catch and exit when not an unprocessed operator
+        if not isinstance(value, str) or not value.startswith("$"):
+            return field, value
+
     # Split the operator from the string value ($foo:bar ---> $foo, bar)
     if value.find(":") != -1:
         operator, value = value.split(":", 1)
@@ -65,102 +236,14 @@ def operator_value(field: str, value: str):
             value = None
         case "$now":
             # Set the value to current UTC date/time
-            value = datetime.now(tz=timezone.utc)
-        case _:
-            pass
+            value = now() if now is not None else datetime.now(tz=timezone.utc)
 
-    # Match the operator expansion format
-    match operator:
-        # Non-standard operators
-        case "$between":
-            # sugar for creating a `$gte+$lte' filter
-            gte, lte = value.split(",")
-            return field, {
-                "$gte": datetime.fromisoformat(gte),
-                "$lte": datetime.fromisoformat(lte),
-            }
-        case "$list":
-            # parse the value as a comma separated list
-            return field, value.split(",")
-        # Comparison operators
-        case "$eq":
-            # https://docs.mongodb.com/manual/reference/operator/query/eq/
-            return field, {"$eq": value}
-        case "$gt":
-            # https://docs.mongodb.com/manual/reference/operator/query/gt/
-            return field, {"$gt": value}
-        case "$gte":
-            # https://docs.mongodb.com/manual/reference/operator/query/gte/
-            return field, {"$gte": value}
-        case "$lt":
-            # https://docs.mongodb.com/manual/reference/operator/query/lt/
-            return field, {"$lt": value}
-        case "$lte":
-            # https://docs.mongodb.com/manual/reference/operator/query/lte/
-            return field, {"$lte": value}
-        case "$ne":
-            # https://docs.mongodb.com/manual/reference/operator/query/ne/
-            return field, {"$ne": value}
-        # Logical operators
-        case "$and" | "$only":
-            # https://docs.mongodb.com/manual/reference/operator/query/and/
-            return "$and", [{field: word} for word in value.split(",")]
-        case "$in":
-            # https://docs.mongodb.com/manual/reference/operator/query/in/
-            return field, {"$in": value.split(",")}
-        case "$nin":
-            # https://docs.mongodb.com/manual/reference/operator/query/nin/
-            return field, {"$nin": value.split(",")}
-        case "$not":
-            # https://docs.mongodb.com/manual/reference/operator/query/not/
-            o, e = value.split(":", 1)
-            return field, {"$not": {o: e}}
-        case "$nor":
-            # https://docs.mongodb.com/manual/reference/operator/query/nor/
-            return "$nor", [{field: word} for word in value.split(",")]
-        case "$or" | "$any":
-            # https://docs.mongodb.com/manual/reference/operator/query/or/
-            return "$or", [{field: word} for word in value.split(",")]
-        # Element operators
-        case "$exists":
-            # https://docs.mongodb.com/manual/reference/operator/query/exists/
-            return field, {"$exists": value}
-        # case '$type'
-        # Evaluation operators
-        # case '$expr'
-        # case '$jsonSchema'
-        # case '$mod'
-        case "$regex":
-            # https://docs.mongodb.com/manual/reference/operator/query/regex/
-            return field, {"$regex": value, "$options": "i"}
-        case "$text" | "$search":
-            # https://docs.mongodb.com/manual/reference/operator/query/text/
-            return "$text", {"$search": unquote_plus(value)}
-        # case '$where'
-        # Geospatial operators
-        # case '$geoIntersects'
-        # case '$geoWithin'
-        # case '$near'
-        # case '$nearSphere'
-        # Array operators
-        # case '$all'
-        # case '$elemMatch'
-        # case '$size'
-        # Bitwise operators
-        # case '$bitsAllClear'
-        # case '$bitsAllSet'
-        # case '$bitsAnyClear'
-        # case '$bitsAnySet'
-        # Comments operators
-        # case '$comment'
-        # Projection operators
-        # case '$'
-        # case '$elemMatch'
-        # case '$meta'
-        # case '$slice'
-        case None:
-            return field, value
-        case _:
-            logging.warning(f"Case not matched for: {operator!r}")
+    if operator is None:
+        return field, value
 
-    return field, value
+    # Look up the operator expansion
+    expand = OPERATORS.get(operator)
+    if expand is None:
+        logging.warning(f"Case not matched for: {operator!r}")
+        return field, value
+    return expand(field, value, cast)
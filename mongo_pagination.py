@@ -0,0 +1,127 @@
+import base64
+import binascii
+import logging
+from pathlib import Path
+from urllib.parse import urlencode
+
+# https://pymongo.readthedocs.io/en/stable/
+import bson
+import bson.errors
+
+
+def keyset_sort(sort) -> list:
+    """Return the sort order with `_id' added as a unique tie breaker
+
+    'sort=-ctime' ---> [('ctime', -1), ('_id', -1)]
+    """
+    sort = [(field, int(direction)) for field, direction in (sort or [])]
+    if "_id" not in [field for field, _ in sort]:
+        # Follow the direction of the last sort field
+        sort.append(("_id", sort[-1][1] if sort else 1))
+    return sort
+
+
+def get_field(document, field: str):
+    """Get a (dotted) field value from a document or None when missing"""
+    value = document
+    for part in field.split("."):
+        if not hasattr(value, "get"):
+            return None
+        value = value.get(part)
+    return value
+
+
+def encode_token(sort: list, document) -> str:
+    """Encode the sort key of the last document into an opaque token"""
+    token = bson.encode(
+        {
+            "s": [[field, direction] for field, direction in sort],
+            "v": [get_field(document, field) for field, _ in sort],
+        }
+    )
+    return base64.urlsafe_b64encode(token).decode().rstrip("=")
+
+
+def decode_token(token: str, sort: list) -> list:
+    """Decode the sort key values from a token made with the same sort"""
+    try:
+        padding = "=" * (-len(token) % 4)
+        token = bson.decode(base64.urlsafe_b64decode(token + padding))
+    except (binascii.Error, bson.errors.BSONError) as err:
+        raise ValueError(f"Invalid continuation token: {err}") from err
+    if token.get("s") != [[field, direction] for field, direction in sort]:
+        raise ValueError("Continuation token does not match the sort order")
+    if len(token.get("v", [])) != len(sort):
+        raise ValueError("Invalid continuation token values")
+    return token["v"]
+
+
+def after_values(field: str, direction: int, value) -> list:
+    """Return the conditions of the field values sorted after `value'
+
+    Null and missing values sort before any other value, ascending they come
+    first and descending they come last. `_id' is never null.
+    """
+    if value is None:
+        # Nothing sorts after null descending
+        return [{"$ne": None}] if direction == 1 else []
+    if direction == 1:
+        return [{"$gt": value}]
+    if field == "_id":
+        return [{"$lt": value}]
+    return [{"$lt": value}, None]
+
+
+def keyset_filter(sort: list, values: list) -> dict:
+    """Build the range predicate selecting documents after the sort key values
+
+    [('ctime', -1), ('_id', -1)] ---> {'$or': [
+        {'ctime': {'$lt': ctime}},
+        {'ctime': None},
+        {'ctime': ctime, '_id': {'$lt': _id}},
+    ]}
+    """
+    clauses = []
+    for index, (field, direction) in enumerate(sort):
+        for condition in after_values(field, direction, values[index]):
+            clause = {sort[i][0]: values[i] for i in range(index)}
+            clause[field] = condition
+            clauses.append(clause)
+    return {"$or": clauses}
+
+
+def apply_keyset(spec, token: str):
+    """Page the query of a QuerySpec with a continuation token
+
+    An empty token starts keyset pagination from the first page.
+    """
+    prefix = f"{Path(__file__).name} - apply_keyset()"  # log message prefix
+
+    spec.sort = keyset_sort(spec.sort)
+    spec.skip = None
+    spec.after = token
+    # The sort fields are required to make the next token
+    if isinstance(spec.projection, list):
+        for field, _ in spec.sort:
+            if field not in spec.projection:
+                spec.projection.append(field)
+    elif isinstance(spec.projection, dict) and any(spec.projection.values()):
+        for field, _ in spec.sort:
+            spec.projection.setdefault(field, 1)
+    if token:
+        predicate = keyset_filter(spec.sort, decode_token(token, spec.sort))
+        if "$or" in spec.filter:
+            spec.filter["$and"] = spec.filter.get("$and", []) + [predicate]
+        else:
+            spec.filter.update(predicate)
+    logging.debug(f"{prefix} - spec: {spec!r}")
+
+
+def next_url(request, token: str) -> str:
+    """Return the URL of the next page for a `Link' header"""
+    arguments = {
+        key: [value.decode() for value in values]
+        for key, values in request.query_arguments.items()
+    }
+    arguments.update(after=[token])
+    return f"{request.path}?{urlencode(arguments, doseq=True)}"
@@ -0,0 +1,186 @@
+from collections import deque
+
+# https://pymongo.readthedocs.io/en/stable/api/pymongo/monitoring.html
+from pymongo import monitoring
+
+# AsyncMongoClient pool options by make_app keyword argument
+# https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/mongo_client.html
+POOL_OPTIONS = {
+    "max_pool_size": "maxPoolSize",
+    "min_pool_size": "minPoolSize",
+    "max_idle_time_ms": "maxIdleTimeMS",
+    "wait_queue_timeout_ms": "waitQueueTimeoutMS",
+    "max_connecting": "maxConnecting",
+}
+
+# Wire protocol compressors supported by the driver
+# https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/mongo_client.html#pymongo.asynchronous.mongo_client.AsyncMongoClient
+COMPRESSORS = ("zstd", "snappy", "zlib")
+
+# Read preference modes
+# https://www.mongodb.com/docs/manual/core/read-preference/#read-preference-modes
+READ_PREFERENCES = (
+    "primary",
+    "primaryPreferred",
+    "secondary",
+    "secondaryPreferred",
+    "nearest",
+)
+
+# Durations kept to report percentiles
+SAMPLE_SIZE = 1024
+
+
+def client_options(kwargs) -> dict:
+    """Return the AsyncMongoClient pool, compression and read preference options
+
+    Options not given (None) keep the driver defaults.
+    """
+    options = {}
+    for argument, option in POOL_OPTIONS.items():
+        value = kwargs.get(argument)
+        if value is None:
+            continue
+        if int(value) < 0:
+            raise ValueError(f"Invalid {option}: {value!r}")
+        options[option] = int(value)
+    if kwargs.get("compressors"):
+        compressors = [name.strip() for name in kwargs["compressors"].split(",")]
+        for name in compressors:
+            if name not in COMPRESSORS:
+                raise ValueError(f"Invalid compressor: {name!r}")
+        options["compressors"] = ",".join(compressors)
+    if kwargs.get("read_preference"):
+        if kwargs["read_preference"] not in READ_PREFERENCES:
+            raise ValueError(f"Invalid read preference: {kwargs['read_preference']!r}")
+        options["readPreference"] = kwargs["read_preference"]
+    return options
+
+
+class Durations:
+    """Count, mean, max and percentiles of the latest durations (milliseconds)"""
+
+    def __init__(self, size: int = SAMPLE_SIZE):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        self.samples.append(ms)
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+
+    def percentile(self, p: float) -> float | None:
+        if not self.samples:
+            return None
+        samples = sorted(self.samples)
+        return samples[min(int(len(samples) * p), len(samples) - 1)]
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count, 3) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max, 3),
+        }
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Record the connection pool size, use and checkout wait time"""
+
+    def __init__(self):
+        self.connections = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkout_failures = {}
+        self.pools_cleared = 0
+        self.checkout_wait = Durations()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.connections -= 1
+
+    def connection_check_out_started(self, event):
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        # A `timeout' reason is pool starvation (waitQueueTimeoutMS)
+        self.waiting -= 1
+        self.checkout_failures[event.reason] = (
+            self.checkout_failures.get(event.reason, 0) + 1
+        )
+        self.checkout_wait.add(event.duration * 1000)
+
+    def connection_checked_out(self, event):
+        self.waiting -= 1
+        self.in_use += 1
+        self.max_in_use = max(self.max_in_use, self.in_use)
+        self.checkout_wait.add(event.duration * 1000)
+
+    def connection_checked_in(self, event):
+        self.in_use -= 1
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "in_use": self.in_use,
+            "max_in_use": self.max_in_use,
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "checkout_wait": self.checkout_wait.stats(),
+            "checkout_failures": dict(self.checkout_failures),
+            "pools_cleared": self.pools_cleared,
+        }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Record the latency of database commands by command name"""
+
+    def __init__(self):
+        self.commands = {}
+        self.failures = {}
+
+    def _durations(self, command_name: str) -> Durations:
+        if command_name not in self.commands:
+            self.commands[command_name] = Durations()
+        return self.commands[command_name]
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._durations(event.command_name).add(event.duration_micros / 1000)
+
+    def failed(self, event):
+        self._durations(event.command_name).add(event.duration_micros / 1000)
+        self.failures[event.command_name] = self.failures.get(event.command_name, 0) + 1
+
+    def stats(self) -> dict:
+        return {
+            command_name: durations.stats()
+            | {"failures": self.failures.get(command_name, 0)}
+            for command_name, durations in self.commands.items()
+        }
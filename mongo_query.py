@@ -1,51 +1,269 @@
-import copy
 import logging
 
 from pathlib import Path
+from types import MappingProxyType
 
 from mongo_operator import operator_value
+from mongo_pagination import apply_keyset
+from mongo_query_cache import NOW, Now, QueryPlan, plan_key, resolve
+
+
+# Request arguments that are handler options and not query filter fields
+RESERVED_ARGUMENTS = frozenset(
+    ["approximate", "format", "pretty", "read_preference", "stream", "summary"]
+)
+
+
+class QueryDefaults:
+    """The default query filter and options compiled once, ready to merge
+
+    Values such as `$lte:$now' are kept as `$now' placeholders which are
+    resolved each time a query plan runs. A `now_window' (seconds) rounds
+    `$now' down so that requests within the window produce identical queries.
+    Fields declared in `field_types' are parsed as the declared type.
+    """
+
+    __slots__ = ("field_types", "filter", "now", "options")
+
+    def __init__(
+        self,
+        default_query_filter=None,
+        default_query_options=None,
+        now_window=0,
+        field_types=None,
+    ):
+        self.now = Now(now_window) if now_window else NOW
+        self.field_types = MappingProxyType(dict(field_types or {}))
+        # Expand the default filter values once
+        # 'field': '$foo:bar' ---> 'field', {'$foo': ['bar']}
+        compiled = {}
+        for key, value in (default_query_filter or {}).items():
+            compiled[key] = operator_value(
+                key, value, now=lambda: self.now, field_types=self.field_types
+            )
+        self.filter = MappingProxyType(compiled)
+        self.options = MappingProxyType(dict(default_query_options or {}))
 
+    def __repr__(self):
+        return f"QueryDefaults(filter={dict(self.filter)!r}, options={dict(self.options)!r}, now={self.now!r})"
 
-def build_query(settings, request):
-    """Build the query filter document and query options"""
-    prefix = f"{Path(__file__).name} - build_query()"  # log message prefix
 
-    # Unpack and parse the request arguments
+def get_query_defaults(settings) -> QueryDefaults:
+    """Return the compiled query defaults or compile the raw defaults"""
+    defaults = settings.get("query_defaults")
+    if defaults is None:
+        defaults = QueryDefaults(
+            settings.get("default_query_filter", {}),
+            settings.get("default_query_options", {}),
+            field_types=settings.get("field_types"),
+        )
+    return defaults
+
+
+class QuerySpec:
+    """The query filter document and query options parsed from a request"""
+
+    __slots__ = (
+        "after",
+        "filter",
+        "hint",
+        "limit",
+        "max_time_ms",
+        "options",
+        "projection",
+        "skip",
+        "sort",
+    )
+
+    def __init__(
+        self,
+        filter=None,
+        limit=10,
+        skip=None,
+        sort=None,
+        projection=None,
+        hint=None,
+        max_time_ms=None,
+        options=None,
+        after=None,
+    ):
+        self.filter = filter if filter is not None else {}
+        self.limit = limit
+        self.skip = skip
+        self.sort = sort
+        self.projection = projection
+        self.hint = hint
+        self.max_time_ms = max_time_ms
+        # Any other options from the default query options
+        self.options = options
+        # The keyset pagination token, None when not paging with `after'
+        self.after = after
+
+    def __repr__(self):
+        return f"QuerySpec({self.find_options()!r})"
+
+    def resolve(self, now) -> "QuerySpec":
+        """Return a copy with `$now' placeholders resolved to `now'"""
+        return QuerySpec(
+            resolve(self.filter, now),
+            self.limit,
+            self.skip,
+            resolve(self.sort, now),
+            resolve(self.projection, now),
+            self.hint,
+            self.max_time_ms,
+            resolve(self.options, now),
+            self.after,
+        )
+
+    def find_options(self) -> dict:
+        """Return the keyword arguments for `AsyncCollection.find'"""
+        options = dict(self.options) if self.options else {}
+        options["filter"] = self.filter
+        options["limit"] = self.limit
+        if self.skip is not None:
+            options["skip"] = self.skip
+        if self.sort is not None:
+            options["sort"] = self.sort
+        if self.projection is not None:
+            options["projection"] = self.projection
+        if self.hint is not None:
+            options["hint"] = self.hint
+        if self.max_time_ms is not None:
+            options["max_time_ms"] = self.max_time_ms
+        return options
+
+    def count_options(self) -> dict:
+        """Return the keyword arguments for `AsyncCollection.count_documents'
+
+        While skip and limit are valid options, only keep the filter.
+        """
+        options = {"filter": self.filter}
+        if self.hint is not None:
+            options["hint"] = self.hint
+        if self.max_time_ms is not None:
+            options["maxTimeMS"] = self.max_time_ms
+        return options
+
+
+def build_query(settings, request) -> dict:
+    """Build the query filter document and query options"""
+    return parse_query(settings, request).find_options()
+
+
+def parse_query(settings, request) -> QuerySpec:
+    """Parse the request into a QuerySpec
+
+    When a `query_plan_cache' is present in the settings the compiled query
+    is cached by the request arguments and only `$now' values are filled in
+    for repeated requests. The `after' continuation token is applied to the
+    query after the plan runs so every page shares the same plan.
+    """
+    prefix = f"{Path(__file__).name} - parse_query()"  # log message prefix
+
+    cache = settings.get("query_plan_cache")
+    if cache is None:
+        spec = QueryPlan(compile_query(settings, request)).run()
+    else:
+        key = plan_key(request)
+        plan = cache.get(key)
+        if plan is None:
+            plan = QueryPlan(compile_query(settings, request))
+            cache.put(key, plan)
+            logging.debug(f"{prefix} - compiled: {key!r}")
+        spec = plan.run()
+
+    # Keyset (seek) pagination 'after=<token>' replaces 'skip=<int>'
+    after = request.arguments.get("after")
+    if after is not None:
+        apply_keyset(spec, after[-1].decode())
+    return spec
+
+
+def compile_query(settings, request) -> QuerySpec:
+    """Parse the request arguments into a QuerySpec template in a single pass
+
+    `$now' values are left as placeholders and values may be shared with the
+    compiled query defaults, use `QueryPlan(...).run()' for a QuerySpec.
+    """
+    prefix = f"{Path(__file__).name} - compile_query()"  # log message prefix
+    defaults = get_query_defaults(settings)
+
+    # Start from the default query options
+    options = dict(defaults.options)
+    spec = QuerySpec(
+        limit=options.pop("limit", None),
+        skip=options.pop("skip", None),
+        sort=options.pop("sort", None),
+        projection=options.pop("projection", None),
+        hint=options.pop("hint", None),
+        max_time_ms=options.pop("max_time_ms", None),
+        options=options or None,
+    )
+    find_one = request.path.endswith("_one")
+
+    # Unpack and parse each request argument once
     arguments = {}
     for key, value in request.arguments.items():
-        # Unpack the value [..., b'value'] ---> 'value'
-        value = value[-1].decode()
-        # Process operators 'field=$foo:bar' ---> 'field', {'$foo': ['bar']}
-        key, value = operator_value(key, value)
-        arguments[key] = value
+        # Unpack the value [..., b'value'] ---> b'value'
+        value = value[-1]
+        match key:
+            case "limit":
+                # Enforce a positive int, apply a default when zero or less
+                if not find_one:
+                    limit = int(value)
+                    spec.limit = limit if limit >= 1 else 10
+            case "skip":
+                skip = int(value)
+                spec.skip = skip if skip >= 1 else 0
+            case "projection":
+                # Do not pass on empty values
+                if value:
+                    spec.projection = value.decode().split(",")
+            case "after":
+                # Applied by `parse_query' after the plan runs
+                pass
+            case "hint":
+                # The name of the index to use
+                if value:
+                    spec.hint = value.decode()
+            case _ if key in RESERVED_ARGUMENTS:
+                pass
+            case "sort":
+                if value:
+                    sort = value.decode()
+                    if sort.startswith("-"):
+                        # pymongo.DESCENDING = -1 Descending sort order.
+                        spec.sort = [(sort[1:], -1)]  # descending
+                    else:
+                        # pymongo.ASCENDING = 1 Ascending sort order.
+                        spec.sort = [(sort, 1)]  # ascending
+            case _:
+                # Process operators 'field=$foo:bar' ---> 'field', {'$foo': ['bar']}
+                key, value = operator_value(
+                    key,
+                    value.decode(),
+                    now=lambda: defaults.now,
+                    field_types=defaults.field_types,
+                )
+                arguments[key] = value
     logging.debug(f"{prefix} - arguments: {arguments!r}")
 
-    # Remove known query option key/values from the arguments
-    query = copy.deepcopy(settings.get("default_query_options", {}))
-    for key in ["limit", "projection", "skip", "sort"]:
-        if key in arguments.keys():
-            value = arguments.pop(key)
-            # Do not pass on empty values
-            if value != "":
-                query[key] = value
-    logging.debug(f"{prefix} - query: {query!r}")
-
-    # Handle (re)setting specific query options
-    query = set_option_limit(request, query)
-    query = set_option_projection(request, query)
-    query = set_option_skip(request, query)
-    query = set_option_sort(request, query)
-    logging.debug(f"{prefix} - query: {query!r}")
+    # Enforce query result limit
+    if find_one:
+        spec.limit = 1
+    # Always set a default when a value is not set
+    elif spec.limit is None:
+        spec.limit = 10
 
     # Merge the arguments and default query filter
     # The default values may override request arguments
     # Evaluate the combined set of keys from default and request arguments
-    query_filter = {}
-    default_query_filter = settings.get("default_query_filter", {})
-    for key in set(list(default_query_filter.keys()) + list(arguments.keys())):
-        # Get the expanded value for the key from the default_query_filter
+    query_filter = spec.filter
+    for key in set(list(defaults.filter.keys()) + list(arguments.keys())):
+        # Get the expanded value for the key from the compiled defaults
         # 'field=$foo:bar' ---> 'field', {'$foo': ['bar']}
-        key, value = operator_value(key, default_query_filter.get(key))
+        key, value = defaults.filter.get(key, (key, None))
         logging.debug(f"{prefix} - key: {key!r} is: {value!r} in default_query_filter")
         logging.debug(
             f"{prefix} - key: {key!r} is: {arguments.get(key)!r} in arguments"
@@ -80,82 +298,5 @@ def build_query(settings, request):
             )
             query_filter[key] = value
 
-    # Add the query_filter as filter to the query
-    query.update(filter=query_filter)
-
-    logging.debug(f"{prefix} - query: {query!r}")
-    return query
-
-
-def set_option_limit(request, query: dict) -> dict:
-    """Enforce query result limit"""
-    prefix = f"{Path(__file__).name} - set_option_limit()"  # log message prefix
-
-    if request.path.endswith("_one"):
-        query.update(limit=1)
-
-    # Allow a limit to be specified by a request argument of 'limit'
-    elif request.arguments.get("limit") is not None:
-        limit = int(request.arguments.get("limit")[-1])
-        # Enforce a positive int
-        if limit >= 1:
-            query.update(limit=limit)
-        # Apply a default when zero or less
-        else:
-            query.update(limit=10)
-
-    # Always set a default when a value is not set
-    if query.get("limit") is None:
-        query.update(limit=10)
-
-    logging.debug(f"{prefix} - query['limit']: {query.get('limit')!r}")
-    return query
-
-
-def set_option_projection(request, query) -> dict:
-    prefix = f"{Path(__file__).name} - set_option_projection()"  # log message prefix
-
-    # Allow a projection to be specified by a request argument of 'projection'
-    # Only when a projection was not already set by default_query_options
-    if request.arguments.get("projection") is not None:
-        projection = request.arguments.get("projection")[-1].decode()
-        if projection != "":
-            projection = projection.split(",")
-            query.update(projection=projection)
-
-    logging.debug(f"{prefix} - query['projection']: {query.get('projection')!r}")
-    return query
-
-
-def set_option_skip(request, query) -> dict:
-    prefix = f"{Path(__file__).name} - set_option_skip()"  # log message prefix
-
-    # Allow skip to be specified by a request argument of 'skip'
-    if request.arguments.get("skip") is not None:
-        skip = int(request.arguments.get("skip")[-1])
-        if skip >= 1:
-            query.update(skip=skip)
-        else:
-            query.update(skip=0)
-
-    logging.debug(f"{prefix} - query['skip']: {query.get('skip')!r}")
-    return query
-
-
-def set_option_sort(request, query) -> dict:
-    prefix = f"{Path(__file__).name} - set_option_sort()"  # log message prefix
-
-    # Allow sort to be specified by a request argument key of 'sort'
-    if request.arguments.get("sort") is not None:
-        sort = request.arguments.get("sort")[-1].decode()
-        if sort:
-            if sort.startswith("-"):
-                # pymongo.DESCENDING = -1 Descending sort order.
-                sort = [(sort[1:], -1)]  # descending
-            else:
-                # pymongo.ASCENDING = 1 Ascending sort order.
-                sort = [(sort, 1)]  # ascending
-            query.update(sort=sort)
-
-    logging.debug(f"{prefix} - query['sort']: {query.get('sort')!r}")
-    return query
+    logging.debug(f"{prefix} - spec: {spec!r}")
+    return spec
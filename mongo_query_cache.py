@@ -0,0 +1,139 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+class Now:
+    """Placeholder for a `$now' value that is resolved when a query plan runs
+
+    A `window' (seconds) rounds the resolved date/time down to the start of
+    the window.
+    """
+
+    __slots__ = ("window",)
+
+    def __init__(self, window: float = 0):
+        self.window = float(window)
+
+    def __repr__(self):
+        return f"$now({self.window:g}s)" if self.window else "$now"
+
+    def at(self, now: datetime) -> datetime:
+        if not self.window:
+            return now
+        timestamp = now.timestamp()
+        return datetime.fromtimestamp(
+            timestamp - timestamp % self.window, tz=now.tzinfo
+        )
+
+
+# The default `$now' placeholder used in compiled query plans
+NOW = Now()
+
+
+def resolve(value, now: datetime):
+    """Copy a query plan template replacing `$now' placeholders with `now'
+
+    Containers are always copied so the caller is free to modify the result
+    without changing the cached template.
+    """
+    if type(value) is Now:
+        return value.at(now)
+    if type(value) is dict:
+        return {key: resolve(item, now) for key, item in value.items()}
+    if type(value) is list:
+        return [resolve(item, now) for item in value]
+    if type(value) is tuple:
+        return tuple(resolve(item, now) for item in value)
+    return value
+
+
+def contains_now(value) -> bool:
+    """Return True when a query plan template contains a `$now' placeholder"""
+    if type(value) is Now:
+        return True
+    if type(value) is dict:
+        return any(contains_now(item) for item in value.values())
+    if type(value) in (list, tuple):
+        return any(contains_now(item) for item in value)
+    return False
+
+
+# Request arguments that are applied after a query plan runs
+PLAN_EXCLUDED_ARGUMENTS = frozenset(["after"])
+
+
+def plan_key(request) -> tuple:
+    """Normalize the request arguments and route suffix into a cache key
+
+    Only the last value of each argument is used by `build_query', so
+    only the last value is part of the key.
+    """
+    arguments = tuple(
+        sorted(
+            (key, value[-1])
+            for key, value in request.arguments.items()
+            if key not in PLAN_EXCLUDED_ARGUMENTS
+        )
+    )
+    return bool(request.path.endswith("_one")), arguments
+
+
+class QueryPlan:
+    """A compiled QuerySpec with any `$now' values left as placeholders"""
+
+    __slots__ = ("template", "volatile")
+
+    def __init__(self, template):
+        self.template = template
+        self.volatile = contains_now(template.filter)
+
+    def run(self):
+        """Return a new QuerySpec from the compiled template"""
+        now = datetime.now(tz=timezone.utc) if self.volatile else None
+        return self.template.resolve(now)
+
+
+class QueryPlanCache:
+    """A bounded least recently used cache of compiled query plans"""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = int(maxsize)
+        self.plans = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.plans)
+
+    def get(self, key) -> QueryPlan | None:
+        plan = self.plans.get(key)
+        if plan is None:
+            self.misses += 1
+            return None
+        self.plans.move_to_end(key)
+        self.hits += 1
+        return plan
+
+    def put(self, key, plan: QueryPlan):
+        prefix = f"{Path(__file__).name} - QueryPlanCache.put()"  # log message prefix
+        self.plans[key] = plan
+        self.plans.move_to_end(key)
+        while len(self.plans) > self.maxsize:
+            evicted, _ = self.plans.popitem(last=False)
+            self.evictions += 1
+            logging.debug(f"{prefix} - evicted: {evicted!r}")
+
+    def clear(self):
+        self.plans.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self.plans),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
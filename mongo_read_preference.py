@@ -0,0 +1,113 @@
+import json
+import logging
+from pathlib import Path
+
+# https://pymongo.readthedocs.io/en/stable/api/pymongo/read_preferences.html
+from pymongo.read_preferences import (
+    Nearest,
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+)
+
+# Read preference classes by mode
+# https://www.mongodb.com/docs/manual/core/read-preference/#read-preference-modes
+READ_PREFERENCE_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+# The smallest maxStalenessSeconds the servers accept
+# https://www.mongodb.com/docs/manual/core/read-preference-staleness/
+MIN_MAX_STALENESS = 90
+
+
+def read_preference(mode: str, tags: list | None = None, max_staleness: int = -1):
+    """Return the pymongo read preference of a mode, tag sets and max staleness
+
+    The primary mode takes neither tag sets nor a max staleness.
+    """
+    if mode not in READ_PREFERENCE_MODES:
+        raise ValueError(f"Invalid read preference: {mode!r}")
+    if mode == "primary":
+        return Primary()
+    if max_staleness != -1 and max_staleness < MIN_MAX_STALENESS:
+        raise ValueError(
+            f"Invalid max_staleness: {max_staleness!r}, at least {MIN_MAX_STALENESS}"
+        )
+    if tags is not None and not all(isinstance(tag_set, dict) for tag_set in tags):
+        raise ValueError(f"Invalid tag sets: {tags!r}")
+    return READ_PREFERENCE_MODES[mode](tag_sets=tags, max_staleness=max_staleness)
+
+
+def parse_read_preferences(read_preferences: str | dict) -> dict:
+    """Load the read preference per route
+
+    '{"count_documents": {"mode": "secondaryPreferred", "max_staleness": 120,
+      "tags": [{"dc": "east"}, {}], "allow": ["primary", "nearest"]},
+      "find": "nearest"}'
+
+    `allow' lists the modes a request may ask for with `read_preference',
+    they share the tag sets and max staleness of the route.
+    """
+    if isinstance(read_preferences, str):
+        read_preferences = json.loads(read_preferences)
+    routes = {}
+    for route, options in read_preferences.items():
+        if isinstance(options, str):
+            options = {"mode": options}
+        if not isinstance(options, dict) or set(options) - {
+            "mode",
+            "tags",
+            "max_staleness",
+            "allow",
+        }:
+            raise ValueError(
+                f"Invalid read preference: {options!r} for route: {route!r}"
+            )
+        mode = options.get("mode", "primary")
+        tags = options.get("tags")
+        max_staleness = int(options.get("max_staleness", -1))
+        allowed = {
+            name: read_preference(name, tags, max_staleness)
+            for name in [mode] + list(options.get("allow", []))
+        }
+        routes[route] = {"default": allowed[mode], "allow": allowed}
+    return routes
+
+
+def route_read_preference(handler, route: str):
+    """Return the read preference of a request to a route, None for the client's
+
+    A `read_preference' argument selects one of the modes allowed for the
+    route, other modes raise a ValueError.
+    """
+    config = handler.settings.get("read_preferences", {}).get(route)
+    mode = handler.get_argument("read_preference", None)
+    if mode is None:
+        return config["default"] if config is not None else None
+    if config is None or mode not in config["allow"]:
+        raise ValueError(f"Read preference not allowed: {mode!r} for route: {route!r}")
+    return config["allow"][mode]
+
+
+def with_read_preference(handler, collection, preference):
+    """Return the collection handle reading with a read preference, cached"""
+    prefix = f"{Path(__file__).name} - with_read_preference()"  # log message prefix
+
+    if preference is None or collection is None:
+        return collection
+    handles = handler.settings.get("read_collections")
+    key = (id(collection), repr(preference))
+    if handles is None or key not in handles:
+        # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.with_options
+        handle = collection.with_options(read_preference=preference)
+        logging.debug(f"{prefix} - {preference!r}")
+        if handles is None:
+            return handle
+        handles[key] = handle
+    return handles[key]
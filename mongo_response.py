@@ -0,0 +1,172 @@
+import gzip
+import json
+import logging
+import time
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.ioloop
+
+from mongo_http_cache import body_etag, not_modified
+
+# Optional zstd and brotli content codings
+# https://docs.python.org/3.14/library/compression.zstd.html
+# https://python-zstandard.readthedocs.io/en/latest/
+# https://github.com/google/brotli
+try:
+    from compression import zstd
+except ImportError:
+    try:
+        import zstandard as zstd
+    except ImportError:
+        zstd = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Bodies at least this large are compressed off the event loop
+EXECUTOR_MIN_SIZE = 64 * 1024
+
+
+def _gzip(data: bytes, level: int) -> bytes:
+    # A fixed mtime keeps the output the same for the same body
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _zstd(data: bytes, level: int) -> bytes:
+    return zstd.compress(data, level=level)
+
+
+def _brotli(data: bytes, level: int) -> bytes:
+    return brotli.compress(data, quality=level)
+
+
+# Content coding ---> (compress function, default level) by server preference
+# https://www.rfc-editor.org/rfc/rfc9110#name-content-codings
+CODINGS = {}
+if brotli is not None:
+    CODINGS["br"] = (_brotli, 5)
+if zstd is not None:
+    CODINGS["zstd"] = (_zstd, 3)
+CODINGS["gzip"] = (_gzip, 6)
+# Content coding ---> valid compression levels
+LEVELS = {"br": range(12), "gzip": range(10), "zstd": range(1, 23)}
+
+
+def negotiate(accept_encoding: str, codings=CODINGS) -> str | None:
+    """Select the content coding for an `Accept-Encoding' request header
+
+    'br;q=0.5, gzip' ---> 'gzip'
+    """
+    # https://www.rfc-editor.org/rfc/rfc9110#field.accept-encoding
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        params = params.strip()
+        try:
+            q = float(params[2:]) if params.startswith("q=") else 1.0
+        except ValueError:
+            continue
+        accepted[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    # Codings are in server preference order, the first of the highest q wins
+    for coding in codings:
+        q = accepted.get(coding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def parse_compression_level(compression_level: str | dict) -> dict:
+    """Load and validate compression levels per coding ('{"gzip": 6, ...}')"""
+    if isinstance(compression_level, str):
+        compression_level = json.loads(compression_level)
+    for coding, level in compression_level.items():
+        if coding not in LEVELS:
+            raise ValueError(f"Unknown content coding: {coding!r}")
+        if not isinstance(level, int) or level not in LEVELS[coding]:
+            raise ValueError(f"Invalid level: {level!r} for coding: {coding!r}")
+    return dict(compression_level)
+
+
+class ResponseCompressor:
+    """Compress response bodies with a negotiated content coding"""
+
+    def __init__(self, min_size: int = 1024, levels: dict | None = None):
+        self.min_size = int(min_size)
+        self.levels = {coding: level for coding, (_, level) in CODINGS.items()}
+        self.levels.update(
+            {
+                coding: level
+                for coding, level in (levels or {}).items()
+                if coding in CODINGS
+            }
+        )
+        # {coding: [responses, bytes in, bytes out, cpu seconds]}
+        self.counters = {coding: [0, 0, 0, 0.0] for coding in CODINGS}
+
+    def compress(self, coding: str, data: bytes) -> bytes:
+        start = time.thread_time()
+        compress, _ = CODINGS[coding]
+        body = compress(data, self.levels[coding])
+        counters = self.counters[coding]
+        counters[0] += 1
+        counters[1] += len(data)
+        counters[2] += len(body)
+        counters[3] += time.thread_time() - start
+        return body
+
+    async def compress_async(self, coding: str, data: bytes) -> bytes:
+        """Compress large bodies in the default executor"""
+        if len(data) < EXECUTOR_MIN_SIZE:
+            return self.compress(coding, data)
+        return await tornado.ioloop.IOLoop.current().run_in_executor(
+            None, self.compress, coding, data
+        )
+
+    def stats(self) -> dict:
+        stats = {"min_size": self.min_size, "levels": dict(self.levels)}
+        for coding, (responses, bytes_in, bytes_out, cpu) in self.counters.items():
+            stats[coding] = {
+                "responses": responses,
+                "bytes_in": bytes_in,
+                "bytes_out": bytes_out,
+                "ratio": round(bytes_in / bytes_out, 2) if bytes_out else None,
+                "cpu_ms": round(cpu * 1000.0, 2),
+            }
+        return stats
+
+
+async def write_response(
+    handler, body: bytes, encodings: dict | None = None, etag: str | None = None
+):
+    """Write a response body, compressed when the client accepts it
+
+    `encodings' ({coding: body}) keeps the compressed bodies of a cached
+    response so each coding is only compressed once. Without an `etag' a
+    strong ETag of the body is set and a matching `If-None-Match' request is
+    answered with `304 Not Modified' before compressing or sending the body.
+    """
+    prefix = f"{Path(__file__).name} - write_response()"  # log message prefix
+
+    compressor = handler.settings.get("response_compressor")
+    coding = None
+    if compressor is not None:
+        handler.add_header("Vary", "Accept-Encoding")
+        if len(body) >= compressor.min_size:
+            coding = negotiate(handler.request.headers.get("Accept-Encoding", ""))
+    if not_modified(handler, etag or body_etag(body, coding)):
+        return
+    if coding is None:
+        handler.write(body)
+        return
+    encoded = encodings.get(coding) if encodings is not None else None
+    if encoded is None:
+        encoded = await compressor.compress_async(coding, body)
+        if encodings is not None:
+            encodings[coding] = encoded
+    logging.debug(f"{prefix} - {coding}: {len(body)} ---> {len(encoded)} bytes")
+    handler.set_header("Content-Encoding", coding)
+    handler.write(encoded)
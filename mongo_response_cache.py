@@ -0,0 +1,298 @@
+import hmac
+import json
+import logging
+import secrets
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from mongo_response import write_response
+
+# Response headers kept with a cached response body
+CACHED_HEADERS = ("Content-Type", "Link", "Vary", "X-Count-Exact")
+
+# Request header of the requests refreshing a cached response, the value is
+# a secret of the process so only its own refresh requests skip the cache
+REFRESH_HEADER = "X-Cache-Refresh"
+REFRESH_TOKEN = secrets.token_urlsafe(32)
+# Addresses of the refresh requests of the process
+LOOPBACK = ("127.0.0.1", "::1")
+
+# Query options set per request from its deadline, not part of the key
+DEADLINE_OPTIONS = ("max_time_ms", "maxTimeMS")
+
+
+def canonical(value):
+    """Return a hashable form of a query that does not depend on key order"""
+    match value:
+        case dict():
+            return tuple(sorted((key, canonical(item)) for key, item in value.items()))
+        case list() | tuple():
+            return tuple(canonical(item) for item in value)
+        case _:
+            return value
+
+
+def cache_key(route: str, query: dict, *variant, namespace: str | None = None) -> tuple:
+    """Key a response by collection, route, normalized query and format variant"""
+    query = {
+        option: value
+        for option, value in query.items()
+        if option not in DEADLINE_OPTIONS
+    }
+    return (namespace, route, canonical(query), variant)
+
+
+class CacheEntry:
+    """An encoded response with its headers and compressed bodies"""
+
+    __slots__ = (
+        "body",
+        "charged",
+        "encodings",
+        "etag",
+        "expires",
+        "generation",
+        "headers",
+    )
+
+    def __init__(self, body: bytes, headers: list, etag: str | None = None):
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        # {coding: body}, filled by write_response()
+        self.encodings = {}
+        self.expires = None
+        self.generation = None
+        # The bytes counted for the entry in the cache
+        self.charged = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + sum(len(body) for body in self.encodings.values())
+
+
+class ResponseCache:
+    """A TTL and least recently used cache of responses bounded by bytes
+
+    An expired entry is still served for `stale' seconds while it is
+    refreshed in the background (stale-while-revalidate).
+    """
+
+    def __init__(
+        self, ttl: float = 5.0, max_bytes: int = 16 * 1024 * 1024, stale: float = 0
+    ):
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.stale = float(stale)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.bytes -= entry.charged
+
+    def get(self, key, generation: int = 0, now: float | None = None):
+        """Return a fresh entry written before no newer write or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        now = time.monotonic() if now is None else now
+        if entry.generation != generation:
+            # A write through this process since the response was cached
+            self.invalidations += 1
+            self._remove(key)
+            self.misses += 1
+            return None
+        if entry.expires <= now < entry.expires + self.stale:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            self.stale_hits += 1
+            return entry
+        if entry.expires <= now:
+            self.expirations += 1
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(
+        self, key, entry: CacheEntry, generation: int = 0, now: float | None = None
+    ):
+        """(Re)Store an entry, evict the least recently used over max bytes"""
+        if key in self.entries:
+            self._remove(key)
+        if entry.size > self.max_bytes:
+            return
+        if entry.expires is None:
+            now = time.monotonic() if now is None else now
+            entry.expires = now + self.ttl
+            entry.generation = generation
+        entry.charged = entry.size
+        self.entries[key] = entry
+        self.bytes += entry.charged
+        while self.bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def is_stale(self, entry: CacheEntry, now: float | None = None) -> bool:
+        return entry.expires <= (time.monotonic() if now is None else now)
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl,
+            "stale": self.stale,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / requests, 3) if requests else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+def parse_response_cache(response_cache: str | dict) -> dict:
+    """Load the response cache per route ('{"find": {"ttl": 5, "max_bytes": ...}}')
+
+    The options of a route are `ttl', `max_bytes' and `stale' (seconds).
+    """
+    if isinstance(response_cache, str):
+        response_cache = json.loads(response_cache)
+    caches = {}
+    for route, options in response_cache.items():
+        if not isinstance(options, dict) or set(options) - {
+            "ttl",
+            "max_bytes",
+            "stale",
+        }:
+            raise ValueError(
+                f"Invalid response cache: {options!r} for route: {route!r}"
+            )
+        caches[route] = ResponseCache(**options)
+        cache = caches[route]
+        if cache.ttl <= 0 or cache.max_bytes <= 0 or cache.stale < 0:
+            raise ValueError(
+                f"Invalid response cache: {options!r} for route: {route!r}"
+            )
+    return caches
+
+
+def write_generation(settings) -> int:
+    generation = settings.get("write_generation")
+    return generation.value if generation is not None else 0
+
+
+class CachedHeadersMixin:
+    """Record the response headers of a RequestHandler kept with a cached response
+
+    Tornado keeps the response headers private, so the headers in
+    `CACHED_HEADERS' are recorded as the route sets them.
+    """
+
+    cached_headers = ()
+
+    def set_header(self, name, value):
+        super().set_header(name, value)
+        if name in CACHED_HEADERS:
+            self.cached_headers = [
+                header for header in self.cached_headers if header[0] != name
+            ] + [(name, str(value))]
+
+    def add_header(self, name, value):
+        super().add_header(name, value)
+        if name in CACHED_HEADERS:
+            self.cached_headers = [*self.cached_headers, (name, str(value))]
+
+    def clear_header(self, name):
+        super().clear_header(name)
+        self.cached_headers = [
+            header for header in self.cached_headers if header[0] != name
+        ]
+
+
+class CachedRoute:
+    """The response cache lookup of one read request"""
+
+    def __init__(
+        self, cache: ResponseCache, key: tuple, generation: int, lookup: bool = True
+    ):
+        self.cache = cache
+        self.key = key
+        # The write generation before the query, a concurrent write
+        # invalidates the stored response
+        self.generation = generation
+        self.entry = cache.get(key, generation) if lookup else None
+
+    async def write(self, handler):
+        """Write the cached response, a new content coding grows the entry
+
+        A stale response is refreshed in the background, once per key.
+        """
+        entry = self.entry
+        refresher = handler.settings.get("cache_refresher")
+        if refresher is not None and self.cache.is_stale(entry):
+            refresher.revalidate(self.key, handler.request)
+        for name, value in entry.headers:
+            if name == "Vary":
+                handler.add_header(name, value)
+            else:
+                handler.set_header(name, value)
+        codings = len(entry.encodings)
+        await write_response(handler, entry.body, entry.encodings, etag=entry.etag)
+        if len(entry.encodings) != codings:
+            self.cache.put(self.key, entry, self.generation)
+
+    async def store(self, handler, body: bytes, etag: str | None = None):
+        """Write an encoded response and keep it with its compressed bodies
+
+        The handler records its headers with the `CachedHeadersMixin'.
+        """
+        entry = CacheEntry(body, list(handler.cached_headers), etag)
+        await write_response(handler, body, entry.encodings, etag=etag)
+        self.cache.put(self.key, entry, self.generation)
+
+
+def is_refresh(request) -> bool:
+    """Return True for a refresh request of this process"""
+    token = request.headers.get(REFRESH_HEADER)
+    return (
+        token is not None
+        and request.remote_ip in LOOPBACK
+        and hmac.compare_digest(token, REFRESH_TOKEN)
+    )
+
+
+def cached_route(handler, route: str, query: dict, *variant) -> CachedRoute | None:
+    """Look up the response of a read route in its response cache, if any"""
+    prefix = f"{Path(__file__).name} - cached_route()"  # log message prefix
+
+    cache = handler.settings.get("response_cache", {}).get(route)
+    if cache is None:
+        return None
+    key = cache_key(route, query, *variant, namespace=handler.settings.get("namespace"))
+    # A refresh request replaces the cached response
+    lookup = not is_refresh(handler.request)
+    cached = CachedRoute(cache, key, write_generation(handler.settings), lookup)
+    logging.debug(f"{prefix} - {route} hit: {cached.entry is not None!r}")
+    return cached
@@ -0,0 +1,112 @@
+import asyncio
+import contextvars
+import logging
+from pathlib import Path
+
+from mongo_response_cache import DEADLINE_OPTIONS, cache_key
+
+
+class Flight:
+    """A database call in flight and the number of requests awaiting it"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one database call among identical concurrent requests
+
+    The first request of a key (the leader) starts the call, the requests
+    arriving while it is in flight (followers) await the same result or
+    error. A cancelled request only stops waiting, the call is cancelled
+    once no request awaits it anymore.
+
+    The call runs outside the context of the leader, so the `pymongo.timeout'
+    of its request does not cut the call short for followers with a later
+    deadline. Each request waits for its own deadline and the call lasts as
+    long as the longest waiting request.
+    """
+
+    def __init__(self):
+        self.flights = {}
+        self.leaders = 0
+        self.followers = 0
+        self.errors = 0
+        self.cancelled = 0
+
+    def __len__(self):
+        return len(self.flights)
+
+    def _done(self, key, task: asyncio.Task):
+        if self.flights.get(key) is not None and self.flights[key].task is task:
+            del self.flights[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.errors += 1
+
+    async def do(self, key, factory, timeout: float | None = None):
+        """Await the result of `factory()' shared by the requests of a key
+
+        A `timeout' (seconds) bounds the wait of this request only.
+        """
+        prefix = f"{Path(__file__).name} - SingleFlight.do()"  # log message prefix
+
+        flight = self.flights.get(key)
+        if flight is None:
+            self.leaders += 1
+            # https://docs.python.org/3/library/asyncio-eventloop.html#asyncio.loop.create_task
+            flight = Flight(
+                asyncio.get_running_loop().create_task(
+                    factory(), context=contextvars.Context()
+                )
+            )
+            flight.task.add_done_callback(lambda task: self._done(key, task))
+            self.flights[key] = flight
+        else:
+            self.followers += 1
+            logging.debug(f"{prefix} - follower #{flight.waiters} of: {key!r}")
+        flight.waiters += 1
+        try:
+            # https://docs.python.org/3/library/asyncio-task.html#asyncio.shield
+            return await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # The last request stopped waiting, nobody needs the result
+                logging.debug(f"{prefix} - cancelled: {key!r}")
+                self.cancelled += 1
+                flight.task.cancel()
+
+    def stats(self) -> dict:
+        requests = self.leaders + self.followers
+        return {
+            "in_flight": len(self.flights),
+            "leaders": self.leaders,
+            "followers": self.followers,
+            "coalesced_ratio": round(self.followers / requests, 3)
+            if requests
+            else None,
+            "errors": self.errors,
+            "cancelled": self.cancelled,
+        }
+
+
+def coalesce(handler, route: str, query: dict, factory, *variant):
+    """Return the awaitable database call `factory(query)' of a request
+
+    Requests share a call when their route, query and `variant' (e.g. the
+    read preference) match. A shared call leaves out the deadline options
+    (`maxTimeMS') of the request that started it.
+    """
+    flights = handler.settings.get("single_flight")
+    if flights is None:
+        return factory(query)
+    key = cache_key(route, query, *variant, namespace=handler.settings.get("namespace"))
+    shared = {
+        option: value
+        for option, value in query.items()
+        if option not in DEADLINE_OPTIONS
+    }
+    return flights.do(key, lambda: factory(shared), timeout=handler.remaining())
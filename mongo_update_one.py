@@ -1,5 +1,4 @@
 import logging
-import json
 
 from datetime import datetime, timezone
 from pathlib import Path
@@ -11,11 +10,13 @@ from bson.errors import InvalidId
 # https://www.tornadoweb.org/en/stable/
 import tornado.web
 
-from mongo_jsonencoder import ExtendedJSONEncoder
+from mongo_collections import CollectionMixin
+from mongo_formats import encode_response
+from mongo_http_cache import bump_write_generation
 from mongo_operator import operator_value
 
 
-class UpdateOneHandler(tornado.web.RequestHandler):
+class UpdateOneHandler(CollectionMixin, tornado.web.RequestHandler):
     async def get(self, *args, **kwargs):
         """Update a single document matching the filter"""
         name = f"{Path(__file__).name} -"
@@ -53,7 +54,7 @@ class UpdateOneHandler(tornado.web.RequestHandler):
                 value = value[-1].decode()  # [..., b'value'] ---> 'value'
                 if key not in ["_id", "upsert"]:
                     key, value = operator_value(
-                        key, value
+                        key, value, field_types=self.settings.get("field_types")
                     )  # 'field=$foo:bar' ---> 'field', {'$foo': ['bar']}
                     update[key] = value
         except ValueError as err:
@@ -75,6 +76,7 @@ class UpdateOneHandler(tornado.web.RequestHandler):
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/collection.html#pymongo.asynchronous.collection.AsyncCollection.update_one
         # https://pymongo.readthedocs.io/en/stable/api/pymongo/results.html#pymongo.results.UpdateResult
         result = await collection.update_one(**document)
+        bump_write_generation(self.settings)
         response.update(count=1)
         response.update(result=[result])
         if self.settings.get("debug", False):
@@ -82,14 +84,8 @@ class UpdateOneHandler(tornado.web.RequestHandler):
             response.update(database=collection.database.name)
             response.update(collection=collection.name)
             response.update(document=document)
-        # Normalize the response into a JSON formatted response
+        # Normalize the response into the format the client accepts, JSON by default
         self.set_header("Server", "Python/Tornado/MongoClient")
-        self.set_header("Content-Type", "text/json")
-        response = json.dumps(
-            response,
-            indent=4,
-            separators=(",", ": "),
-            sort_keys=True,
-            cls=ExtendedJSONEncoder,
+        self.write(
+            encode_response(self, response, pretty=self.settings.get("debug", False))
         )
-        self.write(response + "\n")
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import ChainMap
+from pathlib import Path
+
+# https://www.tornadoweb.org/en/stable/
+import tornado.httputil
+
+# https://pymongo.readthedocs.io/en/stable/
+from bson.errors import BSONError
+from pymongo.errors import PyMongoError
+
+from mongo_query import parse_query
+
+# Read request paths of an allow-listed collection, /{database}/{collection}/...
+NAMESPACE_PATH = re.compile(r"/(?P<database>[^/.]+)/(?P<collection>[^/]+)/[^/]+")
+
+
+def parse_warm_up_queries(warm_up_queries: str | list) -> list:
+    """Load the queries to run before listening ('["/find?status=public", ...]')"""
+    if isinstance(warm_up_queries, str):
+        warm_up_queries = json.loads(warm_up_queries)
+    if not isinstance(warm_up_queries, list) or not all(
+        isinstance(uri, str) and uri.startswith("/") for uri in warm_up_queries
+    ):
+        raise ValueError(f"Invalid warm-up queries: {warm_up_queries!r}")
+    return list(warm_up_queries)
+
+
+async def run_query(settings, uri: str):
+    """Run the database call of a read request URI, /find or /count_documents
+
+    A /{database}/{collection}/... URI runs with the collection, default
+    query and query plan cache of the allow-listed collection.
+    """
+    request = tornado.httputil.HTTPServerRequest(method="GET", uri=uri)
+    registry = settings.get("collections")
+    match = NAMESPACE_PATH.fullmatch(request.path)
+    if registry is not None and match is not None:
+        namespace = registry.get(*match.groups())
+        if namespace is None:
+            raise ValueError(f"Collection not allowed: {request.path!r}")
+        settings = ChainMap(namespace, settings)
+    collection = settings["collection"]
+    spec = parse_query(settings, request)
+    if request.path.endswith("/count_documents"):
+        return await collection.count_documents(**spec.count_options())
+    return await collection.find(**spec.find_options()).to_list(spec.limit)
+
+
+async def warm_up(
+    settings, queries: list | None = None, min_pool_size: int = 0
+) -> dict:
+    """Connect, fill the connection pool and run queries before taking requests
+
+    Each phase is timed and logged, a failed phase is logged and skipped so
+    the service still starts (and connects lazily) when MongoDB is down or a
+    query is invalid.
+
+    connect - start the topology monitors
+    ping    - select a server, open and authenticate the first connection
+    pool    - open `min_pool_size' connections with concurrent pings
+    queries - run the read requests to load their working set in memory
+    """
+    prefix = f"{Path(__file__).name} - warm_up()"  # log message prefix
+
+    client = settings["asyncmongoclient"]
+    phases = {}
+
+    async def phase(name: str, awaitable):
+        started = time.perf_counter()
+        try:
+            await awaitable
+        except (PyMongoError, BSONError, OSError, ValueError) as err:
+            phases[name] = {"ms": round((time.perf_counter() - started) * 1000, 3)}
+            phases[name].update(error=repr(err))
+            logging.warning(f"{prefix} - {name}: {phases[name]['ms']}ms {err!r}")
+            return
+        phases[name] = {"ms": round((time.perf_counter() - started) * 1000, 3)}
+        logging.info(f"{prefix} - {name}: {phases[name]['ms']}ms")
+
+    started = time.perf_counter()
+    # https://pymongo.readthedocs.io/en/stable/api/pymongo/asynchronous/mongo_client.html#pymongo.asynchronous.mongo_client.AsyncMongoClient.aconnect
+    await phase("connect", client.aconnect())
+    # https://www.mongodb.com/docs/manual/reference/command/ping/
+    await phase("ping", client.admin.command("ping"))
+    if min_pool_size > 1:
+        pings = [client.admin.command("ping") for _ in range(min_pool_size)]
+        await phase("pool", asyncio.gather(*pings))
+    if queries:
+        await phase(
+            "queries", asyncio.gather(*[run_query(settings, uri) for uri in queries])
+        )
+    phases["total"] = {"ms": round((time.perf_counter() - started) * 1000, 3)}
+    logging.info(f"{prefix} - total: {phases['total']['ms']}ms")
+    return phases
@@ -1,12 +1,13 @@
 import unittest
 
-from datetime import datetime
+from datetime import datetime, timezone
 from unittest.mock import MagicMock
 
 # https://pymongo.readthedocs.io/en/stable/
 from bson.objectid import ObjectId
 
-from mongo_query import build_query
+from mongo_query import QueryDefaults, QuerySpec, build_query, parse_query
+from mongo_query_cache import Now
 
 
 # https://docs.python.org/3/library/unittest.html#unittest.TestCase
@@ -168,3 +169,84 @@ class TestBuildQuery(unittest.TestCase):
         self.assertEqual(query["sort"], [("mtime", -1)])
         self.assertEqual(query["skip"], 0)
         self.assertEqual(query["filter"], {})
+
+    def test_compiled_defaults(self):
+        default_query_filter = {"key": {"$nin": ["default"]}, "status": "$in:a,b"}
+        default_query_options = {"limit": 10, "sort": [["ctime", -1]]}
+        request = MagicMock()
+        request.path = "/find"
+        request.arguments = {"key": [b"$in:argument"], "skip": [b"3"]}
+        expected = build_query(
+            {
+                "default_query_filter": default_query_filter,
+                "default_query_options": default_query_options,
+            },
+            request,
+        )
+        settings = {
+            "query_defaults": QueryDefaults(default_query_filter, default_query_options)
+        }
+        query = build_query(settings, request)
+        print(f"query: {query!r}")
+        # Check the query values for expected values
+        self.assertEqual(query, expected)
+        # The compiled defaults are not changed by the query
+        query["sort"].append(["mtime", 1])
+        self.assertEqual(settings["query_defaults"].options["sort"], [["ctime", -1]])
+
+    def test_compiled_defaults_now(self):
+        defaults = QueryDefaults({"ctime": "$lte:$now"})
+        self.assertIsInstance(defaults.filter["ctime"][1]["$lte"], Now)
+        query = build_query({"query_defaults": defaults}, MagicMock(arguments={}))
+        print(f"query: {query!r}")
+        self.assertIsInstance(query["filter"]["ctime"]["$lte"], datetime)
+
+    def test_now_window(self):
+        defaults = QueryDefaults({"ctime": "$lte:$now"}, now_window=60)
+        for now, expected in [
+            (
+                datetime(2025, 9, 13, 13, 42, 24, 123, tzinfo=timezone.utc),
+                datetime(2025, 9, 13, 13, 42, tzinfo=timezone.utc),
+            ),
+            (
+                datetime(2025, 9, 13, 13, 42, 59, tzinfo=timezone.utc),
+                datetime(2025, 9, 13, 13, 42, tzinfo=timezone.utc),
+            ),
+        ]:
+            value = defaults.now.at(now)
+            print(f"now: {now!r}, value: {value!r}")
+            # The value is rounded down to the start of the window
+            self.assertEqual(value, expected)
+
+    def test_query_spec(self):
+        settings = {"default_query_options": {"batch_size": 5, "sort": [["ctime", -1]]}}
+        request = MagicMock()
+        request.path = "/find"
+        request.arguments = {
+            "status": [b"$in:public"],
+            "limit": [b"20"],
+            "projection": [b"a,b"],
+            "sort": [b""],
+        }
+        spec = parse_query(settings, request)
+        print(f"spec: {spec!r}")
+        # Check the spec values for expected values
+        self.assertIsInstance(spec, QuerySpec)
+        self.assertEqual(spec.filter, {"status": {"$in": ["public"]}})
+        self.assertEqual(spec.limit, 20)
+        self.assertIsNone(spec.skip)
+        self.assertEqual(spec.sort, [["ctime", -1]])
+        self.assertEqual(spec.projection, ["a", "b"])
+        self.assertEqual(
+            spec.find_options(),
+            {
+                "batch_size": 5,
+                "filter": {"status": {"$in": ["public"]}},
+                "limit": 20,
+                "projection": ["a", "b"],
+                "sort": [["ctime", -1]],
+            },
+        )
+        self.assertEqual(
+            spec.count_options(), {"filter": {"status": {"$in": ["public"]}}}
+        )
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_cache_refresh import parse_hot_queries
+from mongo_response_cache import (
+    REFRESH_HEADER,
+    REFRESH_TOKEN,
+    CacheEntry,
+    ResponseCache,
+    is_refresh,
+    parse_response_cache,
+)
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    def test_stale(self):
+        cache = ResponseCache(ttl=5, stale=10)
+        cache.put("key", CacheEntry(b"body", []), now=100.0)
+        # Check an expired entry is served within the stale window
+        entry = cache.get("key", now=106.0)
+        self.assertEqual(entry.body, b"body")
+        self.assertTrue(cache.is_stale(entry, now=106.0))
+        self.assertIsNone(cache.get("key", now=115.0))
+        print(f"stats: {cache.stats()!r}")
+        self.assertEqual(cache.stats()["stale_hits"], 1)
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_parse(self):
+        caches = parse_response_cache('{"find": {"ttl": 5, "stale": 30}}')
+        self.assertEqual(caches["find"].stale, 30.0)
+        with self.assertRaises(ValueError):
+            parse_response_cache('{"find": {"ttl": 5, "stale": -1}}')
+        self.assertEqual(parse_hot_queries('["/find?a=1"]'), ["/find?a=1"])
+        for value in ['"/find"', '["find"]', "[1]"]:
+            with self.assertRaises(ValueError):
+                parse_hot_queries(value)
+
+    def test_is_refresh(self):
+        request = MagicMock(remote_ip="127.0.0.1", headers={})
+        self.assertFalse(is_refresh(request))
+        request.headers = {REFRESH_HEADER: "1"}
+        self.assertFalse(is_refresh(request))
+        request.headers = {REFRESH_HEADER: REFRESH_TOKEN}
+        self.assertTrue(is_refresh(request))
+        # Check the secret is only accepted over the loopback address
+        request.remote_ip = "192.0.2.1"
+        self.assertFalse(is_refresh(request))
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestCacheRefresh(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(return_value=[{"_id": "mock_document"}])
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        self.mock_collection = mock_collection
+
+        return make_app(
+            mock_collection=mock_collection,
+            response_cache='{"find": {"ttl": 60, "max_bytes": 65536, "stale": 60}}',
+            hot_queries='["/find?status=public"]',
+            hot_query_interval=0,
+        )
+
+    @tornado.testing.gen_test
+    async def test_preload(self):
+        refresher = self._app.settings["cache_refresher"]
+        refresher.start(self.get_url("/"))
+        while not refresher.preloaded:
+            await asyncio.sleep(0.01)
+        print(f"stats: {refresher.stats()!r}")
+        self.assertEqual(refresher.stats()["preloaded"], 1)
+        # Check the hot query is served from the cache
+        response = await self.http_client.fetch(self.get_url("/find?status=public"))
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.assertEqual(self.mock_cursor.to_list.await_count, 1)
+
+    @tornado.testing.gen_test
+    async def test_revalidate(self):
+        refresher = self._app.settings["cache_refresher"]
+        refresher.start(self.get_url("/"))
+        while not refresher.preloaded:
+            await asyncio.sleep(0.01)
+        self.mock_cursor.to_list.reset_mock()
+        await self.http_client.fetch(self.get_url("/find?a=1"))
+        # Expire the cached response
+        cache = self._app.settings["response_cache"]["find"]
+        for entry in cache.entries.values():
+            entry.expires -= 61
+        self.mock_cursor.to_list.return_value = []
+        response = await self.http_client.fetch(self.get_url("/find?a=1"))
+        # Check the stale response is served while it is refreshed
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        while refresher.refreshing:
+            await asyncio.sleep(0.01)
+        self.assertEqual(refresher.stats()["refreshed"], 1)
+        response = await self.http_client.fetch(self.get_url("/find?a=1"))
+        self.assertEqual(json.loads(response.body)["count"], 0)
+        self.assertEqual(self.mock_cursor.to_list.await_count, 2)
+
+    @tornado.testing.gen_test
+    async def test_refresh_header(self):
+        await self.http_client.fetch(self.get_url("/find?a=1"))
+        self.mock_cursor.to_list.return_value = []
+        # Check a client can not skip the cache with the header
+        response = await self.http_client.fetch(
+            self.get_url("/find?a=1"), headers={REFRESH_HEADER: "1"}
+        )
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.assertEqual(self.mock_cursor.to_list.await_count, 1)
+        # Check the secret of the process replaces the cached response
+        await self.http_client.fetch(
+            self.get_url("/find?a=1"), headers={REFRESH_HEADER: REFRESH_TOKEN}
+        )
+        response = await self.http_client.fetch(self.get_url("/find?a=1"))
+        self.assertEqual(json.loads(response.body)["count"], 0)
+        self.assertEqual(self.mock_cursor.to_list.await_count, 2)
+
+    @tornado.testing.gen_test
+    async def test_fetch_error(self):
+        refresher = self._app.settings["cache_refresher"]
+        # Nothing listens on the port, the connection is refused
+        refresher.base_url = "http://127.0.0.1:9"
+        self.assertFalse(await refresher.fetch("/find?a=1"))
+        self.assertEqual(refresher.stats()["errors"], 1)
@@ -0,0 +1,105 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_collections import parse_collections
+
+
+def mock_collection(name):
+    # Mock database instance
+    mock_database = MagicMock()
+    mock_database.name = "mock_database"
+
+    # Mock collection instance
+    mock_collection = MagicMock()
+    mock_collection.database = mock_database
+    mock_collection.name = name
+
+    # Mock cursor instance
+    mock_cursor = MagicMock()
+    mock_cursor.to_list = AsyncMock(return_value=[{"_id": name}])
+    mock_collection.find = MagicMock(return_value=mock_cursor)
+    mock_collection.count_documents = AsyncMock(return_value=len(name))
+    return mock_collection
+
+
+class TestParseCollections(unittest.TestCase):
+    def test_parse_collections(self):
+        collections = parse_collections('{"shop.orders": {"default_query_filter": {}}}')
+        print(f"collections: {collections!r}")
+        # Check the allow-list for expected values
+        self.assertEqual(
+            collections, {("shop", "orders"): {"default_query_filter": {}}}
+        )
+        for value in ['{"orders": {}}', '{"shop.orders": {"limit": 1}}']:
+            with self.assertRaises(ValueError):
+                parse_collections(value)
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestCollections(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        self.default = mock_collection("default")
+        self.orders = mock_collection("orders")
+        self.customers = mock_collection("customers")
+        return make_app(
+            debug=True,
+            mock_collection=self.default,
+            mock_collections={
+                "shop.orders": self.orders,
+                "shop.customers": self.customers,
+            },
+            collections=json.dumps(
+                {
+                    "shop.orders": {"default_query_filter": {"status": "open"}},
+                    "shop.customers": {},
+                }
+            ),
+            response_cache='{"find": {"ttl": 60, "max_bytes": 65536}}',
+        )
+
+    def test_find(self):
+        response = self.fetch("/shop/orders/find?customer=42")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check the collection and its default filter were used
+        self.assertEqual(response_json["collection"], "orders")
+        self.assertEqual(
+            response_json["query"]["filter"], {"status": "open", "customer": 42}
+        )
+        # Another collection does not share the cached response
+        response = self.fetch("/shop/customers/find?customer=42")
+        response_json = json.loads(response.body)
+        self.assertEqual(response_json["collection"], "customers")
+        self.assertEqual(response_json["query"]["filter"], {"customer": 42})
+        # The routes without a collection use the application collection
+        response = self.fetch("/find?customer=42")
+        self.assertEqual(json.loads(response.body)["collection"], "default")
+
+    def test_count_documents(self):
+        response = self.fetch("/shop/customers/count_documents")
+        self.assertEqual(response.code, 200)
+        # Check response JSON for expected values
+        self.assertEqual(json.loads(response.body)["count"], len("customers"))
+
+    def test_not_allowed(self):
+        for path in ["/shop/secrets/find", "/admin/orders/count_documents"]:
+            response = self.fetch(path)
+            print(f"path: {path!r}, response.code: {response.code!r}")
+            # Check collections outside the allow-list are not found
+            self.assertEqual(response.code, 404)
+        self.default.find.assert_not_called()
+
+    def test_stats(self):
+        self.fetch("/shop/orders/find")
+        response = self.fetch("/stats")
+        stats = json.loads(response.body)["collections"]
+        print(f"stats: {stats!r}")
+        # Check each collection has its own query plan cache
+        self.assertEqual(stats["shop.orders"]["query_plan_cache"]["misses"], 1)
+        self.assertEqual(stats["shop.customers"]["query_plan_cache"]["misses"], 0)
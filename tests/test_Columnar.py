@@ -0,0 +1,109 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+# https://pymongo.readthedocs.io/en/stable/
+from bson.objectid import ObjectId
+
+from app import make_app
+from mongo_columnar import ArrowStream, columnar, pyarrow
+
+DOCUMENTS = [
+    {
+        "_id": ObjectId("68b0f1a2c3d4e5f601234567"),
+        "ctime": datetime(2025, 8, 28, 12, 30),
+        "count": 1,
+    },
+    {"_id": ObjectId("68b0f1a2c3d4e5f601234568"), "count": 2, "tags": ["a"]},
+]
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestColumnar(unittest.TestCase):
+    def test_columnar(self):
+        value = columnar(DOCUMENTS)
+        print(f"value: {value!r}")
+        # Check the columns for expected values
+        self.assertEqual(value["fields"], ["_id", "ctime", "count", "tags"])
+        self.assertEqual(value["columns"]["count"], [1, 2])
+        self.assertEqual(value["columns"]["ctime"], [DOCUMENTS[0]["ctime"], None])
+        self.assertEqual(value["columns"]["tags"], [None, ["a"]])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_stream(self):
+        arrow = ArrowStream({"score": "float"})
+        data = arrow.batch(DOCUMENTS) + arrow.batch([{"count": "three"}])
+        data += arrow.close()
+        table = pyarrow.ipc.open_stream(data).read_all()
+        print(f"table: {table!r}")
+        # Check the inferred and declared schema for expected values
+        self.assertEqual(table.schema.names, ["_id", "ctime", "count", "tags", "score"])
+        self.assertEqual(table.schema.field("ctime").type, pyarrow.timestamp("ms"))
+        self.assertEqual(table.schema.field("count").type, pyarrow.int64())
+        self.assertEqual(table.schema.field("score").type, pyarrow.float64())
+        # Check the values for expected values
+        self.assertEqual(
+            table.column("_id").to_pylist(),
+            ["68b0f1a2c3d4e5f601234567", "68b0f1a2c3d4e5f601234568", None],
+        )
+        # A value of another type than the schema is null
+        self.assertEqual(table.column("count").to_pylist(), [1, 2, None])
+        self.assertEqual(table.column("tags").to_pylist(), [None, '["a"]', None])
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestFindHandlerColumnar(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance returning full batches until the limit
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(
+            side_effect=lambda length: [{"_id": i, "n": i} for i in range(length)]
+        )
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+
+        return make_app(mock_collection=mock_collection)
+
+    def test_columnar(self):
+        response = self.fetch("/find?limit=3&format=columnar")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check response JSON for expected values
+        self.assertEqual(
+            response_json,
+            {
+                "count": 3,
+                "fields": ["_id", "n"],
+                "columns": {"_id": [0, 1, 2], "n": [0, 1, 2]},
+            },
+        )
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow(self):
+        response = self.fetch("/find?limit=250&format=arrow")
+        self.assertEqual(response.code, 200)
+        self.assertEqual(
+            response.headers.get("Content-Type"), "application/vnd.apache.arrow.stream"
+        )
+        reader = pyarrow.ipc.open_stream(response.body)
+        batches = list(reader)
+        # Check the record batches follow the cursor batches
+        self.assertEqual([batch.num_rows for batch in batches], [100, 100, 50])
+        self.assertEqual(reader.schema.field("n").type, pyarrow.int64())
+
+    def test_unknown_format(self):
+        response = self.fetch("/find?format=csv")
+        self.assertEqual(response.code, 400)
@@ -0,0 +1,107 @@
+import gzip
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_response import ResponseCompressor, negotiate, parse_compression_level
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestNegotiate(unittest.TestCase):
+    def test_negotiate(self):
+        codings = {"br": None, "zstd": None, "gzip": None}
+        for accept_encoding, expected in [
+            # (accept_encoding:str, expected:str|None)
+            ("", None),
+            ("identity", None),
+            ("gzip", "gzip"),
+            ("GZIP, deflate", "gzip"),
+            ("gzip, br", "br"),
+            ("gzip, zstd, br", "br"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0, gzip;q=0.1", "gzip"),
+            ("gzip;q=0", None),
+            ("gzip;q=invalid", None),
+            ("*", "br"),
+            ("*;q=0.5, br;q=0", "zstd"),
+        ]:
+            value = negotiate(accept_encoding, codings)
+            print(f"accept_encoding: {accept_encoding!r}, value: {value!r}")
+            self.assertEqual(value, expected)
+
+    def test_parse_compression_level(self):
+        self.assertEqual(parse_compression_level('{"gzip": 9}'), {"gzip": 9})
+        for compression_level in ['{"deflate": 6}', '{"gzip": "high"}', '{"gzip": 10}']:
+            with self.assertRaises(ValueError):
+                parse_compression_level(compression_level)
+
+    def test_stats(self):
+        compressor = ResponseCompressor(levels={"gzip": 1})
+        data = b'{"key":"value"}' * 1000
+        body = compressor.compress("gzip", data)
+        self.assertEqual(gzip.decompress(body), data)
+        stats = compressor.stats()
+        print(f"stats: {stats!r}")
+        # Check the stats for expected values
+        self.assertEqual(stats["levels"]["gzip"], 1)
+        self.assertEqual(stats["gzip"]["responses"], 1)
+        self.assertEqual(stats["gzip"]["bytes_in"], len(data))
+        self.assertEqual(stats["gzip"]["bytes_out"], len(body))
+        self.assertGreater(stats["gzip"]["ratio"], 10)
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestCompression(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance with a response larger than the minimum size
+        mock_cursor = MagicMock()
+        mock_cursor.to_list = AsyncMock(
+            return_value=[{"_id": i, "name": f"document-{i}"} for i in range(100)]
+        )
+        mock_collection.find = MagicMock(return_value=mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=100)
+
+        return make_app(
+            mock_collection=mock_collection,
+            compression_min_size=1024,
+            compression_level='{"gzip": 1}',
+        )
+
+    def test_compression(self):
+        for path, headers, expected in [
+            # REQUEST: (path:str, headers:dict, expected:str|None)
+            ("/find?limit=100", {"Accept-Encoding": "gzip"}, "gzip"),
+            ("/find?limit=100", {"Accept-Encoding": "identity"}, None),
+            ("/find?limit=100", {}, None),
+            # Smaller than the minimum size
+            ("/count_documents", {"Accept-Encoding": "gzip"}, None),
+        ]:
+            print(f"path: {path!r}, headers: {headers!r}")
+            response = self.fetch(path, headers=headers, decompress_response=False)
+            # Check response code and headers for the expected value
+            self.assertEqual(response.code, 200)
+            self.assertEqual(response.headers.get("Content-Encoding"), expected)
+            self.assertIn("Accept-Encoding", response.headers.get_list("Vary"))
+            body = response.body
+            if expected == "gzip":
+                body = gzip.decompress(body)
+            # The response body must be in valid JSON format
+            response_json = json.loads(body)
+            self.assertIn("count", response_json)
+        # Check the compression stats for expected values
+        stats = json.loads(self.fetch("/stats").body)
+        print(f"stats: {stats!r}")
+        self.assertEqual(stats["compression"]["gzip"]["responses"], 1)
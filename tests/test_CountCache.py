@@ -0,0 +1,148 @@
+import asyncio
+import contextvars
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_count_cache import CountCache, estimated_count
+
+
+class TestCountCache(unittest.IsolatedAsyncioTestCase):
+    def test_estimated_count(self):
+        settings = {"estimated_count": True}
+        # Check only an empty filter uses the collection metadata
+        self.assertTrue(estimated_count(settings, {"filter": {}}))
+        self.assertFalse(estimated_count(settings, {"filter": {"a": 1}}))
+        # A hint asks for the count by an index
+        self.assertFalse(estimated_count(settings, {"filter": {}, "hint": "a_1"}))
+        self.assertFalse(estimated_count({}, {"filter": {}}))
+
+    async def test_count(self):
+        cache = CountCache(staleness=10)
+        counts = iter([1, 2, 3])
+
+        async def count_documents():
+            return next(counts)
+
+        # A miss counts exactly
+        self.assertEqual(
+            await cache.count("key", count_documents, now=100.0), (1, True)
+        )
+        # A fresh count is served from the cache
+        self.assertEqual(
+            await cache.count("key", count_documents, now=104.0), (1, False)
+        )
+        self.assertEqual(len(cache.refreshes), 0)
+        # Past half the staleness the count is refreshed in the background
+        self.assertEqual(
+            await cache.count("key", count_documents, now=106.0), (1, False)
+        )
+        await asyncio.gather(*cache.refreshes.values())
+        await asyncio.sleep(0)
+        print(f"stats: {cache.stats()!r}")
+        self.assertEqual(cache.counts["key"][0], 2)
+        self.assertEqual(cache.stats()["refreshed"], 1)
+        # Past the staleness the count is not served
+        self.assertEqual(
+            await cache.count("key", count_documents, now=cache.counts["key"][1] + 11),
+            (3, True),
+        )
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 2)
+
+    async def test_refresh_context(self):
+        cache = CountCache(staleness=10)
+        deadline = contextvars.ContextVar("deadline", default=None)
+        deadlines = []
+
+        async def count_documents():
+            return 1
+
+        async def refresh():
+            deadlines.append(deadline.get())
+            return 2
+
+        await cache.count("key", count_documents, now=100.0)
+        deadline.set(0.25)
+        await cache.count("key", count_documents, now=106.0, refresh=refresh)
+        await asyncio.gather(*cache.refreshes.values())
+        # Check the refresh ran without the context of the request
+        self.assertEqual(deadlines, [None])
+        self.assertEqual(cache.counts["key"][0], 2)
+
+    def test_maxsize(self):
+        cache = CountCache(maxsize=2)
+        for key in ["a", "b", "c"]:
+            cache.store(key, 1)
+        # Check the least recently stored count was dropped
+        self.assertEqual(list(cache.counts), ["b", "c"])
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestCountDocumentsApproximate(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+        mock_collection.count_documents = AsyncMock(return_value=999)
+        mock_collection.estimated_document_count = AsyncMock(return_value=1000)
+        self.mock_collection = mock_collection
+
+        return make_app(
+            mock_collection=mock_collection,
+            estimated_count=True,
+            count_staleness=60,
+        )
+
+    def test_estimated(self):
+        response = self.fetch("/count_documents")
+        # Check response for expected values
+        self.assertEqual(response.code, 200)
+        self.assertEqual(json.loads(response.body)["count"], 1000)
+        self.assertEqual(response.headers.get("X-Count-Exact"), "false")
+        self.mock_collection.count_documents.assert_not_called()
+
+    def test_approximate(self):
+        response = self.fetch("/count_documents?a=1&approximate=1")
+        self.assertEqual(json.loads(response.body)["count"], 999)
+        self.assertEqual(response.headers.get("X-Count-Exact"), "true")
+        self.mock_collection.count_documents.return_value = 1
+        response = self.fetch("/count_documents?a=1&approximate=1")
+        print(f"response.body: {response.body!r}")
+        # Check the cached count is served
+        self.assertEqual(json.loads(response.body)["count"], 999)
+        self.assertEqual(response.headers.get("X-Count-Exact"), "false")
+        # An exact count is not served from the cache
+        response = self.fetch("/count_documents?a=1")
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.assertEqual(response.headers.get("X-Count-Exact"), "true")
+        self.assertEqual(self.mock_collection.count_documents.await_count, 2)
+
+    def test_refresh_deadline(self):
+        headers = {"X-Request-Timeout": "5"}
+        self.fetch("/count_documents?a=1&approximate=1", headers=headers)
+        self.assertIn(
+            "maxTimeMS", self.mock_collection.count_documents.call_args.kwargs
+        )
+        # Age the cached count past half its staleness
+        cache = self._app.settings["count_cache"]
+        for key, (count, counted) in cache.counts.items():
+            cache.counts[key] = (count, counted - 31)
+        self.mock_collection.count_documents.return_value = 1
+        response = self.fetch("/count_documents?a=1&approximate=1", headers=headers)
+        self.assertEqual(json.loads(response.body)["count"], 999)
+        self.io_loop.run_sync(lambda: asyncio.gather(*cache.refreshes.values()))
+        # Check the refresh counted without the deadline of the request
+        self.assertEqual(
+            self.mock_collection.count_documents.call_args.kwargs, {"filter": {"a": 1}}
+        )
+        self.assertEqual(cache.stats()["refreshed"], 1)
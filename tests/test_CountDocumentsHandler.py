@@ -63,3 +63,12 @@ class TestCountDocumentsHandler(tornado.testing.AsyncHTTPTestCase):
                 response_json.get("query"), {"filter": {"status": {"$in": ["public"]}}}
             )
             self.assertIsInstance(response_json.get("result"), list)
+
+    def test_count_documents_w_hint(self):
+        response = self.fetch("/count_documents?hint=status_1", method="GET")
+        # Check response code for the expected value
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check response JSON for expected values
+        self.assertEqual(response_json.get("query"), {"filter": {}, "hint": "status_1"})
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://pymongo.readthedocs.io/en/stable/
+import pymongo.errors
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_deadline import DeadlineMixin, parse_route_timeouts, request_timeout
+
+
+class MockRequestHandler:
+    """A RequestHandler stand-in with just what DeadlineMixin uses"""
+
+    def __init__(self):
+        self.settings = {}
+        self.request = MagicMock()
+        self.status = None
+        self.closed = False
+
+    def set_status(self, status_code, reason=None):
+        self.status = status_code
+
+    def on_connection_close(self):
+        self.closed = True
+
+
+class MockHandler(DeadlineMixin, MockRequestHandler):
+    pass
+
+
+class TestRouteTimeouts(unittest.TestCase):
+    def test_parse_route_timeouts(self):
+        self.assertEqual(parse_route_timeouts('{"find": 10}'), {"find": 10})
+        for route_timeouts in ['{"find": 0}', '{"find": "10"}', '{"find": Infinity}']:
+            with self.assertRaises(ValueError):
+                parse_route_timeouts(route_timeouts)
+
+    def test_request_timeout(self):
+        settings = {"route_timeouts": {"find": 10}}
+        for route, headers, expected in [
+            # (route:str, headers:dict, expected:float|None)
+            ("find", {}, 10),
+            ("find", {"X-Request-Timeout": "2.5"}, 2.5),
+            # The header can not extend the route timeout
+            ("find", {"X-Request-Timeout": "60"}, 10),
+            ("count_documents", {}, None),
+            ("count_documents", {"X-Request-Timeout": "60"}, 60),
+        ]:
+            request = MagicMock()
+            request.headers = headers
+            timeout = request_timeout(settings, route, request)
+            print(f"route: {route!r}, headers: {headers!r}, timeout: {timeout!r}")
+            self.assertEqual(timeout, expected)
+
+    def test_request_timeout_not_finite(self):
+        for value in ["inf", "-inf", "nan", "0", "-1"]:
+            request = MagicMock()
+            request.headers = {"X-Request-Timeout": value}
+            print(f"X-Request-Timeout: {value!r}")
+            with self.assertRaises(ValueError):
+                request_timeout({}, "count_documents", request)
+
+
+class TestCancelOnClose(unittest.IsolatedAsyncioTestCase):
+    async def test_cancel_on_close(self):
+        handler = MockHandler()
+        operation = asyncio.ensure_future(handler.run_with_deadline(asyncio.sleep(60)))
+        await asyncio.sleep(0)
+        self.assertIsNotNone(handler.mongo_task)
+        # The client closes the connection while the query runs
+        handler.on_connection_close()
+        with self.assertRaises(tornado.web.Finish):
+            await operation
+        self.assertTrue(handler.cancelled)
+        self.assertTrue(handler.closed)
+        self.assertEqual(handler.status, 499)
+        self.assertIsNone(handler.mongo_task)
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestDeadline(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(return_value=[{"_id": "mock_document"}])
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=1)
+
+        return make_app(
+            debug=True,
+            mock_collection=mock_collection,
+            route_timeouts='{"find": 5}',
+        )
+
+    def test_max_time_ms(self):
+        for path, headers, status_code, maximum in [
+            # REQUEST: (path:str, headers:dict, status_code:int, maximum:int|None)
+            ("/find", {}, 200, 5000),
+            ("/find", {"X-Request-Timeout": "1"}, 200, 1000),
+            ("/find_one", {}, 200, None),
+            ("/count_documents", {"X-Request-Timeout": "2"}, 200, 2000),
+            ("/find", {"X-Request-Timeout": "-1"}, 400, None),
+            ("/find", {"X-Request-Timeout": "soon"}, 400, None),
+        ]:
+            print(f"path: {path!r}, headers: {headers!r}")
+            response = self.fetch(path, headers=headers)
+            # Check response code for the expected value
+            self.assertEqual(response.code, status_code)
+            if status_code != 200:
+                continue
+            query = json.loads(response.body).get("query")
+            print(f"query: {query!r}")
+            # Check the query for the remaining time of the deadline
+            if maximum is None:
+                self.assertNotIn("max_time_ms", query)
+                self.assertNotIn("maxTimeMS", query)
+            else:
+                max_time_ms = query.get("max_time_ms", query.get("maxTimeMS"))
+                self.assertGreater(max_time_ms, 0)
+                self.assertLessEqual(max_time_ms, maximum)
+
+    def test_timeout(self):
+        # pymongo raises errors with `timeout' set when the deadline passed
+        self.mock_cursor.to_list.side_effect = pymongo.errors.ExecutionTimeout(
+            "operation exceeded time limit"
+        )
+        response = self.fetch("/find")
+        # Check response code for the expected value
+        self.assertEqual(response.code, 504)
+
+    def test_timeout_not_finite(self):
+        # A route without a timeout still rejects an infinite request timeout
+        response = self.fetch("/count_documents", headers={"X-Request-Timeout": "inf"})
+        # Check response code for the expected value
+        self.assertEqual(response.code, 400)
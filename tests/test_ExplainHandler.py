@@ -0,0 +1,137 @@
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_explain import summarize
+
+MOCK_EXPLAIN = {
+    "queryPlanner": {
+        "winningPlan": {
+            "stage": "LIMIT",
+            "inputStage": {
+                "stage": "FETCH",
+                "inputStage": {"stage": "IXSCAN", "indexName": "ctime_-1"},
+            },
+        },
+    },
+    "executionStats": {
+        "nReturned": 10,
+        "executionTimeMillis": 3,
+        "totalKeysExamined": 10,
+        "totalDocsExamined": 10,
+    },
+    "ok": 1.0,
+}
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestExplainHandler(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_database"
+        self.mock_command = AsyncMock(return_value=MOCK_EXPLAIN)
+        mock_database.command = self.mock_command
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+        mock_collection.read_preference = "mock_read_preference"
+        self.mock_collection = mock_collection
+
+        return make_app(
+            debug=True,
+            mock_collection=mock_collection,
+            default_query_options='{"collation": {"locale": "en"}, "batch_size": 5}',
+            index_policy='{"find": "reject"}',
+        )
+
+    def test_explain_find(self):
+        response = self.fetch("/explain/find?sort=-ctime&status=public", method="GET")
+        # Check response code for the expected value
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check response JSON for expected values
+        self.assertEqual(
+            response_json["result"][0],
+            {
+                "stage": "LIMIT",
+                "stages": ["LIMIT", "FETCH", "IXSCAN"],
+                "indexes": ["ctime_-1"],
+                "keys_examined": 10,
+                "docs_examined": 10,
+                "returned": 10,
+                "server_time_ms": 3,
+            },
+        )
+        self.assertIn("explain", response_json)
+        # The explained command is the query the find route runs
+        self.mock_command.assert_awaited_once_with(
+            {
+                "explain": {
+                    "find": "mock_collection",
+                    "collation": {"locale": "en"},
+                    "batchSize": 5,
+                    "filter": {"status": "public"},
+                    "limit": 10,
+                    "sort": {"ctime": -1},
+                },
+                "verbosity": "executionStats",
+            },
+            read_preference="mock_read_preference",
+        )
+
+    def test_explain_count_documents_summary(self):
+        response = self.fetch(
+            "/explain/count_documents?status=public&summary=1", method="GET"
+        )
+        # Check response code for the expected value
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Summary mode leaves out the full explain output
+        self.assertNotIn("explain", response_json)
+        # The explained command is the aggregation count_documents runs
+        command = self.mock_command.call_args.args[0]
+        self.assertEqual(
+            command["explain"],
+            {
+                "aggregate": "mock_collection",
+                "pipeline": [
+                    {"$match": {"status": "public"}},
+                    {"$group": {"_id": 1, "n": {"$sum": 1}}},
+                ],
+                "cursor": {},
+            },
+        )
+        # Check the count is explained on the members the route reads from
+        self.assertEqual(
+            self.mock_command.call_args.kwargs,
+            {"read_preference": "mock_read_preference"},
+        )
+
+    def test_explain_bad_request(self):
+        response = self.fetch("/explain/find?limit=ten", method="GET")
+        self.assertEqual(response.code, 400)
+
+    def test_explain_index_policy(self):
+        catalog = self._app.settings["index_catalog"]
+        catalog.indexes = {"_id_": [("_id", 1)], "ctime_-1": [("ctime", -1)]}
+        catalog.loaded = 1
+        # Check a query the route rejects is not explained either
+        for path in ["/find?foo=1", "/explain/find?foo=1"]:
+            response = self.fetch(path, method="GET")
+            self.assertEqual(response.code, 400)
+        self.mock_command.assert_not_awaited()
+
+    def test_summarize_aggregate(self):
+        summary = summarize({"stages": [{"$cursor": MOCK_EXPLAIN}, {"$group": {}}]})
+        print(f"summary: {summary!r}")
+        self.assertEqual(summary["stage"], "LIMIT")
+        self.assertEqual(summary["returned"], 10)
@@ -28,6 +28,7 @@ class TestFindHandler(tornado.testing.AsyncHTTPTestCase):
 
         # Mock collection find method to return a cursor
         mock_collection.find = MagicMock(return_value=mock_cursor)
+        self.mock_cursor = mock_cursor
 
         return make_app(debug=True, mock_collection=mock_collection)
 
@@ -153,3 +154,73 @@ class TestFindHandler(tornado.testing.AsyncHTTPTestCase):
                 print(f"response_json: {response_json!r}")
                 # Check response JSON for expected values
                 self.assertEqual(response_json["query"].get("sort"), expected)
+
+    def test_query_after(self):
+        # Make the HTTP request for the first page
+        response = self.fetch("/find?limit=1&after=", method="GET")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check response JSON for expected values
+        self.assertEqual(response_json["query"].get("sort"), [["_id", 1]])
+        self.assertIsNotNone(response_json.get("next"))
+        self.assertIn(
+            f"after={response_json['next']}", response.headers.get("Link", "")
+        )
+        # Make the HTTP request for the next page
+        response = self.fetch(
+            f"/find?limit=1&after={response_json['next']}", method="GET"
+        )
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        self.assertEqual(
+            response_json["query"].get("filter"),
+            {"$or": [{"_id": {"$gt": "mock_document"}}]},
+        )
+        # An invalid token is a bad request
+        response = self.fetch("/find?limit=1&after=invalid", method="GET")
+        self.assertEqual(response.code, 400)
+
+    def test_stream(self):
+        for path, options, content_type in [
+            # REQUEST: (path:str, options:dict, content_type:str)
+            ("/find?stream=1", {"method": "GET"}, "text/json"),
+            (
+                "/find",
+                {"method": "GET", "headers": {"Accept": "application/x-ndjson"}},
+                "application/x-ndjson",
+            ),
+        ]:
+            print(f"path: {path!r}, options: {options!r}")
+            # Make the HTTP request
+            response = self.fetch(f"{path}", **options)
+            # Check response code and type for the expected value
+            self.assertEqual(response.code, 200)
+            self.assertEqual(response.headers.get("Content-Type"), content_type)
+            print(f"response.body: {response.body!r}")
+            # Check response body for expected values
+            if content_type == "text/json":
+                self.assertEqual(
+                    json.loads(response.body),
+                    {"count": 1, "result": [{"_id": "mock_document"}]},
+                )
+            else:
+                self.assertEqual(response.body, b'{"_id":"mock_document"}\n')
+
+    def test_stream_batches(self):
+        # Return full batches of 100 documents until the limit is reached
+        self.mock_cursor.to_list = AsyncMock(
+            side_effect=lambda length: [{"_id": i} for i in range(length)]
+        )
+        response = self.fetch("/find?stream=1&limit=250&after=", method="GET")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        # Check the cursor was read batch by batch
+        lengths = [call.args[0] for call in self.mock_cursor.to_list.call_args_list]
+        print(f"lengths: {lengths!r}")
+        self.assertEqual(lengths, [100, 100, 50])
+        # Check response JSON for expected values
+        self.assertEqual(response_json["count"], 250)
+        self.assertEqual(len(response_json["result"]), 250)
+        self.assertIsNotNone(response_json["next"])
@@ -0,0 +1,103 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+# https://pymongo.readthedocs.io/en/stable/
+import bson
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+from bson.objectid import ObjectId
+from pymongo.results import InsertOneResult
+
+from app import make_app
+from mongo_formats import MSGPACK_OBJECTID, msgpack
+
+DOCUMENT = {
+    "_id": ObjectId("68b0f1a2c3d4e5f601234567"),
+    "ctime": datetime(2025, 8, 28, 12, 30, 45, 123000),
+    "name": "value",
+}
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestFormats(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance
+        mock_cursor = MagicMock()
+        mock_cursor.to_list = AsyncMock(return_value=[DOCUMENT])
+        mock_collection.find = MagicMock(return_value=mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=1)
+        mock_collection.insert_one = AsyncMock(
+            return_value=InsertOneResult(DOCUMENT["_id"], True)
+        )
+
+        return make_app(admin=True, mock_collection=mock_collection)
+
+    def test_json(self):
+        response = self.fetch("/find")
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers.get("Content-Type"), "text/json")
+        # Check response JSON for expected values
+        self.assertEqual(
+            json.loads(response.body)["result"],
+            [
+                {
+                    "_id": "68b0f1a2c3d4e5f601234567",
+                    "ctime": "2025-08-28T12:30:45",
+                    "name": "value",
+                }
+            ],
+        )
+
+    def test_bson(self):
+        headers = {"Accept": "application/bson"}
+        for path, expected in [
+            # REQUEST: (path:str, expected:dict)
+            ("/find", {"count": 1, "result": [DOCUMENT]}),
+            ("/count_documents", {"count": 1, "result": []}),
+            (
+                "/insert_one?name=value",
+                {
+                    "count": 1,
+                    "result": [{"acknowledged": True, "inserted_id": DOCUMENT["_id"]}],
+                },
+            ),
+        ]:
+            print(f"path: {path!r}")
+            response = self.fetch(path, headers=headers)
+            self.assertEqual(response.code, 200)
+            self.assertEqual(response.headers.get("Content-Type"), "application/bson")
+            value = bson.decode(response.body)
+            print(f"value: {value!r}")
+            # Check the typed values for expected values
+            self.assertEqual(value, expected)
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed")
+    def test_msgpack(self):
+        response = self.fetch("/find", headers={"Accept": "application/msgpack"})
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers.get("Content-Type"), "application/msgpack")
+        value = msgpack.unpackb(
+            response.body,
+            timestamp=3,
+            ext_hook=lambda code, data: (
+                ObjectId(data) if code == MSGPACK_OBJECTID else None
+            ),
+        )
+        print(f"value: {value!r}")
+        # Check the typed values for expected values
+        document = value["result"][0]
+        self.assertEqual(document["_id"], DOCUMENT["_id"])
+        self.assertEqual(document["ctime"].replace(tzinfo=None), DOCUMENT["ctime"])
+        self.assertEqual(document["name"], "value")
@@ -0,0 +1,102 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_http_cache import parse_cache_control, parse_etag_probe
+
+
+class TestParseHTTPCache(unittest.TestCase):
+    def test_parse(self):
+        self.assertEqual(
+            parse_cache_control('{"find": "max-age=5"}'), {"find": "max-age=5"}
+        )
+        self.assertEqual(parse_etag_probe('{"find": "mtime"}'), {"find": "mtime"})
+        for value in ['{"find": 5}', '{"find": ""}']:
+            with self.assertRaises(ValueError):
+                parse_cache_control(value)
+            with self.assertRaises(ValueError):
+                parse_etag_probe(value)
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestHTTPCache(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(return_value=[{"_id": "mock_document"}])
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=1)
+        # The ETag probe reads the latest `mtime'
+        mock_collection.find_one = AsyncMock(
+            return_value={"mtime": datetime(2025, 8, 28, 12, 30)}
+        )
+        mock_collection.delete_one = AsyncMock(return_value="mock_result")
+        self.mock_collection = mock_collection
+
+        return make_app(
+            admin=True,
+            mock_collection=mock_collection,
+            cache_control='{"count_documents": "max-age=5, stale-while-revalidate=30"}',
+            etag_probe='{"find": "mtime"}',
+        )
+
+    def test_body_etag(self):
+        response = self.fetch("/count_documents")
+        self.assertEqual(response.code, 200)
+        etag = response.headers.get("Etag")
+        print(f"etag: {etag!r}")
+        # Check response headers for expected values
+        self.assertTrue(etag.startswith('"'))
+        self.assertEqual(
+            response.headers.get("Cache-Control"),
+            "max-age=5, stale-while-revalidate=30",
+        )
+        # A matching If-None-Match request gets a 304 without a body
+        response = self.fetch("/count_documents", headers={"If-None-Match": etag})
+        self.assertEqual(response.code, 304)
+        self.assertEqual(response.body, b"")
+        # A different result has a different ETag
+        self.mock_collection.count_documents.return_value = 2
+        response = self.fetch("/count_documents", headers={"If-None-Match": etag})
+        self.assertEqual(response.code, 200)
+        self.assertNotEqual(response.headers.get("Etag"), etag)
+
+    def test_probe_etag(self):
+        response = self.fetch("/find")
+        self.assertEqual(response.code, 200)
+        etag = response.headers.get("Etag")
+        print(f"etag: {etag!r}")
+        # Check response headers for expected values
+        self.assertTrue(etag.startswith('W/"'))
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        # A matching probe skips the query
+        self.mock_cursor.to_list.reset_mock()
+        response = self.fetch("/find", headers={"If-None-Match": etag})
+        self.assertEqual(response.code, 304)
+        self.mock_cursor.to_list.assert_not_called()
+        # A newer `mtime' changes the ETag
+        self.mock_collection.find_one.return_value = {
+            "mtime": datetime(2025, 8, 28, 12, 31)
+        }
+        response = self.fetch("/find", headers={"If-None-Match": etag})
+        self.assertEqual(response.code, 200)
+        etag = response.headers.get("Etag")
+        # A delete through this service changes the ETag
+        response = self.fetch("/delete_one?_id=68b0f1a2c3d4e5f601234567")
+        self.assertEqual(response.code, 200)
+        response = self.fetch("/find", headers={"If-None-Match": etag})
+        self.assertEqual(response.code, 200)
@@ -1,11 +1,14 @@
+import json
+import time
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock
 
-import pytest
-
 # https://www.tornadoweb.org/en/stable/
 import tornado
 
 from app import make_app
+from mongo_health import HealthMonitor
+from mongo_pool import PoolMetrics
 
 
 # https://www.tornadoweb.org/en/stable/testing.html
@@ -29,8 +32,74 @@ class TestHealthCheckHandler(tornado.testing.AsyncHTTPTestCase):
         # Mock collection find_one method to return a cursor
         mock_collection.find_one = MagicMock(return_value=mock_cursor)
 
-        return make_app(mock_collection=mock_collection)
+        app = make_app(mock_collection=mock_collection)
+
+        # Mock client instance for the health probes
+        self.mock_client = MagicMock()
+        self.mock_client.admin.command = AsyncMock(return_value={"ok": 1})
+        self.pool_metrics = PoolMetrics()
+        self.monitor = HealthMonitor(self.mock_client, self.pool_metrics)
+        app.settings["health_monitor"] = self.monitor
+        return app
+
+    def test_healthcheck_starting(self):
+        # Before the first probe the service is live but not ready
+        response = self.fetch("/healthcheck/live")
+        self.assertEqual(response.code, 200)
+        response = self.fetch("/healthcheck")
+        print(f"response.body: {response.body!r}")
+        self.assertEqual(response.code, 503)
+        self.assertEqual(response.headers.get("Cache-Control"), "no-store")
+        self.assertEqual(json.loads(response.body)["status"], "fail")
+
+    @tornado.testing.gen_test
+    async def test_healthcheck(self):
+        await self.monitor.probe()
+        for path in ["/healthcheck", "/healthcheck/ready", "/healthcheck/live"]:
+            response = await self.http_client.fetch(self.get_url(path))
+            print(f"path: {path!r}, response.body: {response.body!r}")
+            # Check response for expected values
+            self.assertEqual(response.code, 200)
+            report = json.loads(response.body)
+            self.assertEqual(report["status"], "ok")
+            self.assertTrue(report["checks"]["database"]["ok"])
+        # The health checks read the verdict without pinging
+        self.assertEqual(self.mock_client.admin.command.await_count, 1)
+
+    @tornado.testing.gen_test
+    async def test_healthcheck_database_down(self):
+        self.mock_client.admin.command.side_effect = TimeoutError("mock_timeout")
+        await self.monitor.probe()
+        response = await self.http_client.fetch(
+            self.get_url("/healthcheck/ready"), raise_error=False
+        )
+        report = json.loads(response.body)
+        print(f"report: {report!r}")
+        # Check a database outage is not ready but still live
+        self.assertEqual(response.code, 503)
+        self.assertIn("mock_timeout", report["checks"]["database"]["error"])
+        response = await self.http_client.fetch(self.get_url("/healthcheck/live"))
+        self.assertEqual(response.code, 200)
+
+    @tornado.testing.gen_test
+    async def test_healthcheck_pool_starved(self):
+        self.pool_metrics.connection_check_out_started(SimpleNamespace())
+        self.pool_metrics.connection_check_out_failed(
+            SimpleNamespace(duration=2.0, reason="timeout")
+        )
+        await self.monitor.probe()
+        # Check a starved pool is not ready until a probe without timeouts
+        self.assertFalse(self.monitor.ready())
+        self.assertEqual(self.monitor.checks["pool"]["checkout_timeouts"], 1)
+        await self.monitor.probe()
+        self.assertTrue(self.monitor.ready())
 
-    @pytest.mark.skip(reason="Not implemented yet")
-    def test_healthcheck(self):
-        raise NotImplementedError("...work to do")
+    @tornado.testing.gen_test
+    async def test_healthcheck_stalled(self):
+        await self.monitor.probe()
+        # Probes that stopped running are not live
+        self.monitor.checked_at = time.monotonic() - 60
+        response = await self.http_client.fetch(
+            self.get_url("/healthcheck/live"), raise_error=False
+        )
+        self.assertEqual(response.code, 503)
@@ -0,0 +1,175 @@
+import json
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_index_advisor import (
+    QueryShapeRecorder,
+    query_shape,
+    recommend_index,
+    satisfied_by,
+)
+from mongo_indexes import IndexCatalog
+from mongo_query import QuerySpec
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestQueryShape(unittest.TestCase):
+    def test_query_shape(self):
+        spec = QuerySpec(
+            filter={
+                "status": "public",
+                "ctime": {"$lte": datetime(2025, 9, 13)},
+                "$and": [{"owner": {"$in": ["a", "b"]}}],
+                "$or": [{"tag": "x"}],
+            },
+            sort=[["mtime", -1]],
+        )
+        shape = query_shape(spec)
+        print(f"shape: {shape!r}")
+        # Values are not part of the shape
+        self.assertEqual(
+            shape, ("find", ("owner", "status"), (("mtime", -1),), ("ctime",))
+        )
+        # Order by equality, sort and then range fields
+        self.assertEqual(
+            recommend_index(shape),
+            (("owner", 1), ("status", 1), ("mtime", -1), ("ctime", 1)),
+        )
+
+    def test_recommendations(self):
+        catalog = IndexCatalog()
+        catalog.indexes = {"_id_": [("_id", 1)], "ctime_1": [("ctime", 1)]}
+        catalog.loaded = 1
+        recorder = QueryShapeRecorder()
+        for spec, route, latency in [
+            (QuerySpec(sort=[("ctime", -1)]), "find", 0.002),
+            (QuerySpec(sort=[("ctime", -1)]), "find", 0.002),
+            (QuerySpec(filter={"status": "a"}), "count_documents", 0.5),
+            (QuerySpec(filter={"_id": "a"}), "find", 0.001),
+        ]:
+            recorder.record(query_shape(spec, route), latency)
+        result = recorder.recommendations(catalog)
+        print(f"result: {result!r}")
+        # Ranked by the total latency of the requests
+        self.assertEqual(len(result), 2)
+        self.assertEqual(result[0]["index"], [["status", 1]])
+        self.assertIsNone(result[0]["satisfied_by"])
+        self.assertEqual(result[1]["index"], [["ctime", -1]])
+        self.assertEqual(result[1]["requests"], 2)
+        self.assertEqual(result[1]["satisfied_by"], "ctime_1")
+
+    def test_satisfied_by(self):
+        catalog = IndexCatalog()
+        catalog.indexes = {
+            "_id_": [("_id", 1)],
+            "status_-1_ctime_-1": [("status", -1), ("ctime", -1)],
+            "b_1_a_1_ctime_-1": [("b", 1), ("a", 1), ("ctime", -1)],
+            "text": [("_fts", "text"), ("_ftsx", 1)],
+        }
+        catalog.loaded = 1
+        for spec, expected in [
+            # Equality fields match in either direction
+            (QuerySpec({"status": "a"}, sort=[("ctime", -1)]), "status_-1_ctime_-1"),
+            (QuerySpec({"status": "a"}, sort=[("ctime", 1)]), "status_-1_ctime_-1"),
+            # Equality fields match in any order
+            (QuerySpec({"a": 1, "b": 2}, sort=[("ctime", -1)]), "b_1_a_1_ctime_-1"),
+            (QuerySpec({"a": 1, "b": {"$gt": 2}}), None),
+            (QuerySpec({"ctime": "a"}, sort=[("status", 1)]), None),
+        ]:
+            shape = query_shape(spec)
+            print(f"shape: {shape!r}, expected: {expected!r}")
+            self.assertEqual(satisfied_by([shape], catalog), expected)
+        # An index is only reported when it serves every shape of a group
+        shapes = [
+            query_shape(QuerySpec({"a": 1, "b": 2})),
+            query_shape(QuerySpec({"a": 1, "b": {"$gt": 2}})),
+        ]
+        self.assertIsNone(satisfied_by(shapes, catalog))
+
+    def test_bounded(self):
+        recorder = QueryShapeRecorder(maxsize=1)
+        recorder.record(("find", ("a",), (), ()), 0.1)
+        recorder.record(("find", ("b",), (), ()), 0.1)
+        self.assertEqual(len(recorder.shapes), 1)
+        self.assertEqual(recorder.dropped, 1)
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestIndexAdvisorHandler(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database.name = "mock_database"
+        mock_collection.name = "mock_collection"
+        mock_collection.count_documents = AsyncMock(return_value=999)
+
+        return make_app(admin=True, mock_collection=mock_collection)
+
+    def test_index_advisor(self):
+        for path in ["/count_documents?status=public", "/count_documents?status=x"]:
+            response = self.fetch(path, method="GET")
+            self.assertEqual(response.code, 200)
+        response = self.fetch("/index_advisor", method="GET")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check response JSON for expected values
+        self.assertEqual(response_json["count"], 1)
+        self.assertEqual(response_json["result"][0]["index"], [["status", 1]])
+        self.assertEqual(response_json["result"][0]["requests"], 2)
+        self.assertEqual(response_json["result"][0]["routes"], ["count_documents"])
+
+
+class TestCollectionIndexAdvisor(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock collection instances
+        mock_collection = MagicMock()
+        mock_collection.database.name = "mock_database"
+        mock_collection.name = "mock_collection"
+        mock_collection.count_documents = AsyncMock(return_value=999)
+        mock_orders = MagicMock()
+        mock_orders.database.name = "shop"
+        mock_orders.name = "orders"
+        mock_orders.count_documents = AsyncMock(return_value=1)
+
+        return make_app(
+            admin=True,
+            mock_collection=mock_collection,
+            mock_collections={"shop.orders": mock_orders},
+            collections='{"shop.orders": {}}',
+        )
+
+    def test_index_advisor(self):
+        # The collection has an index for its queries, the default one has not
+        catalog = self._app.settings["collections"].get("shop", "orders")[
+            "index_catalog"
+        ]
+        catalog.indexes = {"_id_": [("_id", 1)], "customer_1": [("customer", 1)]}
+        catalog.loaded = 1
+        for path in [
+            "/count_documents?status=public&customer=42",
+            "/shop/orders/count_documents?customer=42",
+        ]:
+            response = self.fetch(path, method="GET")
+            self.assertEqual(response.code, 200)
+        response = self.fetch("/shop/orders/index_advisor", method="GET")
+        self.assertEqual(response.code, 200)
+        response_json = json.loads(response.body)
+        print(f"response_json: {response_json!r}")
+        # Check each collection has the recommendations of its own queries
+        self.assertEqual(response_json["count"], 1)
+        self.assertEqual(response_json["result"][0]["index"], [["customer", 1]])
+        self.assertEqual(response_json["result"][0]["satisfied_by"], "customer_1")
+        response_json = json.loads(self.fetch("/index_advisor").body)
+        self.assertEqual(response_json["count"], 1)
+        self.assertEqual(
+            response_json["result"][0]["index"], [["customer", 1], ["status", 1]]
+        )
+        self.assertIsNone(response_json["result"][0]["satisfied_by"])
+        self.assertEqual(self.fetch("/shop/customers/index_advisor").code, 404)
@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+# https://pymongo.readthedocs.io/en/stable/
+from pymongo.errors import OperationFailure
+
+from mongo_indexes import (
+    ASSISTED,
+    COLLSCAN,
+    COVERED,
+    UNKNOWN,
+    IndexCatalog,
+    IndexPolicyError,
+    check_index_policy,
+    parse_index_policy,
+)
+from mongo_query import QuerySpec
+
+
+class MockCursor:
+    def __init__(self, documents):
+        self.documents = documents
+
+    def __aiter__(self):
+        self.iterator = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self.iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def make_catalog():
+    # Mock collection list_indexes method to return a cursor
+    mock_collection = MagicMock()
+    mock_collection.list_indexes = AsyncMock(
+        return_value=MockCursor(
+            [
+                {"name": "_id_", "key": {"_id": 1}},
+                {"name": "ctime_-1", "key": {"ctime": -1}},
+                {"name": "status_1_ctime_-1", "key": {"status": 1, "ctime": -1}},
+            ]
+        )
+    )
+    catalog = IndexCatalog()
+    asyncio.run(catalog.refresh(mock_collection))
+    return catalog
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestIndexCatalog(unittest.TestCase):
+    def test_refresh(self):
+        catalog = make_catalog()
+        print(f"catalog: {catalog!r}")
+        self.assertIsNotNone(catalog.loaded)
+        self.assertEqual(
+            catalog.indexes["status_1_ctime_-1"], [("status", 1), ("ctime", -1)]
+        )
+
+    def test_refresh_error(self):
+        mock_collection = MagicMock()
+        mock_collection.list_indexes = AsyncMock(
+            side_effect=OperationFailure("mock error")
+        )
+        catalog = IndexCatalog()
+        asyncio.run(catalog.refresh(mock_collection))
+        self.assertIsNone(catalog.loaded)
+        self.assertEqual(catalog.classify(QuerySpec()), UNKNOWN)
+
+    def test_classify(self):
+        catalog = make_catalog()
+        for spec, route, expected in [
+            (QuerySpec(filter={"status": "public"}), "find", ASSISTED),
+            (QuerySpec(filter={"owner": "me"}), "find", COLLSCAN),
+            (QuerySpec(sort=[("ctime", -1)]), "find", ASSISTED),
+            (QuerySpec(sort=[("mtime", -1)]), "find", COLLSCAN),
+            (QuerySpec(filter={"owner": "me"}, hint="ctime_-1"), "find", ASSISTED),
+            (
+                QuerySpec(
+                    filter={"status": "public"}, projection={"_id": 0, "ctime": 1}
+                ),
+                "find",
+                COVERED,
+            ),
+            (QuerySpec(filter={"status": "public"}), "count_documents", COVERED),
+            (
+                QuerySpec(filter={"$and": [{"status": "a"}, {"owner": "b"}]}),
+                "count_documents",
+                ASSISTED,
+            ),
+        ]:
+            classification = catalog.classify(spec, route=route)
+            print(f"spec: {spec!r}, classification: {classification!r}")
+            self.assertEqual(classification, expected)
+
+    def test_policy(self):
+        settings = {
+            "index_catalog": make_catalog(),
+            "index_policy": parse_index_policy(
+                '{"find": "reject", "count_documents": "warn"}'
+            ),
+        }
+        # A find without a filter or sort is bounded by the limit
+        self.assertEqual(check_index_policy(settings, "find", QuerySpec()), COLLSCAN)
+        with pytest.raises(IndexPolicyError):
+            check_index_policy(settings, "find", QuerySpec(sort=[("mtime", 1)]))
+        self.assertEqual(
+            check_index_policy(settings, "count_documents", QuerySpec({"owner": "me"})),
+            COLLSCAN,
+        )
+        # The hint must be a known index
+        with pytest.raises(IndexPolicyError):
+            check_index_policy(settings, "find", QuerySpec(hint="unknown"))
+
+    def test_policy_unknown_action(self):
+        with pytest.raises(ValueError):
+            parse_index_policy({"find": "deny"})
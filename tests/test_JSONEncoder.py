@@ -1,3 +1,4 @@
+import json
 import unittest
 
 from datetime import datetime, timezone
@@ -6,7 +7,11 @@ import pytest
 
 import tornado
 
-from mongo_jsonencoder import ExtendedJSONEncoder
+# https://pymongo.readthedocs.io/en/stable/
+from bson.objectid import ObjectId
+from bson.timestamp import Timestamp
+
+from mongo_jsonencoder import ExtendedJSONEncoder, dumps
 
 
 # https://docs.python.org/3/library/unittest.html#unittest.TestCase
@@ -109,3 +114,31 @@ class TestJSONEncoder(unittest.TestCase):
     @pytest.mark.skip(reason="Not implemented yet")
     def test_tornado_web_StaticFileHandler(self):
         raise NotImplementedError("...work to do!")
+
+    def test_dumps(self):
+        document = {
+            "_id": ObjectId("68b0f1a2c3d4e5f601234567"),
+            "ctime": datetime(2025, 8, 28, 12, 30, 45, 123456, tzinfo=timezone.utc),
+            "data": b"\x00value" * 40,
+            "name": "caf\u00e9",
+            "nested": {"b": [1, 2.5, None, True], "a": Timestamp(1756384245, 1)},
+        }
+        response = {"count": 1, "result": [document]}
+        expected = json.dumps(
+            response,
+            indent=4,
+            separators=(",", ": "),
+            sort_keys=True,
+            cls=ExtendedJSONEncoder,
+        )
+        # Check the pretty output is the same as the ExtendedJSONEncoder output
+        value = dumps(response, pretty=True)
+        print(f"value: {value!r}")
+        self.assertIsInstance(value, bytes)
+        self.assertEqual(value, (expected + "\n").encode())
+        # Check the compact output has the same values
+        value = dumps(response)
+        print(f"value: {value!r}")
+        self.assertTrue(value.startswith(b'{"count":1,"result":[{"_id":"68b0'))
+        self.assertIn("café".encode(), value)
+        self.assertEqual(json.loads(value), json.loads(expected))
@@ -8,7 +8,7 @@ from bson.errors import InvalidId
 
 import pytest
 
-from mongo_operator import operator_value
+from mongo_operator import operator_value, parse_field_types
 
 
 # https://docs.python.org/3/library/unittest.html#unittest.TestCase
@@ -197,3 +197,51 @@ class TestOperatorValue(unittest.TestCase):
             print(f"field: {field!r}, value: {value!r}")
             self.assertEqual(field, "$text")
             self.assertEqual(value, {"$search": "some value"})
+
+    def test_guessed_value(self):
+        # Speculative parsing is only done for undeclared fields
+        for value, expected in [
+            ("20250913", datetime(2025, 9, 13)),
+            ("2025", 2025),
+            ("-1", "-1"),
+            ("1e5", "1e5"),
+        ]:
+            field, value = operator_value("field", value)
+            print(f"field: {field!r}, value: {value!r}")
+            self.assertEqual(value, expected)
+
+    def test_field_types(self):
+        field_types = parse_field_types(
+            '{"count": "int", "code": "str", "ctime": "datetime", "score": "float"}'
+        )
+        for field, value, expected in [
+            ("count", "1234", 1234),
+            ("code", "1234", "1234"),
+            ("code", "true", "true"),
+            ("ctime", "2025-09-13T13:42:24", datetime(2025, 9, 13, 13, 42, 24)),
+            ("score", "12", 12.0),
+            ("count", "$gte:5", {"$gte": 5}),
+            ("code", "$in:01,02", {"$in": ["01", "02"]}),
+            ("count", "$in:1,2", {"$in": [1, 2]}),
+            ("count", "$eq:$none", {"$eq": None}),
+            (
+                "ctime",
+                "$between:2025-08-01T00:00,2025-08-31T23:59",
+                {
+                    "$gte": datetime(2025, 8, 1, 0, 0),
+                    "$lte": datetime(2025, 8, 31, 23, 59),
+                },
+            ),
+            ("$nested:stats.count", "7", {"count": 7}),
+        ]:
+            _, value = operator_value(field, value, field_types=field_types)
+            print(f"field: {field!r}, value: {value!r}")
+            self.assertEqual(value, expected)
+
+    def test_field_types_invalid_value(self):
+        with pytest.raises(ValueError):
+            operator_value("count", "ten", field_types={"count": "int"})
+
+    def test_field_types_unknown_type(self):
+        with pytest.raises(ValueError):
+            parse_field_types({"count": "integer"})
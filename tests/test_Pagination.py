@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+# https://pymongo.readthedocs.io/en/stable/
+from bson.objectid import ObjectId
+
+from mongo_pagination import decode_token, encode_token, keyset_filter, keyset_sort
+from mongo_query import parse_query
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestPagination(unittest.TestCase):
+    def test_keyset_sort(self):
+        for sort, expected in [
+            (None, [("_id", 1)]),
+            ([("ctime", -1)], [("ctime", -1), ("_id", -1)]),
+            ([["ctime", 1]], [("ctime", 1), ("_id", 1)]),
+            ([("_id", -1)], [("_id", -1)]),
+        ]:
+            print(f"sort: {sort!r}, expected: {expected!r}")
+            self.assertEqual(keyset_sort(sort), expected)
+
+    def test_token(self):
+        sort = [("ctime", -1), ("_id", -1)]
+        document = {
+            "_id": ObjectId("abcdef0123456789abcdef01"),
+            "ctime": datetime(2025, 9, 13, 13, 42, 24),
+        }
+        token = encode_token(sort, document)
+        print(f"token: {token!r}")
+        # Check the token values for expected values
+        self.assertNotIn("=", token)
+        self.assertEqual(
+            decode_token(token, sort), [document["ctime"], document["_id"]]
+        )
+        # A token only applies to the same sort order
+        with pytest.raises(ValueError):
+            decode_token(token, [("mtime", -1), ("_id", -1)])
+        with pytest.raises(ValueError):
+            decode_token("not-a-token", sort)
+
+    def test_keyset_filter(self):
+        value = keyset_filter([("ctime", -1), ("_id", -1)], [1, 2])
+        print(f"value: {value!r}")
+        # Descending, the null and missing values come after the others
+        self.assertEqual(
+            value,
+            {
+                "$or": [
+                    {"ctime": {"$lt": 1}},
+                    {"ctime": None},
+                    {"ctime": 1, "_id": {"$lt": 2}},
+                ]
+            },
+        )
+
+    def test_keyset_filter_null(self):
+        # Ascending, the null and missing values come first
+        value = keyset_filter([("ctime", 1), ("_id", 1)], [None, 2])
+        print(f"value: {value!r}")
+        self.assertEqual(
+            value,
+            {"$or": [{"ctime": {"$ne": None}}, {"ctime": None, "_id": {"$gt": 2}}]},
+        )
+        # Descending, only the other null and missing values come after null
+        value = keyset_filter([("ctime", -1), ("_id", -1)], [None, 2])
+        self.assertEqual(value, {"$or": [{"ctime": None, "_id": {"$lt": 2}}]})
+        # Check a token of a document without the sort field pages on
+        token = encode_token([("ctime", -1), ("_id", -1)], {"_id": 2})
+        values = decode_token(token, [("ctime", -1), ("_id", -1)])
+        self.assertEqual(values, [None, 2])
+
+    def test_parse_query_after(self):
+        settings = {"default_query_options": {"sort": [["ctime", -1]]}}
+        token = encode_token([("ctime", -1), ("_id", -1)], {"ctime": 1, "_id": 2})
+        request = MagicMock()
+        request.path = "/find"
+        request.arguments = {
+            "status": [b"public"],
+            "skip": [b"100"],
+            "after": [token.encode()],
+        }
+        spec = parse_query(settings, request)
+        print(f"spec: {spec!r}")
+        # The token replaces skip with a range predicate
+        self.assertIsNone(spec.skip)
+        self.assertEqual(spec.after, token)
+        self.assertEqual(spec.sort, [("ctime", -1), ("_id", -1)])
+        self.assertEqual(
+            spec.filter,
+            {
+                "status": "public",
+                "$or": [
+                    {"ctime": {"$lt": 1}},
+                    {"ctime": None},
+                    {"ctime": 1, "_id": {"$lt": 2}},
+                ],
+            },
+        )
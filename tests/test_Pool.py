@@ -0,0 +1,75 @@
+import unittest
+from types import SimpleNamespace
+
+from mongo_pool import CommandMetrics, PoolMetrics, client_options
+
+
+class TestClientOptions(unittest.TestCase):
+    def test_client_options(self):
+        options = client_options(
+            {
+                "max_pool_size": "200",
+                "min_pool_size": 10,
+                "wait_queue_timeout_ms": 2000,
+                "max_idle_time_ms": None,
+                "compressors": "zstd, zlib",
+                "read_preference": "secondaryPreferred",
+            }
+        )
+        print(f"options: {options!r}")
+        # Check the client options for expected values
+        self.assertEqual(
+            options,
+            {
+                "maxPoolSize": 200,
+                "minPoolSize": 10,
+                "waitQueueTimeoutMS": 2000,
+                "compressors": "zstd,zlib",
+                "readPreference": "secondaryPreferred",
+            },
+        )
+        self.assertEqual(client_options({}), {})
+        for kwargs in [
+            {"max_pool_size": -1},
+            {"compressors": "lz4"},
+            {"read_preference": "secondary_preferred"},
+        ]:
+            with self.assertRaises(ValueError):
+                client_options(kwargs)
+
+
+class TestPoolMetrics(unittest.TestCase):
+    def test_checkout(self):
+        metrics = PoolMetrics()
+        metrics.connection_created(SimpleNamespace())
+        metrics.connection_check_out_started(SimpleNamespace())
+        metrics.connection_check_out_started(SimpleNamespace())
+        metrics.connection_checked_out(SimpleNamespace(duration=0.002))
+        metrics.connection_check_out_failed(
+            SimpleNamespace(duration=0.5, reason="timeout")
+        )
+        stats = metrics.stats()
+        print(f"stats: {stats!r}")
+        # Check the pool stats for expected values
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["in_use"], 1)
+        self.assertEqual(stats["waiting"], 0)
+        self.assertEqual(stats["max_waiting"], 2)
+        self.assertEqual(stats["checkout_failures"], {"timeout": 1})
+        self.assertEqual(stats["checkout_wait"]["count"], 2)
+        self.assertEqual(stats["checkout_wait"]["max_ms"], 500.0)
+        metrics.connection_checked_in(SimpleNamespace())
+        self.assertEqual(metrics.stats()["in_use"], 0)
+        self.assertEqual(metrics.stats()["max_in_use"], 1)
+
+    def test_commands(self):
+        metrics = CommandMetrics()
+        metrics.succeeded(SimpleNamespace(command_name="find", duration_micros=1500))
+        metrics.failed(SimpleNamespace(command_name="find", duration_micros=500))
+        stats = metrics.stats()
+        print(f"stats: {stats!r}")
+        # Check the command stats for expected values
+        self.assertEqual(stats["find"]["count"], 2)
+        self.assertEqual(stats["find"]["failures"], 1)
+        self.assertEqual(stats["find"]["mean_ms"], 1.0)
+        self.assertEqual(stats["find"]["max_ms"], 1.5)
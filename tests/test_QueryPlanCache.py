@@ -0,0 +1,98 @@
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock
+
+from mongo_query import QuerySpec, build_query
+from mongo_query_cache import NOW, QueryPlan, QueryPlanCache, plan_key
+
+
+# https://docs.python.org/3/library/unittest.html#unittest.TestCase
+class TestQueryPlanCache(unittest.TestCase):
+    def test_matches_build_query(self):
+        for default_query_filter, arguments in [
+            ({}, {}),
+            ({}, {"sort": [b"-mtime"], "skip": [b"0"], "limit": [b"120"]}),
+            ({"key": {"$nin": ["default"]}}, {"key": [b"$in:argument"]}),
+            ({"key": "default"}, {"key": [b"argument"], "projection": [b"a,b"]}),
+            ({}, {"_id": [b"abcdef0123456789abcdef01"]}),
+        ]:
+            settings = {"default_query_filter": default_query_filter}
+            request = MagicMock()
+            request.path = "/find"
+            request.arguments = arguments
+            expected = build_query(settings, request)
+            settings.update(query_plan_cache=QueryPlanCache())
+            # Compile the plan and then run the cached plan
+            for _ in range(2):
+                query = build_query(settings, request)
+                print(f"query: {query!r}")
+                self.assertEqual(query, expected)
+            self.assertEqual(settings["query_plan_cache"].hits, 1)
+            self.assertEqual(settings["query_plan_cache"].misses, 1)
+
+    def test_now_placeholder(self):
+        settings = {
+            "default_query_filter": {"ctime": "$lte:$now"},
+            "query_plan_cache": QueryPlanCache(),
+        }
+        request = MagicMock()
+        request.path = "/find"
+        request.arguments = {}
+        first = build_query(settings, request)
+        second = build_query(settings, request)
+        print(f"first: {first!r}, second: {second!r}")
+        # The cached plan keeps the placeholder
+        plan = settings["query_plan_cache"].get(plan_key(request))
+        self.assertIs(plan.template.filter["ctime"]["$lte"], NOW)
+        self.assertTrue(plan.volatile)
+        # Each run resolves the placeholder to the current date/time
+        self.assertIsInstance(first["filter"]["ctime"]["$lte"], datetime)
+        self.assertLessEqual(
+            first["filter"]["ctime"]["$lte"], second["filter"]["ctime"]["$lte"]
+        )
+
+    def test_run_returns_a_copy(self):
+        plan = QueryPlan(QuerySpec(filter={"key": {"$in": ["a"]}}, limit=10))
+        spec = plan.run()
+        spec.filter["key"]["$in"].append("b")
+        spec.limit = 1
+        self.assertEqual(
+            plan.run().find_options(), {"filter": {"key": {"$in": ["a"]}}, "limit": 10}
+        )
+
+    def test_route_suffix(self):
+        settings = {"query_plan_cache": QueryPlanCache()}
+        request = MagicMock()
+        request.arguments = {}
+        request.path = "/find"
+        self.assertEqual(build_query(settings, request)["limit"], 10)
+        request.path = "/find_one"
+        self.assertEqual(build_query(settings, request)["limit"], 1)
+        self.assertEqual(settings["query_plan_cache"].misses, 2)
+
+    def test_eviction(self):
+        cache = QueryPlanCache(maxsize=2)
+        for key in ["a", "b", "c"]:
+            cache.put(key, QueryPlan(QuerySpec()))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+        self.assertIsNone(cache.get("a"))
+        # Recently used plans are kept
+        cache.get("b")
+        cache.put("d", QueryPlan(QuerySpec()))
+        self.assertIsNotNone(cache.get("b"))
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(
+            cache.stats(),
+            {"size": 2, "maxsize": 2, "hits": 2, "misses": 2, "evictions": 2},
+        )
+
+    def test_errors_are_not_cached(self):
+        settings = {"query_plan_cache": QueryPlanCache()}
+        request = MagicMock()
+        request.path = "/find"
+        request.arguments = {"limit": [b"ten"]}
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                build_query(settings, request)
+        self.assertEqual(len(settings["query_plan_cache"]), 0)
@@ -0,0 +1,93 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+# https://pymongo.readthedocs.io/en/stable/
+from pymongo.read_preferences import Nearest, Primary, SecondaryPreferred
+
+from app import make_app
+from mongo_read_preference import parse_read_preferences, read_preference
+
+
+class TestReadPreference(unittest.TestCase):
+    def test_read_preference(self):
+        preference = read_preference("secondaryPreferred", [{"dc": "east"}, {}], 120)
+        print(f"preference: {preference!r}")
+        # Check the read preferences for expected values
+        self.assertEqual(
+            preference, SecondaryPreferred([{"dc": "east"}, {}], max_staleness=120)
+        )
+        self.assertEqual(read_preference("primary", [{"dc": "east"}], 120), Primary())
+        for args in [("secondary_preferred",), ("nearest", None, 30), ("nearest", [1])]:
+            with self.assertRaises(ValueError):
+                read_preference(*args)
+
+    def test_parse_read_preferences(self):
+        routes = parse_read_preferences(
+            '{"find": "nearest", "count_documents": {"mode": "secondaryPreferred", "allow": ["primary"]}}'
+        )
+        print(f"routes: {routes!r}")
+        # Check the routes for expected values
+        self.assertEqual(routes["find"]["default"], Nearest())
+        self.assertEqual(
+            set(routes["count_documents"]["allow"]), {"primary", "secondaryPreferred"}
+        )
+        with self.assertRaises(ValueError):
+            parse_read_preferences('{"find": {"mode": "nearest", "hedge": true}}')
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestReadPreferenceHandlers(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance, with_options() returns a collection reading
+        # from the secondaries
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+        mock_collection.count_documents = AsyncMock(return_value=1)
+        self.secondary_collection = MagicMock()
+        self.secondary_collection.database = mock_database
+        self.secondary_collection.name = "mock_collection"
+        self.secondary_collection.count_documents = AsyncMock(return_value=2)
+        mock_collection.with_options = MagicMock(return_value=self.secondary_collection)
+        self.mock_collection = mock_collection
+
+        return make_app(
+            mock_collection=mock_collection,
+            route_read_preferences='{"count_documents": {"mode": "primary", "allow": ["secondaryPreferred"]}}',
+        )
+
+    def test_count_documents(self):
+        response = self.fetch("/count_documents")
+        self.assertEqual(json.loads(response.body)["count"], 2)
+        self.mock_collection.with_options.assert_called_once_with(
+            read_preference=Primary()
+        )
+        response = self.fetch("/count_documents?read_preference=secondaryPreferred")
+        print(f"response.body: {response.body!r}")
+        # Check the allowed read preference derived a collection handle
+        self.assertEqual(response.code, 200)
+        self.mock_collection.with_options.assert_called_with(
+            read_preference=SecondaryPreferred()
+        )
+        # Derived handles are cached
+        self.fetch("/count_documents?read_preference=secondaryPreferred")
+        self.assertEqual(self.mock_collection.with_options.call_count, 2)
+
+    def test_not_allowed(self):
+        for path in [
+            "/count_documents?read_preference=nearest",
+            "/find?read_preference=secondaryPreferred",
+        ]:
+            response = self.fetch(path)
+            print(f"path: {path!r}, response.code: {response.code!r}")
+            # Check modes outside the allowed set are rejected
+            self.assertEqual(response.code, 400)
+        self.mock_collection.with_options.assert_not_called()
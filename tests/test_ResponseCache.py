@@ -0,0 +1,175 @@
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+from pymongo.results import InsertOneResult
+
+from app import make_app
+from mongo_response_cache import (
+    CachedHeadersMixin,
+    CacheEntry,
+    ResponseCache,
+    cache_key,
+    parse_response_cache,
+)
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_cache_key(self):
+        # Filters in another key order share a cache key
+        key1 = cache_key("find", {"filter": {"a": 1, "b": [1, 2]}}, "json")
+        key2 = cache_key("find", {"filter": {"b": [1, 2], "a": 1}}, "json")
+        print(f"key1: {key1!r}")
+        # Check the cache keys for expected values
+        self.assertEqual(key1, key2)
+        self.assertNotEqual(key1, cache_key("find", {"filter": {"a": 1}}, "json"))
+        self.assertNotEqual(key1, cache_key("find", {"filter": {"a": 1}}, "bson"))
+        # The deadline of a request does not change the key
+        key3 = cache_key(
+            "find", {"filter": {"a": 1, "b": [1, 2]}, "max_time_ms": 999}, "json"
+        )
+        self.assertEqual(key1, key3)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=5, max_bytes=1024)
+        cache.put("key", CacheEntry(b"body", []), now=100.0)
+        # Check the cache entries for expected values
+        self.assertEqual(cache.get("key", now=104.0).body, b"body")
+        self.assertIsNone(cache.get("key", now=105.0))
+        stats = cache.stats()
+        print(f"stats: {stats!r}")
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["expirations"], 1)
+        self.assertEqual(stats["bytes"], 0)
+
+    def test_lru_max_bytes(self):
+        cache = ResponseCache(ttl=5, max_bytes=10)
+        cache.put("a", CacheEntry(b"aaaa", []))
+        cache.put("b", CacheEntry(b"bbbb", []))
+        cache.get("a")
+        cache.put("c", CacheEntry(b"cccc", []))
+        # Check the least recently used entry was evicted
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.bytes, 8)
+        self.assertEqual(cache.stats()["evictions"], 1)
+        # Compressed bodies count toward the max bytes
+        entry = cache.get("a")
+        entry.encodings["gzip"] = b"zz"
+        cache.put("a", entry)
+        self.assertEqual(cache.bytes, 10)
+        # An entry over max bytes is not stored
+        cache.put("d", CacheEntry(b"d" * 11, []))
+        self.assertNotIn("d", cache.entries)
+
+    def test_generation(self):
+        cache = ResponseCache()
+        cache.put("key", CacheEntry(b"body", []), generation=1)
+        # Check a write since the entry was stored invalidates it
+        self.assertIsNotNone(cache.get("key", generation=1))
+        self.assertIsNone(cache.get("key", generation=2))
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_parse_response_cache(self):
+        caches = parse_response_cache('{"find": {"ttl": 2, "max_bytes": 1024}}')
+        print(f"caches: {caches!r}")
+        # Check the parsed caches for expected values
+        self.assertEqual(caches["find"].ttl, 2.0)
+        self.assertEqual(caches["find"].max_bytes, 1024)
+        for value in ['{"find": 5}', '{"find": {"size": 1}}', '{"find": {"ttl": 0}}']:
+            with self.assertRaises(ValueError):
+                parse_response_cache(value)
+
+    def test_cached_headers(self):
+        class MockHandler(CachedHeadersMixin, tornado.web.RequestHandler):
+            pass
+
+        handler = MockHandler(tornado.web.Application(), MagicMock())
+        handler.set_header("Content-Type", "text/html")
+        handler.set_header("Content-Type", "text/json")
+        handler.set_header("Server", "Python/Tornado/MongoClient")
+        handler.add_header("Vary", "Accept")
+        handler.set_header("X-Count-Exact", "true")
+        handler.clear_header("X-Count-Exact")
+        print(f"cached_headers: {handler.cached_headers!r}")
+        # Only the cached headers are recorded, last value wins
+        self.assertEqual(
+            handler.cached_headers, [("Content-Type", "text/json"), ("Vary", "Accept")]
+        )
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestResponseCacheHandlers(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+        self.mock_command = AsyncMock(return_value={})
+        mock_database.command = self.mock_command
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        # Mock cursor instance
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(return_value=[{"_id": "mock_document"}])
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=1)
+        mock_collection.insert_one = AsyncMock(
+            return_value=InsertOneResult("mock_document_id", True)
+        )
+        self.mock_collection = mock_collection
+
+        return make_app(
+            admin=True,
+            compression_min_size=1,
+            explain_sample_rate=100,
+            mock_collection=mock_collection,
+            response_cache='{"find": {"ttl": 60, "max_bytes": 65536}, "count_documents": {"ttl": 60, "max_bytes": 65536}}',
+        )
+
+    def test_find_hit(self):
+        response = self.fetch("/find?a=1&b=2")
+        self.assertEqual(response.code, 200)
+        # The same query in another argument order is served from the cache
+        response = self.fetch("/find?b=2&a=1")
+        print(f"response.body: {response.body!r}")
+        # Check response for expected values
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.headers.get("Content-Type"), "text/json")
+        self.assertIn("Accept", response.headers.get("Vary"))
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.mock_cursor.to_list.assert_awaited_once()
+        # Another output format is another cache entry
+        response = self.fetch("/find?b=2&a=1&format=columnar")
+        self.assertEqual(json.loads(response.body)["fields"], ["_id"])
+        self.assertEqual(self.mock_cursor.to_list.await_count, 2)
+        # Compressed bodies are kept with the entry
+        response = self.fetch("/find?a=1&b=2", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.assertEqual(self.mock_cursor.to_list.await_count, 2)
+        response = self.fetch("/stats")
+        stats = json.loads(response.body)["response_cache"]["find"]
+        print(f"stats: {stats!r}")
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 2)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+        # Only the queries that reached the database were explained
+        self.assertEqual(self.mock_command.await_count, 2)
+
+    def test_write_invalidates(self):
+        response = self.fetch("/count_documents?a=1")
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        self.mock_collection.count_documents.return_value = 2
+        response = self.fetch("/count_documents?a=1")
+        # Check the cached count is served until a write
+        self.assertEqual(json.loads(response.body)["count"], 1)
+        response = self.fetch("/insert_one?a=1")
+        self.assertEqual(response.code, 200)
+        response = self.fetch("/count_documents?a=1")
+        print(f"response.body: {response.body!r}")
+        self.assertEqual(json.loads(response.body)["count"], 2)
+        self.assertEqual(self.mock_collection.count_documents.await_count, 2)
@@ -0,0 +1,183 @@
+import asyncio
+import contextvars
+import json
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+# https://www.tornadoweb.org/en/stable/
+import tornado
+
+from app import make_app
+from mongo_single_flight import SingleFlight
+
+
+class TestSingleFlight(unittest.IsolatedAsyncioTestCase):
+    async def test_shared_result(self):
+        flights = SingleFlight()
+        calls = []
+
+        async def query():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return ["mock_document"]
+
+        results = await asyncio.gather(*[flights.do("key", query) for _ in range(5)])
+        print(f"stats: {flights.stats()!r}")
+        # Check the call was made once for all the requests
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [["mock_document"]] * 5)
+        self.assertEqual(flights.stats()["leaders"], 1)
+        self.assertEqual(flights.stats()["followers"], 4)
+        self.assertEqual(flights.stats()["coalesced_ratio"], 0.8)
+        self.assertEqual(len(flights), 0)
+        # A later request makes a new call
+        await flights.do("key", query)
+        self.assertEqual(len(calls), 2)
+
+    async def test_shared_error(self):
+        flights = SingleFlight()
+
+        async def query():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("mock_error")
+
+        results = await asyncio.gather(
+            *[flights.do("key", query) for _ in range(3)], return_exceptions=True
+        )
+        # Check every request gets the error
+        for result in results:
+            self.assertIsInstance(result, RuntimeError)
+        self.assertEqual(flights.stats()["errors"], 1)
+
+    async def test_cancelled_leader(self):
+        flights = SingleFlight()
+
+        async def query():
+            await asyncio.sleep(0.05)
+            return "mock_result"
+
+        leader = asyncio.ensure_future(flights.do("key", query))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(flights.do("key", query))
+        await asyncio.sleep(0)
+        leader.cancel()
+        # Check the follower still gets the result
+        self.assertEqual(await follower, "mock_result")
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(flights.stats()["cancelled"], 0)
+
+    async def test_cancelled_all(self):
+        flights = SingleFlight()
+        started = asyncio.Event()
+
+        async def query():
+            started.set()
+            await asyncio.sleep(10)
+
+        request = asyncio.ensure_future(flights.do("key", query))
+        await started.wait()
+        task = flights.flights["key"].task
+        request.cancel()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        # Check the call is cancelled without any request awaiting it
+        self.assertTrue(task.cancelled())
+        self.assertEqual(flights.stats()["cancelled"], 1)
+
+    async def test_timeout(self):
+        flights = SingleFlight()
+
+        async def query():
+            await asyncio.sleep(0.05)
+            return "mock_result"
+
+        leader = asyncio.ensure_future(flights.do("key", query))
+        # A follower only waits for its own timeout
+        with self.assertRaises(TimeoutError):
+            await flights.do("key", query, timeout=0.001)
+        self.assertEqual(await leader, "mock_result")
+
+    async def test_deadlines(self):
+        flights = SingleFlight()
+        request = contextvars.ContextVar("request", default=None)
+        contexts = []
+
+        async def query():
+            # The call does not run in the context of the leader request
+            contexts.append(request.get())
+            await asyncio.sleep(0.05)
+            return "mock_result"
+
+        async def do(name, timeout):
+            request.set(name)
+            return await flights.do("key", query, timeout=timeout)
+
+        results = await asyncio.gather(
+            do("leader", 0.01), do("follower", 1), return_exceptions=True
+        )
+        print(f"results: {results!r}")
+        # Check the leader timed out and the follower got the result
+        self.assertIsInstance(results[0], TimeoutError)
+        self.assertEqual(results[1], "mock_result")
+        self.assertEqual(contexts, [None])
+
+
+# https://www.tornadoweb.org/en/stable/testing.html
+class TestSingleFlightHandlers(tornado.testing.AsyncHTTPTestCase):
+    def get_app(self):
+        # Mock database instance
+        mock_database = MagicMock()
+        mock_database.name = "mock_collection"
+
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.database = mock_database
+        mock_collection.name = "mock_collection"
+
+        async def to_list(*args, **kwargs):
+            await asyncio.sleep(0.05)
+            return [{"_id": "mock_document"}]
+
+        # Mock cursor instance
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(side_effect=to_list)
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        self.mock_collection = mock_collection
+
+        return make_app(mock_collection=mock_collection, single_flight=True)
+
+    @tornado.testing.gen_test
+    async def test_find(self):
+        client = self.http_client
+        responses = await asyncio.gather(
+            *[client.fetch(self.get_url("/find?a=1")) for _ in range(4)]
+        )
+        # Check the responses for expected values
+        for response in responses:
+            self.assertEqual(json.loads(response.body)["count"], 1)
+        self.mock_cursor.to_list.assert_awaited_once()
+        response = await client.fetch(self.get_url("/stats"))
+        stats = json.loads(response.body)["single_flight"]
+        print(f"stats: {stats!r}")
+        self.assertEqual(stats["followers"], 3)
+
+    @tornado.testing.gen_test
+    async def test_find_deadlines(self):
+        client = self.http_client
+        responses = await asyncio.gather(
+            *[
+                client.fetch(
+                    self.get_url("/find?a=1"),
+                    headers={"X-Request-Timeout": timeout},
+                    raise_error=False,
+                )
+                for timeout in ["0.01", "5"]
+            ]
+        )
+        print(f"responses: {[response.code for response in responses]!r}")
+        # Check the shorter deadline does not cut the call short for the other
+        self.assertEqual(responses[0].code, 504)
+        self.assertEqual(responses[1].code, 200)
+        self.mock_cursor.to_list.assert_awaited_once()
+        # The shared call leaves out the deadline of the request that started it
+        self.assertNotIn("max_time_ms", self.mock_collection.find.call_args.kwargs)
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+
+from app import make_app
+from mongo_warmup import parse_warm_up_queries, run_query, warm_up
+
+
+class TestWarmUp(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Mock collection instance
+        mock_collection = MagicMock()
+        mock_collection.name = "mock_collection"
+        self.mock_cursor = MagicMock()
+        self.mock_cursor.to_list = AsyncMock(return_value=[])
+        mock_collection.find = MagicMock(return_value=self.mock_cursor)
+        mock_collection.count_documents = AsyncMock(return_value=0)
+        self.mock_collection = mock_collection
+        self.settings = make_app(mock_collection=mock_collection).settings
+
+        # Mock client instance
+        self.mock_client = MagicMock()
+        self.mock_client.aconnect = AsyncMock()
+        self.mock_client.admin.command = AsyncMock(return_value={"ok": 1})
+        self.settings["asyncmongoclient"] = self.mock_client
+
+    def test_parse_warm_up_queries(self):
+        self.assertEqual(parse_warm_up_queries('["/find?a=1"]'), ["/find?a=1"])
+        for value in ['{"find": 1}', '["find"]']:
+            with self.assertRaises(ValueError):
+                parse_warm_up_queries(value)
+
+    async def test_warm_up(self):
+        phases = await warm_up(
+            self.settings,
+            queries=["/find?status=public&limit=5", "/count_documents?status=public"],
+            min_pool_size=4,
+        )
+        print(f"phases: {phases!r}")
+        # Check the phases for expected values
+        self.assertEqual(list(phases), ["connect", "ping", "pool", "queries", "total"])
+        self.mock_client.aconnect.assert_awaited_once()
+        self.assertEqual(self.mock_client.admin.command.await_count, 5)
+        self.mock_collection.find.assert_called_once_with(
+            filter={"status": "public"}, limit=5
+        )
+        self.mock_cursor.to_list.assert_awaited_once_with(5)
+        self.mock_collection.count_documents.assert_awaited_once_with(
+            filter={"status": "public"}
+        )
+
+    async def test_failed_phase(self):
+        self.mock_client.admin.command.side_effect = TimeoutError("mock_timeout")
+        phases = await warm_up(self.settings, queries=["/find?limit=abc"])
+        print(f"phases: {phases!r}")
+        # Check the failed phases are reported and skipped
+        self.assertIn("mock_timeout", phases["ping"]["error"])
+        self.assertIn("error", phases["queries"])
+        self.assertNotIn("pool", phases)
+        self.assertNotIn("error", phases["connect"])
+
+    async def test_invalid_query(self):
+        # An invalid ObjectId fails the queries phase, not the warm-up
+        phases = await warm_up(self.settings, queries=["/find?_id=not-an-objectid"])
+        print(f"phases: {phases!r}")
+        self.assertIn("InvalidId", phases["queries"]["error"])
+        self.assertIn("total", phases)
+
+    async def test_collections(self):
+        mock_orders = MagicMock()
+        mock_orders.count_documents = AsyncMock(return_value=0)
+        settings = make_app(
+            mock_collection=self.mock_collection,
+            mock_collections={"shop.orders": mock_orders},
+            collections='{"shop.orders": {"default_query_filter": {"status": "open"}}}',
+        ).settings
+        await run_query(settings, "/shop/orders/count_documents?customer=42")
+        # Check the query ran with the collection and its default filter
+        mock_orders.count_documents.assert_awaited_once_with(
+            filter={"status": "open", "customer": 42}
+        )
+        self.mock_collection.count_documents.assert_not_awaited()
+        with self.assertRaises(ValueError):
+            await run_query(settings, "/shop/customers/count_documents")